@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional
+from app.changes import ChangeEvent, DerivedState
+from app.database import db, async_db
+
+# Tables with a category catalog and the field broken down per category
+CATALOG_FIELDS: Dict[str, str] = {
+    "courses": "level",
+    "tutorials": "level",
+    "quizzes": "difficulty",
+}
+
+
+def _fold(value: Any) -> Any:
+    """Categories and difficulties are grouped case-insensitively, like __ieq filters"""
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+class TableCatalog:
+    """Categories of one table: folded name -> [name as first seen, count, {difficulty: [name, count]}].
+
+    The (category, difficulty) counted for each row ID is kept too, so a
+    change is applied against what was counted rather than event.before,
+    and an event seen twice (or already in the rows built from) is a no-op.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.categories: Dict[Any, list] = {}
+        self.rows: Dict[Any, tuple] = {}
+
+    def _count(self, values: tuple, delta: int):
+        category, difficulty = values
+        if not category:
+            return
+        entry = self.categories.setdefault(_fold(category), [category, 0, {}])
+        entry[1] += delta
+        if difficulty:
+            tally = entry[2].setdefault(_fold(difficulty), [difficulty, 0])
+            tally[1] += delta
+            if tally[1] <= 0:
+                del entry[2][_fold(difficulty)]
+        if entry[1] <= 0:
+            del self.categories[_fold(category)]
+
+    def add(self, item_id: Any, item: Dict[str, Any]):
+        values = (item.get("category"), item.get(self.field))
+        known = self.rows.get(item_id)
+        if known == values:
+            return  # view counters and other fields the catalog does not track
+        if known is not None:
+            self._count(known, -1)
+        self.rows[item_id] = values
+        self._count(values, 1)
+
+    def remove(self, item_id: Any):
+        known = self.rows.pop(item_id, None)
+        if known is not None:
+            self._count(known, -1)
+
+    def apply(self, event: ChangeEvent):
+        if event.after is None:
+            self.remove(event.id)
+        else:
+            self.add(event.id, event.after)
+
+    def names(self) -> List[str]:
+        return sorted(name for name, _, _ in self.categories.values())
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": name,
+                "count": count,
+                "difficulties": {label: n for label, n in sorted(breakdown.values(), key=lambda tally: -tally[1])},
+            }
+            for name, count, breakdown in sorted(self.categories.values(), key=lambda entry: (-entry[1], entry[0]))
+        ]
+
+
+class CategoryCatalog(DerivedState):
+    """Per-category item counts and difficulty breakdowns of CATALOG_FIELDS tables.
+
+    A table is counted once, on first use, from a projection of the ID and
+    its two fields and then kept up to date from change events (see
+    DerivedState), so reads cost O(categories).
+    """
+
+    def __init__(self, database, fields: Optional[Dict[str, str]] = None):
+        self.fields = fields or CATALOG_FIELDS
+        super().__init__(database, self.fields)
+
+    def build(self, table: str) -> TableCatalog:
+        catalog = TableCatalog(self.fields[table])
+        for item in self.database.query(table, fields=["id", "category", catalog.field]):
+            catalog.add(item["id"], item)
+        return catalog
+
+    def _catalog(self, table: str) -> TableCatalog:
+        if table not in self.fields:
+            raise ValueError(f"Table {table} has no category catalog")
+        return self._state(table)
+
+    def names(self, table: str) -> List[str]:
+        """Category names of a table, alphabetically"""
+        catalog = self._catalog(table)
+        with self._lock:
+            return catalog.names()
+
+    def summary(self, table: str) -> List[Dict[str, Any]]:
+        """Categories of a table with their item counts and difficulty breakdowns, largest first"""
+        catalog = self._catalog(table)
+        with self._lock:
+            return catalog.summary()
+
+    async def get_names(self, table: str) -> List[str]:
+        return await async_db.call(self.names, table)
+
+    async def get_summary(self, table: str) -> List[Dict[str, Any]]:
+        return await async_db.call(self.summary, table)
+
+
+# Shared catalog over the global database
+category_catalog = CategoryCatalog(db)
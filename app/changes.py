@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+from app.config import settings
+
+
+class ChangeEvent(NamedTuple):
+    """One committed row change: op is "create", "update" or "delete".
+
+    before is None for creates and after is None for deletes. offset is the
+    event's position in the durable feed and origin the ChangeHub.origin of
+    the writer (both None for in-process delivery).
+    """
+    table: str
+    op: str
+    id: Any
+    before: Optional[Dict[str, Any]]
+    after: Optional[Dict[str, Any]]
+    offset: Optional[int] = None
+    origin: Optional[str] = None
+
+
+class ChangeFeedGap(Exception):
+    """The requested offset is older than the oldest retained feed segment"""
+
+    def __init__(self, offset: int, oldest: int):
+        self.offset = offset
+        self.oldest = oldest
+        super().__init__(f"Change feed offset {offset} was trimmed; oldest retained offset is {oldest}")
+
+
+class ChangeFeed:
+    """Durable, offset-addressed change log shared by all worker processes.
+
+    Events are appended as JSON lines to segment files named after their
+    starting offset (data/_changes/<offset>.log), so an offset is a global
+    byte position that stays valid across rotations. A full segment is
+    closed and a new one started; only the newest retain_segments are kept.
+    Readers remember the next offset and poll read() to tail the feed.
+    """
+
+    def __init__(self, directory: str, codec, segment_bytes: Optional[int] = None,
+                 retain_segments: Optional[int] = None):
+        self.directory = directory
+        self.codec = codec
+        self.segment_bytes = segment_bytes or settings.change_feed_segment_bytes
+        self.retain_segments = retain_segments or settings.change_feed_segments
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _segments(self) -> List[int]:
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+
+    def _path(self, start: int) -> str:
+        return os.path.join(self.directory, f'{start:020d}.log')
+
+    def append(self, events: Iterable[ChangeEvent], origin: Optional[str] = None):
+        """Append events in one write, rotating and trimming segments as needed"""
+        line = b''.join(
+            self.codec.dumps({'table': e.table, 'op': e.op, 'id': e.id, 'before': e.before, 'after': e.after,
+                              'origin': origin}) + b'\n'
+            for e in events
+        )
+        if not line:
+            return
+        with self._lock, open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            segments = self._segments() or [0]
+            start = segments[-1]
+            path = self._path(start)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size >= self.segment_bytes:
+                start += size
+                segments.append(start)
+                path = self._path(start)
+            with open(path, 'ab') as f:
+                f.write(line)
+                f.flush()
+                if settings.wal_fsync:
+                    os.fsync(f.fileno())
+            for old in segments[:-self.retain_segments]:
+                try:
+                    os.remove(self._path(old))
+                except FileNotFoundError:
+                    pass
+
+    def end(self) -> int:
+        """Offset just past the last event, where a new reader starts tailing"""
+        segments = self._segments()
+        if not segments:
+            return 0
+        path = self._path(segments[-1])
+        return segments[-1] + (os.path.getsize(path) if os.path.exists(path) else 0)
+
+    def read(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[ChangeEvent], int]:
+        """Events from offset on (at most limit) and the offset to continue from.
+
+        Raises ChangeFeedGap when offset was trimmed; the reader must then
+        rebuild its derived state from the tables and resume at end().
+        """
+        segments = self._segments()
+        if not segments:
+            return [], offset
+        if offset < segments[0]:
+            raise ChangeFeedGap(offset, segments[0])
+
+        events: List[ChangeEvent] = []
+        for position, start in enumerate(segments):
+            following = segments[position + 1] if position + 1 < len(segments) else None
+            if following is not None and offset >= following:
+                continue
+            try:
+                with open(self._path(start), 'rb') as f:
+                    f.seek(offset - start)
+                    chunk = f.read()
+            except FileNotFoundError:
+                raise ChangeFeedGap(offset, self._segments()[0])
+            end = chunk.rfind(b'\n') + 1
+            cursor = offset
+            for line in chunk[:end].split(b'\n')[:-1]:
+                if limit is not None and len(events) >= limit:
+                    return events, cursor
+                record = self.codec.loads(line)
+                events.append(ChangeEvent(record['table'], record['op'], record['id'],
+                                          record['before'], record['after'], cursor, record.get('origin')))
+                cursor += len(line) + 1
+            offset = cursor
+            # A segment is only left behind once it is complete
+            if following is None or offset < following:
+                break
+        return events, offset
+
+
+class ChangeHub:
+    """In-process subscribers of a database's change events, plus its durable feed"""
+
+    def __init__(self, feed: Optional[ChangeFeed] = None):
+        self.feed = feed
+        self._token = uuid.uuid4().hex[:12]
+        self._subscribers: List[Tuple[Callable[[ChangeEvent], None], Optional[frozenset]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def origin(self) -> str:
+        """Writer tag of this hub's events in the feed: process ID plus a per-hub token"""
+        return f'{os.getpid()}-{self._token}'
+
+    @property
+    def active(self) -> bool:
+        """Whether anyone consumes events; writers skip building them otherwise"""
+        return self.feed is not None or bool(self._subscribers)
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None],
+                  tables: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call callback with every committed change (of the given tables); returns an unsubscribe function.
+
+        Callbacks run on the writing thread right after the write, in commit
+        order, while the table is still locked: they may read the database
+        but should be quick and must not wait on other threads.
+        """
+        entry = (callback, frozenset(tables) if tables is not None else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, events: List[ChangeEvent]):
+        """Append events to the feed, then hand them to the subscribers"""
+        if not events:
+            return
+        if self.feed is not None:
+            self.feed.append(events, self.origin)
+        for event in events:
+            for callback, tables in list(self._subscribers):
+                if tables is not None and event.table not in tables:
+                    continue
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"⚠️  Change subscriber failed on {event.table} {event.op} {event.id}: {e}")
+
+
+class DerivedState:
+    """Per-table state derived from a database's rows and kept current from its change events.
+
+    A table's state is built by build() on first use and then updated with
+    apply(): this process's writes arrive via subscribe(), other workers'
+    through the durable change feed when CHANGE_FEED is on (skipping our
+    own events there, which subscribe() already delivered). Without the
+    feed, a table whose external_version() moved, meaning rows written by
+    another worker were loaded, is rebuilt, at most every
+    rebuild_interval() seconds. Subclasses read a state while holding _lock.
+    """
+
+    def __init__(self, database, tables: Iterable[str]):
+        self.database = database
+        self._names = list(tables)
+        self._tables: Dict[str, Any] = {}
+        # Events that arrived while a table was being built, replayed after
+        self._building: Dict[str, List[ChangeEvent]] = {}
+        # External version of each table the state was built from
+        self._stamps: Dict[str, int] = {}
+        self._built_at: Dict[str, float] = {}
+        self._offset: Optional[int] = None
+        self._unsubscribe = None
+        # Subscriber callbacks run under database locks; they only ever take _lock
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def build(self, table: str) -> Any:
+        """Fresh state of a table from its current rows"""
+        raise NotImplementedError
+
+    def apply(self, state: Any, event: ChangeEvent):
+        """Update a table's state with one committed change"""
+        state.apply(event)
+
+    def rebuild_interval(self) -> float:
+        """Min seconds between rebuilds after other workers' writes (without the change feed)"""
+        return 0.0
+
+    def _on_change(self, event: ChangeEvent):
+        with self._lock:
+            if event.table in self._building:
+                self._building[event.table].append(event)
+            elif event.table in self._tables:
+                self.apply(self._tables[event.table], event)
+
+    def _build(self, table: str):
+        with self._build_lock:
+            if self._unsubscribe is None:
+                self._unsubscribe = self.database.subscribe(self._on_change, self._names)
+            with self._lock:
+                self._building[table] = []
+            try:
+                if settings.change_feed and self._offset is None:
+                    self._offset = self.database.changes.feed.end()
+                stamp = self.database.external_version(table)
+                state = self.build(table)
+            except BaseException:
+                with self._lock:
+                    self._building.pop(table, None)
+                raise
+            with self._lock:
+                missed = self._building.pop(table)
+                for event in missed:
+                    self.apply(state, event)
+                self._tables[table] = state
+                self._stamps[table] = stamp
+                self._built_at[table] = time.monotonic()
+
+    def _tail_feed(self):
+        """Apply other workers' changes from the durable feed"""
+        try:
+            events, offset = self.database.read_changes(self._offset)
+        except ChangeFeedGap:
+            # Trimmed past our position: start over from the current tables
+            self._offset = None
+            for table in list(self._tables):
+                self._build(table)
+            return
+        own = self.database.changes.origin
+        with self._lock:
+            for event in events:
+                if event.table in self._tables and event.origin != own:
+                    self.apply(self._tables[event.table], event)
+            self._offset = offset
+
+    def _refresh(self, table: str):
+        """Bring the state of a table up to date before it is read"""
+        if table not in self._tables:
+            self._build(table)
+            return
+        if settings.change_feed:
+            self._tail_feed()
+            return
+        if self.database.external_version(table) == self._stamps[table]:
+            return
+        if time.monotonic() - self._built_at[table] >= self.rebuild_interval():
+            self._build(table)
+
+    def _state(self, table: str) -> Any:
+        """Current state of a table"""
+        if table not in self._names:
+            raise ValueError(f"Table {table} is not tracked by {type(self).__name__}")
+        self._refresh(table)
+        return self._tables[table]
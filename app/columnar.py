@@ -0,0 +1,299 @@
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+try:
+    import numpy as np
+except ImportError:  # columnar snapshots are optional; analytics fall back to row queries
+    np = None
+from app.config import settings
+
+
+# Numeric columns kept for each analytics table. Timestamps (*_at) are stored
+# as epoch seconds; missing or non-numeric values become NaN.
+COLUMNAR_TABLES: Dict[str, List[str]] = {
+    'quiz_attempts': ['user_id', 'quiz_id', 'score', 'correct_answers', 'total_questions', 'completed_at', 'created_at'],
+    'enrollments': ['user_id', 'course_id', 'progress', 'completed_at', 'created_at'],
+    'completions': ['user_id', 'tutorial_id', 'rating', 'created_at'],
+    'likes': ['user_id', 'article_id', 'created_at'],
+}
+
+# Extra column of every snapshot: per row, bit i is set when field i of
+# ['id'] + COLUMNAR_TABLES[table] was stored as an int
+INTS = '_ints'
+
+_MAGIC = b'QQCOLS02'
+_HEADER = struct.Struct('<8sQ')
+
+
+def _number(value: Any) -> float:
+    """Column value of a field: numbers as is, ISO timestamps as epoch seconds, anything else NaN"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def _int_bits(row: tuple) -> float:
+    return float(sum(1 << position for position, value in enumerate(row)
+                     if isinstance(value, int) and not isinstance(value, bool)))
+
+
+def _scalar(value: float, integral: Any) -> Any:
+    return int(value) if integral and not math.isnan(value) else value
+
+
+def _padded(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+class ColumnSet(dict):
+    """Selected columns (field -> array), aggregated as arrays.
+
+    Missing values are NaN in the arrays; the aggregates count them as 0,
+    like the .get(field, 0) of row-based callers. Only final results are
+    turned into Python objects, with row() for individual rows.
+    """
+
+    def __init__(self, columns: Dict[str, Any], ints: Any, bits: Dict[str, int]):
+        super().__init__(columns)
+        self._ints = ints
+        self._bits = bits
+
+    def count(self) -> int:
+        """Number of selected rows"""
+        return len(self._ints)
+
+    def filled(self, field: str) -> Any:
+        """A column with missing values as 0"""
+        return np.nan_to_num(self[field])
+
+    def total(self, field: str) -> float:
+        return float(self.filled(field).sum())
+
+    def present(self, field: str) -> int:
+        """Rows where field is set (not missing and not 0)"""
+        return int(np.count_nonzero(self.filled(field)))
+
+    def at_least(self, field: str, threshold: float) -> int:
+        return int(np.count_nonzero(self[field] >= threshold))
+
+    def totals_by(self, key: str, field: str) -> Dict[Any, tuple]:
+        """key value -> (sum of field, row count), e.g. scores per quiz_id"""
+        keys, groups = np.unique(self[key], return_inverse=True)
+        sums = np.bincount(groups, weights=self.filled(field), minlength=len(keys))
+        counts = np.bincount(groups, minlength=len(keys))
+        return {
+            _scalar(value, value.is_integer()): (total, count)
+            for value, total, count in zip(keys.tolist(), sums.tolist(), counts.tolist())
+        }
+
+    def best_per(self, key: str, field: str, limit: Optional[int] = None) -> List[int]:
+        """Positions of each key's row with the highest field, best first (at most limit).
+
+        Ties between rows of one key keep the earlier row; keys with equal
+        bests are ranked in order of their first row.
+        """
+        keys, values = self[key], self.filled(field)
+        if not len(keys):
+            return []
+        # Grouped by key, highest value first within a group; lexsort is stable
+        order = np.lexsort((-values, keys))
+        grouped = keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], grouped[1:] != grouped[:-1])))
+        best = order[starts]
+        first_rows = np.minimum.reduceat(order, starts)
+        ranking = best[np.lexsort((first_rows, -values[best]))]
+        return ranking[:limit].tolist()
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """One selected row as a dict, like row queries return it.
+
+        Missing values (NaN) are left out, so callers' .get() defaults apply,
+        and values stored as ints come back as ints.
+        """
+        ints = int(self._ints[position])
+        return {
+            field: _scalar(value, ints & (1 << self._bits[field]))
+            for field, value in ((field, float(self[field][position])) for field in self)
+            if not math.isnan(value)
+        }
+
+
+class ColumnarSnapshot:
+    """One physical table as packed little-endian float64 columns.
+
+    File layout: magic, header length, a JSON header (columns, row count and
+    the source stamp it was built from), then each column as a contiguous
+    array, 8-byte aligned. Readers map the file and view the columns with
+    numpy.frombuffer, so no per-row objects are created.
+    """
+
+    def __init__(self, columns: Dict[str, Any], stamp: list, marker: Optional[tuple] = None,
+                 buffers: Optional[Dict[str, Any]] = None):
+        self.columns = columns
+        self.stamp = stamp
+        # (rewrite counter, row count) of the source when built in this process
+        self.marker = marker
+        # Growable arrays behind the column views, with room for appended rows
+        self._buffers = buffers
+
+    @property
+    def rows(self) -> int:
+        return len(self.columns['id'])
+
+    @classmethod
+    def open(cls, path: str) -> Optional['ColumnarSnapshot']:
+        """Map a snapshot file, or return None if it is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        try:
+            magic, header_size = _HEADER.unpack_from(data, 0)
+            if magic != _MAGIC:
+                return None
+            header = json.loads(bytes(data[_HEADER.size:_HEADER.size + header_size]))
+            offset = _padded(_HEADER.size + header_size)
+            columns = {}
+            for name in header['columns']:
+                columns[name] = np.frombuffer(data, dtype='<f8', count=header['rows'], offset=offset)
+                offset += header['rows'] * 8
+        except (struct.error, ValueError, KeyError):
+            return None
+        return cls(columns, header['stamp'])
+
+    def appended(self, fresh: Dict[str, Any], stamp: list, marker: tuple) -> 'ColumnarSnapshot':
+        """New snapshot with rows added at the end.
+
+        Spare capacity is reused, so existing rows are only copied when the
+        buffers grow (geometrically). Views held by readers of this snapshot
+        stay valid since they never cover the appended slots.
+        """
+        rows, extra = self.rows, len(fresh['id'])
+        buffers = self._buffers
+        if buffers is None or rows + extra > len(buffers['id']):
+            capacity = max(1024, 2 * (rows + extra))
+            buffers = {}
+            for name, column in self.columns.items():
+                buffers[name] = np.empty(capacity, dtype='<f8')
+                buffers[name][:rows] = column
+        for name, buffer in buffers.items():
+            buffer[rows:rows + extra] = fresh[name]
+        columns = {name: buffer[:rows + extra] for name, buffer in buffers.items()}
+        return ColumnarSnapshot(columns, stamp, marker, buffers)
+
+    def write(self, path: str):
+        """Write the snapshot atomically (tmp file + rename)"""
+        header = json.dumps({'columns': list(self.columns), 'rows': self.rows, 'stamp': self.stamp}).encode('utf-8')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(header)))
+            f.write(header)
+            f.write(b'\0' * (_padded(_HEADER.size + len(header)) - _HEADER.size - len(header)))
+            for column in self.columns.values():
+                f.write(np.ascontiguousarray(column, dtype='<f8').tobytes())
+        os.replace(tmp_path, path)
+
+
+class ColumnStore:
+    """Columnar snapshots of the analytics tables of a JSONDatabase.
+
+    The JSON snapshot and log stay authoritative: a snapshot file is trusted
+    only while its recorded source stamp matches the table on disk. When rows
+    were only appended, the rebuild converts just the new rows and appends
+    them to the existing columns. Partitioned tables get one snapshot per
+    segment, so sealed months are never rebuilt.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self._snapshots: Dict[str, ColumnarSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self, table: str) -> bool:
+        return np is not None and settings.columnar_snapshots and table in COLUMNAR_TABLES
+
+    def _path(self, part: str) -> str:
+        return os.path.splitext(self.database.files[part])[0] + '.cols'
+
+    def snapshot(self, table: str, part: str) -> ColumnarSnapshot:
+        """Current columnar snapshot of one physical table, rebuilding it if stale"""
+        stamp = self.database.source_stamp(part)
+        with self._lock:
+            current = self._snapshots.get(part)
+            if current is not None and current.stamp == stamp:
+                return current
+            if current is None:
+                # Another process (or an earlier run) may have built it already
+                stored = ColumnarSnapshot.open(self._path(part))
+                if stored is not None and stored.stamp == stamp:
+                    self._snapshots[part] = stored
+                    return stored
+
+            fields = ['id'] + COLUMNAR_TABLES[table]
+            since = current.marker if current is not None else None
+            marker, stamp, values, appended = self.database.column_source(part, fields, since)
+            matrix = np.array([[_number(value) for value in row] + [_int_bits(row)] for row in values], dtype='<f8')
+            fields = fields + [INTS]
+            matrix = matrix.reshape(len(values), len(fields))
+            fresh = {field: np.ascontiguousarray(matrix[:, position]) for position, field in enumerate(fields)}
+            stamp = json.loads(json.dumps(stamp))
+
+            if appended:
+                snapshot = current.appended(fresh, stamp, marker)
+            else:
+                snapshot = ColumnarSnapshot(fresh, stamp, marker)
+            # Persist only compacted states (empty log): those stay valid for
+            # other workers and restarts, while a live log changes on every write
+            if stamp[-1] == 0:
+                snapshot.write(self._path(part))
+            self._snapshots[part] = snapshot
+            return snapshot
+
+    def select(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None,
+               ranges: Optional[Dict[str, tuple]] = None) -> Optional[ColumnSet]:
+        """Columns of the rows matching where (equality) and ranges ([low, high)), or None if disabled"""
+        if not self.enabled(table):
+            return None
+
+        bounds = {
+            field: tuple(None if bound is None else _number(bound) for bound in (low, high))
+            for field, (low, high) in (ranges or {}).items()
+        }
+        # Only the monthly segments overlapping a range on the partition field are read
+        partition_field = self.database.partitions.get(table)
+        low, high = (ranges or {}).get(partition_field, (None, None))
+
+        chunks = []
+        for part in self.database.segments(table, low, high):
+            snapshot = self.snapshot(table, part)
+            mask = np.ones(snapshot.rows, dtype=bool)
+            for field, value in (where or {}).items():
+                mask &= snapshot.columns[field] == _number(value)
+            for field, (start, end) in bounds.items():
+                if start is not None:
+                    mask &= snapshot.columns[field] >= start
+                if end is not None:
+                    mask &= snapshot.columns[field] < end
+            chunks.append({field: snapshot.columns[field][mask] for field in fields + [INTS]})
+
+        columns = {
+            field: np.concatenate([chunk[field] for chunk in chunks]) if chunks else np.empty(0)
+            for field in fields + [INTS]
+        }
+        ints = columns.pop(INTS)
+        bits = {field: position for position, field in enumerate(['id'] + COLUMNAR_TABLES[table])}
+        return ColumnSet(columns, ints, bits)
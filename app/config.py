@@ -17,7 +17,25 @@ class Settings(BaseSettings):
     allowed_origins: list = ["http://localhost:3000", "http://localhost:5173", "http://127.0.0.1:3000", "http://127.0.0.1:5173"]
     
     # Data storage settings
+    storage_backend: str = "json"  # "json" or "sqlite"
     data_dir: str = "data"
+    sqlite_path: Optional[str] = None  # defaults to <data_dir>/quiz_quest.db
+    wal_compaction_threshold: int = 1000  # log records before a table snapshot is rewritten
+    wal_fsync: bool = True
+    json_codec: str = "auto"  # "auto", "orjson", "msgspec" or "json" (stdlib)
+    columnar_snapshots: bool = True  # packed numeric columns for analytics; needs numpy
+    db_executor_workers: int = 8  # threads serving async_db calls
+    change_feed: bool = False  # durable change events in <data_dir>/_changes/ for other workers to tail
+    change_feed_segment_bytes: int = 16 * 1024 * 1024
+    change_feed_segments: int = 8  # newest segments kept; older offsets are trimmed
+    counter_flush_interval: float = 1.0  # seconds between view/like/student counter flushes; 0 writes through
+    search_fuzzy_threshold: float = 0.8  # min similarity (0-1) for a word to match a misspelling of it
+    search_rebuild_interval: float = 5.0  # min seconds between search index rebuilds after other workers' writes (without CHANGE_FEED)
+    slow_operation_ms: float = 100.0  # storage operations at least this slow are logged; 0 disables
+    
+    # Pagination settings
+    default_page_size: int = 50
+    max_page_size: int = 200
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,254 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+from app.config import settings
+from app.database import ReadWriteLock, Transaction
+
+
+class CounterBuffer:
+    """Write-behind buffer for hot counters (views, likes, students) over a storage backend.
+
+    increment() only adds the delta to an in-memory tally; a background
+    thread flushes the coalesced deltas with one increment_many() batch per
+    table every settings.counter_flush_interval seconds, and stop() flushes
+    what is left on shutdown. Reads through this wrapper merge in the
+    pending deltas, so a worker always sees its own increments. Other worker
+    processes see them after the next flush. Queries that filter or sort on
+    a counter with pending deltas, facets, select_columns and transaction
+    commits first flush the tables they touch, so the backend evaluates
+    them on current values. Everything else is passed through to the
+    wrapped backend.
+    """
+
+    def __init__(self, database, interval: Optional[float] = None):
+        self.database = database
+        self.interval = settings.counter_flush_interval if interval is None else interval
+        # table -> id -> field -> delta not yet written
+        self._pending: Dict[str, Dict[Any, Dict[str, int]]] = {}
+        # Deltas taken out for the flush in progress; still merged into reads
+        self._flushing: Dict[str, Dict[Any, Dict[str, int]]] = {}
+        # table -> field -> lower bound applied when merging and flushing
+        self._minimum: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Per table: reads (backend read + merge) share it, and a flush holds it
+        # exclusively while its batch is written and taken out of _flushing, so
+        # no read sees the deltas both in the backend and still in _flushing
+        self._table_locks: Dict[str, ReadWriteLock] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.database, name)
+
+    def _table_lock(self, table: str) -> ReadWriteLock:
+        with self._lock:
+            lock = self._table_locks.get(table)
+            if lock is None:
+                lock = self._table_locks[table] = ReadWriteLock()
+            return lock
+
+    @contextmanager
+    def _reading(self, table: str):
+        with self._table_lock(table).read():
+            yield
+
+    def _counters(self, table: str) -> set:
+        """Fields of a table with deltas not yet in the backend"""
+        with self._lock:
+            return {
+                field
+                for deltas in (self._pending.get(table, {}), self._flushing.get(table, {}))
+                for fields in deltas.values() for field in fields
+            }
+
+    def _flush_if_used(self, table: str, *names: Iterable[str]):
+        """Flush a table first when a lookup, order or field name refers to one of its pending counters"""
+        if not self._pending.get(table) and not self._flushing.get(table):
+            return
+        used = {
+            field.lstrip('-')
+            for group in names if group
+            for name in ([group] if isinstance(group, str) else group)
+            for field in str(name).split('__')[0].split('|')
+        }
+        if used & self._counters(table):
+            self.flush([table])
+
+    def _deltas(self, table: str, item_id: Any) -> Dict[str, int]:
+        """Pending deltas of one item, including those of a flush in progress"""
+        deltas = dict(self._flushing.get(table, {}).get(item_id, {}))
+        for field, delta in self._pending.get(table, {}).get(item_id, {}).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        return deltas
+
+    def _merge(self, table: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add pending deltas to records read from the backend (in place)"""
+        if not self._pending.get(table) and not self._flushing.get(table):
+            return items
+        minimum = self._minimum.get(table, {})
+        with self._lock:
+            for item in items:
+                if item is None or 'id' not in item:
+                    continue
+                for field, delta in self._deltas(table, item['id']).items():
+                    if field in item:
+                        value = (item[field] or 0) + delta
+                        item[field] = value if field not in minimum else max(minimum[field], value)
+        return items
+
+    def _merge_one(self, table: str, item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return self._merge(table, [item])[0]
+
+    def increment(self, table: str, item_id: int, field: str, delta: int = 1,
+                  minimum: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Buffer delta for a numeric field and return the item as it will read, or None if missing.
+
+        Only the item lookup touches the backend; nothing is written until
+        the next flush.
+        """
+        with self._reading(table):
+            item = self.database.read(table, item_id)
+            if item is None:
+                return None
+            with self._lock:
+                if minimum is not None:
+                    self._minimum.setdefault(table, {})[field] = minimum
+                fields = self._pending.setdefault(table, {}).setdefault(item_id, {})
+                fields[field] = fields.get(field, 0) + delta
+            return self._merge_one(table, item)
+
+    def flush(self, tables: Optional[Iterable[str]] = None) -> int:
+        """Write the pending deltas (of the given tables, or all), one batch per table.
+
+        Returns the number of items changed.
+        """
+        with self._flush_lock:
+            with self._lock:
+                names = list(self._pending) if tables is None else [table for table in tables if table in self._pending]
+                for table in names:
+                    # Deltas that cancelled out (like, then unlike) need no write
+                    self._flushing[table] = {
+                        item_id: {field: delta for field, delta in fields.items() if delta}
+                        for item_id, fields in self._pending.pop(table).items() if any(fields.values())
+                    }
+            changed = 0
+            for position, table in enumerate(names):
+                try:
+                    with self._table_lock(table).write():
+                        deltas = self._flushing[table]
+                        if deltas:
+                            changed += self.database.increment_many(table, deltas, self._minimum.get(table))
+                        with self._lock:
+                            del self._flushing[table]
+                except Exception:
+                    # Keep the unwritten deltas for the next attempt
+                    with self._lock:
+                        for unwritten in names[position:]:
+                            for item_id, fields in self._flushing.pop(unwritten, {}).items():
+                                pending = self._pending.setdefault(unwritten, {}).setdefault(item_id, {})
+                                for field, delta in fields.items():
+                                    pending[field] = pending.get(field, 0) + delta
+                    raise
+            return changed
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Counter flush failed, retrying: {e}")
+
+    def start(self):
+        """Start the periodic flush thread"""
+        if self._thread is None and self.interval > 0:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def compact(self, table: Optional[str] = None):
+        self.flush()
+        return self.database.compact(table)
+
+    @contextmanager
+    def transaction(self):
+        tx = Transaction()
+        yield tx
+        self.commit(tx)
+
+    def commit(self, tx: Transaction):
+        # Increments with a minimum are clamped against the stored value, so it must be current
+        self.flush({operation[1] for operation in tx.operations})
+        return self.database.commit(tx)
+
+    # Reads merge in the pending deltas
+
+    def read(self, table: str, item_id: int) -> Optional[Dict[str, Any]]:
+        with self._reading(table):
+            return self._merge_one(table, self.database.read(table, item_id))
+
+    def read_all(self, table: str) -> List[Dict[str, Any]]:
+        with self._reading(table):
+            return self._merge(table, self.database.read_all(table))
+
+    def update(self, table: str, item_id: int, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._reading(table):
+            return self._merge_one(table, self.database.update(table, item_id, updates))
+
+    def find_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        self._flush_if_used(table, field)
+        with self._reading(table):
+            return self._merge(table, self.database.find_by_field(table, field, value))
+
+    def find_one_by_field(self, table: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        self._flush_if_used(table, field)
+        with self._reading(table):
+            return self._merge_one(table, self.database.find_one_by_field(table, field, value))
+
+    def find_by_fields(self, table: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self._flush_if_used(table, criteria)
+        with self._reading(table):
+            return self._merge(table, self.database.find_by_fields(table, criteria))
+
+    def find_one_by_fields(self, table: str, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        self._flush_if_used(table, criteria)
+        with self._reading(table):
+            return self._merge_one(table, self.database.find_one_by_fields(table, criteria))
+
+    def exists(self, table: str, criteria: Dict[str, Any]) -> bool:
+        self._flush_if_used(table, criteria)
+        return self.database.exists(table, criteria)
+
+    def query(self, table: str, where: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+              order_by: Any = None, limit: Optional[int] = None, offset: int = 0,
+              after: Any = None) -> List[Dict[str, Any]]:
+        self._flush_if_used(table, where, order_by)
+        with self._reading(table):
+            return self._merge(table, self.database.query(table, where, fields, order_by, limit, offset, after))
+
+    def facets(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[Any, int]]:
+        self._flush_if_used(table, fields, where)
+        return self.database.facets(table, fields, where)
+
+    def find_in_range(self, table: str, field: str, start: Any = None, end: Any = None,
+                      criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self._flush_if_used(table, field, criteria)
+        with self._reading(table):
+            return self._merge(table, self.database.find_in_range(table, field, start, end, criteria))
+
+    def select_columns(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None,
+                       ranges: Optional[Dict[str, tuple]] = None) -> Optional[Dict[str, Any]]:
+        self._flush_if_used(table, fields, where, ranges)
+        return self.database.select_columns(table, fields, where, ranges)
+
+    def search(self, table: str, search_term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        with self._reading(table):
+            return self._merge(table, self.database.search(table, search_term, fields))
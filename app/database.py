@@ -1,125 +1,1984 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import gc
+import itertools
 import json
 import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from app.config import settings
+from app.changes import ChangeEvent, ChangeFeed, ChangeHub
+from app.metrics import metrics
 
-class JSONDatabase:
+
+class JSONCodec:
+    """Standard library codec writing compact UTF-8 JSON"""
+    
+    name = 'json'
+    decode_errors: tuple = (ValueError,)
+    
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=str, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson codec; same output as JSONCodec, several times faster"""
+    
+    name = 'orjson'
+    
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self.decode_errors = (orjson.JSONDecodeError,)
+    
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value, default=str, option=self._orjson.OPT_NON_STR_KEYS)
+    
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """msgspec codec; same output as JSONCodec, several times faster"""
+    
+    name = 'msgspec'
+    
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=str)
+        self._decoder = msgspec.json.Decoder()
+        self.decode_errors = (msgspec.DecodeError,)
+    
+    def dumps(self, value: Any) -> bytes:
+        return self._encoder.encode(value)
+    
+    def loads(self, data: bytes) -> Any:
+        return self._decoder.decode(data)
+
+
+CODECS = {'orjson': OrjsonCodec, 'msgspec': MsgspecCodec, 'json': JSONCodec}
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """Codec selected by name (default settings.json_codec).
+    
+    "auto" picks the fastest installed one; a codec whose package is not
+    installed falls back to the standard library.
+    """
+    name = name or settings.json_codec
+    if name != 'auto' and name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name!r}")
+    for candidate in (list(CODECS) if name == 'auto' else [name]):
+        try:
+            return CODECS[candidate]()
+        except ImportError:
+            continue
+    return JSONCodec()
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend the cyclic garbage collector while parsing large acyclic documents.
+    
+    Decoding allocates millions of containers, which would otherwise trigger
+    repeated full collections that roughly double the parse time.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _clone(value: Any) -> Any:
+    """Copy a JSON-compatible value so callers never share state with the cache"""
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value
+
+
+class ReadWriteLock:
+    """In-process lock allowing many readers or one writer.
+    
+    The writing thread may re-enter the lock, for reading or writing. Readers
+    must not try to upgrade to a write lock.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._condition:
+            owner = self._writer == me
+            if owner:
+                self._writer_depth += 1
+            else:
+                while self._writer is not None or self._writers_waiting:
+                    self._condition.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                if owner:
+                    self._writer_depth -= 1
+                else:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._condition.notify_all()
+    
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._writers_waiting -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class DuplicateKeyError(ValueError):
+    """Raised when a write would break a unique index"""
+
+    def __init__(self, table: str, fields: tuple, key: Any):
+        self.table = table
+        self.fields = fields
+        self.key = key
+        super().__init__(f"Duplicate value {key!r} for unique index {table}({', '.join(fields)})")
+
+
+class SealedSegmentError(ValueError):
+    """Raised when a write targets a past month's segment of a partitioned table"""
+
+    def __init__(self, table: str, key: str):
+        self.table = table
+        self.key = key
+        super().__init__(f"Segment {key} of {table} is sealed")
+
+
+class Index:
+    """Declarative secondary index over one or more fields of a table.
+    
+    A casefold index keys lowercased strings and serves "__ieq" lookups
+    (and facet counts) instead of exact equality. A multi index is over a
+    list field and files the record under each of its elements.
+    """
+
+    def __init__(self, *fields: str, unique: bool = False, casefold: bool = False, multi: bool = False):
+        self.fields = fields
+        self.unique = unique
+        self.casefold = casefold
+        self.multi = multi
+        # Where the index lives among a table's indexes; casefold ones never
+        # answer exact lookups on the same fields
+        self.slot = ('ieq',) + fields if casefold else fields
+
+    def key(self, item: Dict[str, Any]) -> Any:
+        """Index key of a record: the field value, or a tuple for composite indexes"""
+        if len(self.fields) == 1:
+            return self._fold(item.get(self.fields[0]))
+        return tuple(self._fold(item.get(field)) for field in self.fields)
+
+    def keys(self, item: Dict[str, Any]) -> List[Any]:
+        """Every key a record is filed under: one per element for multi indexes"""
+        if self.multi:
+            values = item.get(self.fields[0])
+            if not isinstance(values, list):
+                values = [] if values is None else [values]
+            return list(dict.fromkeys(self._fold(value) for value in values if _hashable(value)))
+        key = self.key(item)
+        return [key] if _hashable(key) else []
+
+    def _fold(self, value: Any) -> Any:
+        return value.lower() if self.casefold and isinstance(value, str) else value
+
+
+# Tables every storage backend provides
+TABLES = [
+    'users', 'courses', 'tutorials', 'articles', 'quizzes',
+    'enrollments', 'completions', 'bookmarks', 'likes', 'quiz_attempts',
+]
+
+# Secondary indexes maintained for each table; find_by_field uses them automatically
+TABLE_INDEXES: Dict[str, List[Index]] = {
+    'users': [Index('email', unique=True), Index('username', unique=True)],
+    'enrollments': [Index('user_id'), Index('course_id'), Index('user_id', 'course_id', unique=True)],
+    'completions': [Index('user_id'), Index('tutorial_id'), Index('user_id', 'tutorial_id', unique=True)],
+    'bookmarks': [Index('user_id'), Index('article_id'), Index('user_id', 'article_id', unique=True)],
+    'likes': [Index('user_id'), Index('article_id'), Index('user_id', 'article_id', unique=True)],
+    # Quizzes can be retaken, so (user_id, quiz_id) is a lookup index only
+    'quiz_attempts': [Index('user_id'), Index('quiz_id'), Index('user_id', 'quiz_id')],
+    # Case-insensitive filters and facets of the list endpoints
+    'courses': [Index('category', casefold=True), Index('level', casefold=True)],
+    'tutorials': [Index('category', casefold=True), Index('level', casefold=True)],
+    'quizzes': [Index('category', casefold=True), Index('difficulty', casefold=True)],
+    'articles': [Index('tags', casefold=True, multi=True), Index('author', casefold=True)],
+}
+
+# Tables stored as monthly segments, keyed on a timestamp field (created_at
+# when the field is missing). Range queries on that field skip whole segments.
+TABLE_PARTITIONS: Dict[str, str] = {
+    'quiz_attempts': 'completed_at',
+}
+
+_MONTH = re.compile(r'^\d{4}-\d{2}')
+
+
+def _partition_key(value: Any) -> Optional[str]:
+    """Monthly segment key ('YYYY-MM') of an ISO timestamp, or None"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    if isinstance(value, str) and _MONTH.match(value):
+        return value[:7]
+    return None
+
+
+def _hashable(key: Any) -> bool:
+    try:
+        hash(key)
+    except TypeError:
+        return False
+    return True
+
+
+def _ordered(test):
+    """Wrap an ordering comparison so None and mismatched types never match"""
+    def compare(value, operand):
+        try:
+            return value is not None and test(value, operand)
+        except TypeError:
+            return False
+    return compare
+
+
+# Operators usable in query(where=...) lookups such as "title__icontains".
+# Case-insensitive operands are lower-cased once when the query is parsed.
+QUERY_OPERATORS = {
+    'eq': lambda value, operand: value == operand,
+    'ne': lambda value, operand: value != operand,
+    'lt': _ordered(lambda value, operand: value < operand),
+    'lte': _ordered(lambda value, operand: value <= operand),
+    'gt': _ordered(lambda value, operand: value > operand),
+    'gte': _ordered(lambda value, operand: value >= operand),
+    'in': lambda value, operand: _hashable(value) and value in operand,
+    'ieq': lambda value, operand: isinstance(value, str) and value.lower() == operand,
+    'contains': lambda value, operand: isinstance(value, str) and operand in value,
+    'icontains': lambda value, operand: isinstance(value, str) and operand in value.lower(),
+}
+
+
+def parse_lookup(key: str, operand: Any) -> tuple:
+    """Split a query lookup "field1|field2__op" into (fields, op, operand)"""
+    spec, _, op = key.rpartition('__') if '__' in key else (key, '', 'eq')
+    if op not in QUERY_OPERATORS:
+        raise ValueError(f"Unknown query operator: {op!r}")
+    if op in ('ieq', 'icontains') and isinstance(operand, str):
+        operand = operand.lower()
+    if op == 'in':
+        operand = set(operand)
+    return tuple(spec.split('|')), op, operand
+
+
+def _facet_key(value: Any) -> Any:
+    """Facet values are grouped case-insensitively, like __ieq lookups match"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def _lookup_matches(item: Dict[str, Any], fields: tuple, op: str, operand: Any) -> bool:
+    """A lookup holds if any of its fields satisfies it; on a list field, if any element does"""
+    test = QUERY_OPERATORS[op]
+    for field in fields:
+        value = item.get(field)
+        if test(value, operand):
+            return True
+        if isinstance(value, list) and any(test(element, operand) for element in value):
+            return True
+    return False
+
+
+def sort_rows(rows: List[Dict[str, Any]], order_by: List[str]) -> List[Dict[str, Any]]:
+    """Sort rows by field names ("-field" for descending), missing values last"""
+    rows = list(rows)
+    for key in reversed(order_by):
+        field, descending = key.lstrip('-'), key.startswith('-')
+        if descending:
+            rows.sort(key=lambda item: (item.get(field) is not None, item.get(field)), reverse=True)
+        else:
+            rows.sort(key=lambda item: (item.get(field) is None, item.get(field)))
+    return rows
+
+
+def project_row(item: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Copy of a record holding only the requested fields (all of them by default)"""
+    if fields is None:
+        return _clone(item)
+    return {field: _clone(item[field]) for field in fields if field in item}
+
+class Transaction:
+    """Mutations staged across tables and committed together.
+    
+    Returned by db.transaction(): create/update/increment/delete only record
+    the operation; everything is applied in order when the with block exits
+    without an exception, or not at all. Created items get their id and
+    timestamps at commit. Updates, increments and deletes of missing rows
+    are skipped, as with the single-row methods.
+    """
+    
     def __init__(self):
-        self.data_dir = settings.data_dir
+        self.operations: List[tuple] = []
+    
+    def create(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        self.operations.append(('create', table, item))
+        return item
+    
+    def update(self, table: str, item_id: int, updates: Dict[str, Any]):
+        self.operations.append(('update', table, item_id, dict(updates)))
+    
+    def increment(self, table: str, item_id: int, field: str, delta: int = 1, minimum: Optional[int] = None):
+        self.operations.append(('increment', table, item_id, field, delta, minimum))
+    
+    def delete(self, table: str, item_id: int):
+        self.operations.append(('delete', table, item_id))
+
+class JSONDatabase:
+    def __init__(self, data_dir: Optional[str] = None, indexes: Optional[Dict[str, List[Index]]] = None,
+                 partitions: Optional[Dict[str, str]] = None, codec: Optional[JSONCodec] = None,
+                 read_only: bool = False):
+        self.data_dir = data_dir or settings.data_dir
+        # Read-only instances (exports, migrations) never create or rewrite a
+        # file: no initial files, legacy split, lock files, sequences or writes
+        self.read_only = read_only
+        # Serializer for snapshots and log records
+        self.codec = codec or get_codec()
         self.files = {
-            'users': os.path.join(self.data_dir, 'users.json'),
-            'courses': os.path.join(self.data_dir, 'courses.json'),
-            'tutorials': os.path.join(self.data_dir, 'tutorials.json'),
-            'articles': os.path.join(self.data_dir, 'articles.json'),
-            'quizzes': os.path.join(self.data_dir, 'quizzes.json'),
-            'enrollments': os.path.join(self.data_dir, 'enrollments.json'),
-            'completions': os.path.join(self.data_dir, 'completions.json'),
-            'bookmarks': os.path.join(self.data_dir, 'bookmarks.json'),
-            'likes': os.path.join(self.data_dir, 'likes.json'),
-            'quiz_attempts': os.path.join(self.data_dir, 'quiz_attempts.json'),
+            table: os.path.join(self.data_dir, f'{table}.json')
+            for table in TABLES
+        }
+        # Append-only mutation logs replayed on top of each JSON snapshot
+        self.logs = {
+            table: os.path.splitext(path)[0] + '.log'
+            for table, path in self.files.items()
+        }
+        # Advisory lock files coordinating writers across worker processes
+        self.lock_files = {
+            table: os.path.splitext(path)[0] + '.lock'
+            for table, path in self.files.items()
         }
+        self._lock_handles: Dict[str, Any] = {}
+        self._file_lock_depth: Dict[str, int] = {}
+        # Persisted next-ID counters, one small file per table
+        self.sequences = {
+            table: os.path.splitext(path)[0] + '.seq'
+            for table, path in self.files.items()
+        }
+        self._sequences_checked = set()
+        # Parsed tables kept resident between requests, keyed by table name.
+        # Each table is an insertion-ordered id -> record dict, which doubles
+        # as the primary-key index for point lookups.
+        self._rows: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        # Secondary indexes: table -> fields -> key -> {id: record}
+        self.indexes: Dict[str, List[Index]] = {
+            table: list(declared)
+            for table, declared in (TABLE_INDEXES if indexes is None else indexes).items()
+        }
+        self._indexes: Dict[str, Dict[tuple, Dict[Any, Dict[Any, Dict[str, Any]]]]] = {}
+        self._cache_stamps: Dict[str, Optional[tuple]] = {}
+        self._log_positions: Dict[str, tuple] = {}
+        self._log_entries: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {table: 0 for table in self.files}
+        # Bumped only when a load brings in records this instance did not write
+        # (another worker's appends or snapshot), unlike _versions
+        self._external: Dict[str, int] = {}
+        # Bumped whenever cached rows change other than by appending, so derived
+        # data (columnar snapshots) can tell an append-only tail from a rewrite
+        self._rewrites: Dict[str, int] = {}
+        self._columns = None
+        # Sorted primary keys per table for keyset pagination: (marker, ids),
+        # with the marker as in column_source()
+        self._id_order: Dict[str, tuple] = {}
+        # One lock per physical table, so writes (and their fsyncs) only
+        # block readers of the same table. Several are taken in name order.
+        self._locks: Dict[str, ReadWriteLock] = {}
+        self._locks_guard = threading.Lock()
+        # Leaf locks: nothing else is acquired while holding them
+        self._sequence_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        # Partitioned tables keep their rows in data/<table>/<YYYY-MM>.json
+        # segments, registered as tables named '<table>/<YYYY-MM>'; the
+        # plain <table>.json file stays empty once legacy rows are split out
+        self.partitions = dict(TABLE_PARTITIONS if partitions is None else partitions)
+        self._segment_lock = threading.Lock()
+        # Commit markers of multi-table transactions; log records tagged with
+        # a transaction ID only count once its marker is here
+        self.journal = os.path.join(self.data_dir, '_transactions.log')
+        self._committed: set = set()
+        self._journal_position: tuple = (None, 0)
+        # Change events for in-process subscribers and, when enabled, the
+        # durable feed in data/_changes/ tailed by other workers. Events are
+        # staged per thread and published once their write is durable.
+        feed = None
+        if settings.change_feed and not read_only:
+            feed = ChangeFeed(os.path.join(self.data_dir, '_changes'), self.codec)
+        self.changes = ChangeHub(feed)
+        self._events = threading.local()
+        if read_only:
+            return
         self._initialize_files()
+        for table in self.partitions:
+            self._split_legacy(table)
     
     def _initialize_files(self):
         """Initialize JSON files with empty data if they don't exist"""
         for file_path in self.files.values():
-            if not os.path.exists(file_path):
-                with open(file_path, 'w') as f:
+            try:
+                with open(file_path, 'x') as f:
                     json.dump([], f)
+            except FileExistsError:
+                pass
+        for table in self.partitions:
+            os.makedirs(os.path.join(self.data_dir, table), exist_ok=True)
+    
+    def _register_segment(self, table: str, key: str) -> str:
+        """Register the segment of a partitioned table for a month and return its name"""
+        name = f'{table}/{key}'
+        with self._segment_lock:
+            if name not in self.files:
+                base = os.path.join(self.data_dir, table, key)
+                self.logs[name] = base + '.log'
+                self.lock_files[name] = base + '.lock'
+                self.indexes[name] = self.indexes.setdefault(table, [])
+                self._versions[name] = 0
+                self.files[name] = base + '.json'
+        return name
+    
+    def _register_legacy(self, table: str) -> str:
+        """Register a partitioned table's unsplit plain file as an extra part"""
+        name = f'{table}/legacy'
+        with self._segment_lock:
+            if name not in self.files:
+                self.logs[name] = self.logs[table]
+                self.lock_files[name] = self.lock_files[table]
+                self.indexes[name] = self.indexes.setdefault(table, [])
+                self._versions[name] = 0
+                self.files[name] = self.files[table]
+        return name
+    
+    def _parts(self, table: str, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Physical tables holding a table's rows, oldest segment first.
+        
+        A plain table is its own single part. For a partitioned table the
+        segment directory is listed on every call, so segments created by other
+        processes are picked up; start/end prune segments outside the range.
+        Read-only instances, which do not split legacy rows out, also read the
+        plain file as a '<table>/legacy' part.
+        """
+        if table not in self.partitions:
+            return [table] if table in self.files else []
+        legacy = [self._register_legacy(table)] if self.read_only else []
+        try:
+            names = os.listdir(os.path.join(self.data_dir, table))
+        except FileNotFoundError:
+            return legacy
+        first, last = _partition_key(start), _partition_key(end)
+        keys = sorted(
+            name[:-5] for name in names
+            if name.endswith('.json') and _partition_key(name)
+        )
+        return legacy + [
+            self._register_segment(table, key) for key in keys
+            if (first is None or key >= first) and (last is None or key <= last)
+        ]
+    
+    def _part_for(self, table: str, item: Dict[str, Any], now: str, sealed: bool = False) -> str:
+        """Physical table a new record belongs in, creating its segment file if needed.
+        
+        A record of a past month raises SealedSegmentError unless sealed is
+        set (moving legacy rows into their segments).
+        """
+        if table not in self.partitions:
+            return table
+        field = self.partitions[table]
+        key = _partition_key(item.get(field)) or _partition_key(item.get('created_at')) or now[:7]
+        name = self._register_segment(table, key)
+        if not sealed:
+            self._check_writable(name)
+        try:
+            with open(self.files[name], 'x') as f:
+                json.dump([], f)
+        except FileExistsError:
+            pass
+        return name
+    
+    def _part_holding(self, table: str, item_id: Any) -> Optional[str]:
+        """Physical table holding a row, searching segments newest first"""
+        if table not in self.partitions:
+            return table
+        for part in reversed(self._parts(table)):
+            if item_id in self._load_rows(part):
+                return part
+        return None
+    
+    def _check_writable(self, part: str):
+        """Segments of past months are immutable: no creates, updates, increments or deletes"""
+        table, _, key = part.partition('/')
+        if key and key < datetime.now().strftime('%Y-%m'):
+            raise SealedSegmentError(table, key)
+    
+    def _split_legacy(self, table: str):
+        """Move rows stored in a partitioned table's plain file into monthly segments.
+        
+        Creating a row twice is harmless on replay, so an interrupted split is
+        simply redone on the next start.
+        """
+        with self._writing(table):
+            rows = self._cached_rows(table)
+            if not rows:
+                return
+            now = datetime.now().isoformat()
+            batches: Dict[str, List[Dict[str, Any]]] = {}
+            for item in rows.values():
+                batches.setdefault(self._part_for(table, item, now, sealed=True), []).append(item)
+            for part, items in batches.items():
+                with self._writing(part):
+                    segment = self._cached_rows(part)
+                    for item in items:
+                        if item.get('id') in segment:
+                            self._index_remove(part, segment[item.get('id')])
+                        segment[item.get('id')] = _clone(item)
+                        self._index_add(part, segment[item.get('id')])
+                    self._append_log(part, *({'op': 'create', 'item': item} for item in items))
+            rows.clear()
+            self._rewritten(table)
+            self._build_indexes(table)
+            self._save_data(table)
+    
+    def _table_lock(self, table: str) -> ReadWriteLock:
+        lock = self._locks.get(table)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(table, ReadWriteLock())
+        return lock
+    
+    @contextmanager
+    def _file_lock(self, table: str, exclusive: bool):
+        """Hold the cross-process advisory lock of a table.
+        
+        Only called with the table's in-process write lock held, so one handle
+        per table is enough and nested calls simply re-enter.
+        """
+        if fcntl is None or self._file_lock_depth.get(table):
+            self._file_lock_depth[table] = self._file_lock_depth.get(table, 0) + 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth[table] -= 1
+            return
+        
+        handle = self._lock_handles.get(table)
+        if handle is None:
+            try:
+                handle = open(self.lock_files[table], 'r' if self.read_only else 'a')
+            except FileNotFoundError:
+                # Read-only and no writer ever ran here: nothing to exclude
+                handle = None
+            self._lock_handles[table] = handle
+        if handle is None:
+            self._file_lock_depth[table] = 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth[table] = 0
+            return
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._file_lock_depth[table] = 1
+        try:
+            yield
+        finally:
+            self._file_lock_depth[table] = 0
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    
+    @contextmanager
+    def _writing(self, table: str):
+        """Exclusive access to a table for this thread and this process.
+        
+        Writers in other processes are excluded through the table's lock file,
+        and the table is refreshed from disk first so their changes are seen.
+        """
+        self._check_read_only()
+        with self._table_lock(table).write(), self._file_lock(table, exclusive=True):
+            self._load_rows(table)
+            yield
+    
+    def _check_read_only(self):
+        if self.read_only:
+            raise PermissionError(f"{self.data_dir} is opened read-only")
+    
+    @contextmanager
+    def _reading(self, table: str):
+        """Refresh a table if it changed on disk, then hold the read lock"""
+        self._load_rows(table)
+        with self._table_lock(table).read():
+            yield
+    
+    def _cached_rows(self, table: str) -> Dict[Any, Dict[str, Any]]:
+        """Cached rows of a table; callers hold the lock and loaded it already"""
+        return self._rows.get(table, {})
+    
+    def _file_stamp(self, path: str) -> Optional[tuple]:
+        """Identify the on-disk state of a file (None if it is missing)"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def _read_log(self, table: str, offset: int) -> tuple:
+        """Read complete log records starting at a byte offset.
+        
+        Returns the records and the offset just past the last complete line, so
+        a record that is still being appended is picked up on the next load.
+        """
+        try:
+            with open(self.logs[table], 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], offset
+        
+        end = chunk.rfind(b'\n') + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(self.codec.loads(line))
+            except self.codec.decode_errors:
+                continue
+        return records, offset + end
+    
+    def _index_add(self, table: str, item: Dict[str, Any]):
+        """Add a record to every secondary index of its table"""
+        for index in self.indexes.get(table, []):
+            entries = self._indexes[table][index.slot]
+            for key in index.keys(item):
+                entries.setdefault(key, {})[item.get('id')] = item
+    
+    def _index_remove(self, table: str, item: Dict[str, Any]):
+        """Remove a record from every secondary index of its table"""
+        for index in self.indexes.get(table, []):
+            entries = self._indexes[table][index.slot]
+            for key in index.keys(item):
+                if key not in entries:
+                    continue
+                entries[key].pop(item.get('id'), None)
+                if not entries[key]:
+                    del entries[key]
+    
+    def _check_unique(self, table: str, item: Dict[str, Any], item_id: Any = None):
+        """Raise DuplicateKeyError if the record clashes with another row on a unique index"""
+        for index in self.indexes.get(table, []):
+            if not index.unique:
+                continue
+            key = index.key(item)
+            if key is None or (isinstance(key, tuple) and None in key) or not _hashable(key):
+                continue
+            holders = self._indexes[table][index.slot].get(key, {})
+            if any(holder != item_id for holder in holders):
+                raise DuplicateKeyError(table, index.fields, key)
+    
+    def _build_indexes(self, table: str):
+        """Rebuild the secondary indexes of a table from its cached rows"""
+        self._indexes[table] = {index.slot: {} for index in self.indexes.get(table, [])}
+        if self._indexes[table]:
+            with metrics.timed('index_build', table):
+                for item in self._rows[table].values():
+                    self._index_add(table, item)
+    
+    def create_index(self, table: str, index: Index):
+        """Declare an extra secondary index at runtime and build it"""
+        parts = sorted(set(self._parts(table) + [table]))
+        with ExitStack() as stack:
+            for part in parts:
+                stack.enter_context(self._table_lock(part).write())
+            self.indexes.setdefault(table, []).append(index)
+            for part in parts:
+                if part in self._rows:
+                    self._build_indexes(part)
+    
+    def _replay(self, table: str, records: List[Dict[str, Any]]):
+        """Apply log records to a cached table in place; replaying a record twice is harmless"""
+        rows = self._rows[table]
+        for record in records:
+            if 'tx' in record and not self._is_committed(record['tx']):
+                # Left behind by a transaction that died before committing
+                continue
+            op = record.get('op')
+            if op == 'create':
+                item = record['item']
+                if item.get('id') in rows:
+                    self._index_remove(table, rows[item.get('id')])
+                    self._rewritten(table)
+                rows[item.get('id')] = item
+                self._index_add(table, item)
+            elif op == 'update':
+                item = rows.get(record['id'])
+                if item is not None:
+                    self._index_remove(table, item)
+                    item.update(record['changes'])
+                    self._index_add(table, item)
+                    self._rewritten(table)
+            elif op == 'delete':
+                item = rows.pop(record['id'], None)
+                if item is not None:
+                    self._index_remove(table, item)
+                    self._rewritten(table)
+    
+    def _rewritten(self, table: str):
+        self._rewrites[table] = self._rewrites.get(table, 0) + 1
     
     def _load_data(self, table: str) -> List[Dict[str, Any]]:
-        """Load data from JSON file"""
+        """Load all records of a table in insertion order"""
+        return list(self._load_rows(table).values())
+    
+    def _load_rows(self, table: str) -> Dict[Any, Dict[str, Any]]:
+        """Load a table from its JSON snapshot plus mutation log.
+        
+        The parsed table stays cached until the snapshot changes on disk; growth
+        of the log only replays the new records. The returned dict is the live
+        cache entry: only JSONDatabase itself may mutate it, public readers hand
+        out copies.
+        """
         if table not in self.files:
-            return []
+            return {}
+        if self._is_current(table):
+            return self._rows[table]
         
-        try:
-            with open(self.files[table], 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        with self._table_lock(table).write(), self._file_lock(table, exclusive=False):
+            stamp = self._file_stamp(self.files[table])
+            log_stamp = self._file_stamp(self.logs[table])
+            log_inode = log_stamp[2] if log_stamp else None
+            log_size = log_stamp[1] if log_stamp else 0
+            
+            if table in self._rows and self._cache_stamps.get(table) == stamp:
+                cached_inode, offset = self._log_positions[table]
+                if cached_inode == log_inode and offset == log_size:
+                    return self._rows[table]
+                if cached_inode == log_inode and offset < log_size:
+                    with metrics.timed('log_replay', table) as timing:
+                        timing['bytes'] = log_size - offset
+                        records, offset = self._read_log(table, offset)
+                        if records:
+                            self._replay(table, records)
+                            self._log_entries[table] += len(records)
+                            self._versions[table] += 1
+                            self._external[table] = self._external.get(table, 0) + 1
+                    self._log_positions[table] = (log_inode, offset)
+                    return self._rows[table]
+            
+            # Snapshots are replaced atomically, so a file that fails to parse
+            # is genuinely corrupt; raise instead of treating it as empty
+            with metrics.timed('load', table) as timing:
+                try:
+                    with open(self.files[table], 'rb') as f:
+                        raw = f.read()
+                    with _gc_paused():
+                        data = self.codec.loads(raw) if raw.strip() else []
+                except FileNotFoundError:
+                    raw, data = b'', []
+                records, offset = self._read_log(table, 0)
+                timing['bytes'] = len(raw) + offset
+                self._rows[table] = {item.get('id'): item for item in data}
+                self._rewritten(table)
+                self._build_indexes(table)
+                self._replay(table, records)
+            
+            self._cache_stamps[table] = stamp
+            self._log_positions[table] = (log_inode, offset)
+            self._log_entries[table] = len(records)
+            self._versions[table] += 1
+            self._external[table] = self._external.get(table, 0) + 1
+            return self._rows[table]
+    
+    def _is_current(self, table: str) -> bool:
+        """Check, without locking, whether the cached table matches the files on disk"""
+        if table not in self._rows:
+            return False
+        log_stamp = self._file_stamp(self.logs[table])
+        log_position = (log_stamp[2], log_stamp[1]) if log_stamp else (None, 0)
+        return (
+            self._cache_stamps.get(table) == self._file_stamp(self.files[table])
+            and self._log_positions.get(table) == log_position
+        )
     
-    def _save_data(self, table: str, data: List[Dict[str, Any]]):
-        """Save data to JSON file"""
+    def _append_log(self, table: str, *records: Dict[str, Any], commit: bool = True):
+        """Append mutation records to the table log in one write; cost is O(records).
+        
+        The write commits the records: snapshot compaction may follow and
+        staged change events are published. Transactions pass commit=False
+        and do both only after their commit marker.
+        """
+        line = b''.join(self.codec.dumps(record) + b'\n' for record in records)
+        inode, offset = self._log_positions[table]
+        
+        with metrics.timed('append', table) as timing, open(self.logs[table], 'a+b') as f:
+            timing['bytes'] = len(line)
+            size = f.seek(0, os.SEEK_END)
+            if size > offset:
+                f.seek(offset)
+                if b'\n' not in f.read():
+                    # Drop a torn record left behind by an interrupted append
+                    f.truncate(offset)
+                    size = offset
+            f.write(line)
+            f.flush()
+            if settings.wal_fsync:
+                os.fsync(f.fileno())
+            inode = os.fstat(f.fileno()).st_ino
+        
+        # If another writer appended first, keep the old offset so the next
+        # load replays their records together with this one
+        if size == offset:
+            self._log_positions[table] = (inode, offset + len(line))
+            self._log_entries[table] += len(records)
+            self._versions[table] += 1
+            if commit:
+                self._maybe_compact(table)
+        if commit:
+            self._publish_events()
+    
+    def _maybe_compact(self, table: str):
+        if self._log_entries[table] >= settings.wal_compaction_threshold:
+            self._save_data(table)
+    
+    def _save_data(self, table: str):
+        """Write a full JSON snapshot of the cached table and truncate its log"""
         if table not in self.files:
             return
         
-        with open(self.files[table], 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        with self._writing(table), metrics.timed('save', table) as timing:
+            path = self.files[table]
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                raw = self.codec.dumps(list(self._rows[table].values()))
+                timing['bytes'] = len(raw)
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            # The snapshot now holds every logged mutation, so the log can go;
+            # a crash before this point only means records are replayed twice
+            with open(self.logs[table], 'wb'):
+                pass
+            
+            self._cache_stamps[table] = self._file_stamp(path)
+            log_stamp = self._file_stamp(self.logs[table])
+            self._log_positions[table] = (log_stamp[2] if log_stamp else None, 0)
+            self._log_entries[table] = 0
+            self._versions[table] += 1
+    
+    def compact(self, table: Optional[str] = None):
+        """Fold mutation logs into their snapshots (all tables by default)"""
+        if table:
+            tables = self._parts(table)
+        else:
+            tables = [part for name in list(self.files) if '/' not in name for part in self._parts(name)]
+        for name in tables:
+            with self._writing(name):
+                if self._log_entries.get(name):
+                    self._save_data(name)
+        if not table:
+            self._checkpoint_journal(tables)
+    
+    def get_version(self, table: str) -> int:
+        """Return a counter that changes whenever the table is reloaded or written"""
+        if table in self.partitions:
+            return sum(self.get_version(part) for part in self._parts(table))
+        self._load_rows(table)
+        return self._versions.get(table, 0)
+    
+    def external_version(self, table: str) -> int:
+        """Return a counter that changes only when the table picks up rows written elsewhere.
+        
+        This instance's own writes leave it alone (their change events already
+        reach subscribers); reloads and log replays of other workers' writes
+        bump it, so derived state knows when it must be rebuilt.
+        """
+        if table in self.partitions:
+            return sum(self.external_version(part) for part in self._parts(table))
+        self._load_rows(table)
+        return self._external.get(table, 0)
+    
+    def reserve_ids(self, table: str, count: int = 1) -> range:
+        """Reserve a block of consecutive IDs for a table.
+        
+        The next ID is persisted in data/<table>.seq under an exclusive file
+        lock, so IDs are never handed out twice, even across processes, and
+        are not reused after the highest row is deleted. The first call for a
+        table in a process loads all its parts, so callers holding table locks
+        run _prepare_ids first.
+        """
+        self._check_read_only()
+        # The first allocation in a process also covers rows written before
+        # the sequence existed or before its last write hit disk. The rows are
+        # loaded before the sequence lock, which is never held while waiting
+        # on a table lock
+        highest = 0 if table in self._sequences_checked else self._highest_id(table)
+        with self._sequence_lock:
+            with open(self.sequences[table], 'a+') as f:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                f.seek(0)
+                raw = f.read().strip()
+                next_id = max(int(raw) if raw.isdigit() else 1, highest + 1)
+                self._sequences_checked.add(table)
+                
+                f.seek(0)
+                f.truncate()
+                f.write(str(next_id + count))
+                f.flush()
+                if settings.wal_fsync:
+                    os.fsync(f.fileno())
+            return range(next_id, next_id + count)
+    
+    def _highest_id(self, table: str) -> int:
+        return max(
+            (key for part in self._parts(table) for key in self._load_rows(part) if isinstance(key, int)),
+            default=0
+        )
+    
+    def peek_next_id(self, table: str) -> int:
+        """The ID the next create in a table would get, without reserving it"""
+        try:
+            with open(self.sequences[table]) as f:
+                raw = f.read().strip()
+        except FileNotFoundError:
+            raw = ''
+        return max(int(raw) if raw.isdigit() else 1, self._highest_id(table) + 1)
+    
+    def _prepare_ids(self, table: str):
+        """Do a table's first-allocation check before its locks are taken"""
+        if table not in self._sequences_checked:
+            self.reserve_ids(table, 0)
     
     def _get_next_id(self, table: str) -> int:
         """Get next available ID for a table"""
-        data = self._load_data(table)
-        if not data:
-            return 1
-        return max(item.get('id', 0) for item in data) + 1
+        return self.reserve_ids(table)[0]
     
     def create(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new item in the table"""
-        data = self._load_data(table)
-        item['id'] = self._get_next_id(table)
-        item['created_at'] = datetime.now().isoformat()
-        item['updated_at'] = datetime.now().isoformat()
-        data.append(item)
-        self._save_data(table, data)
-        return item
+        if table not in self.files:
+            return item
+        
+        now = datetime.now().isoformat()
+        part = self._part_for(table, item, now)
+        self._prepare_ids(table)
+        # IDs are reserved under the write lock, so they are committed in
+        # order and a keyset cursor never passes a row that appears later
+        with self._writing(part):
+            record = self._stage_create(part, item, self._get_next_id(table), now)
+            self._append_log(part, record)
+            return item
+    
+    def _stage_create(self, table: str, item: Dict[str, Any], item_id: int, now: str) -> Dict[str, Any]:
+        """Insert a new record into the cache and indexes, returning its log record"""
+        rows = self._cached_rows(table)
+        item['id'] = item_id
+        item['created_at'] = now
+        item['updated_at'] = now
+        self._check_unique(table, item)
+        rows[item_id] = _clone(item)
+        self._index_add(table, rows[item_id])
+        if self.changes.active:
+            self._stage_event(table, 'create', item_id, None, _clone(item))
+        return {'op': 'create', 'item': item}
+    
+    def _stage_changes(self, table: str, item: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply field changes to a cached record and its indexes, returning the log record"""
+        changes['updated_at'] = datetime.now().isoformat()
+        self._check_unique(table, {**item, **changes}, item['id'])
+        before = _clone(item) if self.changes.active else None
+        self._index_remove(table, item)
+        item.update(changes)
+        self._index_add(table, item)
+        self._rewritten(table)
+        if before is not None:
+            self._stage_event(table, 'update', item['id'], before, _clone(item))
+        return {'op': 'update', 'id': item['id'], 'changes': changes}
+    
+    def _stage_event(self, table: str, op: str, item_id: Any, before: Optional[Dict[str, Any]],
+                     after: Optional[Dict[str, Any]]):
+        """Queue a change event of this thread until its write is durable"""
+        if not hasattr(self._events, 'pending'):
+            self._events.pending = []
+        # Segments report the logical table
+        self._events.pending.append(ChangeEvent(table.partition('/')[0], op, item_id, before, after))
+    
+    def _publish_events(self):
+        """Publish this thread's staged events (after their log append or commit marker)"""
+        pending = getattr(self._events, 'pending', None)
+        if pending:
+            self._events.pending = []
+            self.changes.publish(pending)
+    
+    def _discard_events(self):
+        self._events.pending = []
+    
+    def subscribe(self, callback, tables: Optional[List[str]] = None):
+        """Call callback(ChangeEvent) after every committed change; returns an unsubscribe function.
+        
+        Only changes written by this process are delivered; other workers'
+        changes are read from the durable feed (read_changes).
+        """
+        return self.changes.subscribe(callback, tables)
+    
+    def read_changes(self, offset: int = 0, limit: Optional[int] = None) -> tuple:
+        """(events, next offset) from the durable change feed of all processes"""
+        if self.changes.feed is None:
+            raise ValueError("The change feed is disabled; set CHANGE_FEED=true")
+        return self.changes.feed.read(offset, limit)
+    
+    def _undo(self, table: str, staged: List[tuple]):
+        """Roll back staged (id, previous record or None) mutations of a failed batch"""
+        rows = self._cached_rows(table)
+        self._rewritten(table)
+        self._discard_events()
+        for item_id, previous in reversed(staged):
+            if item_id in rows:
+                self._index_remove(table, rows[item_id])
+            if previous is None:
+                del rows[item_id]
+            else:
+                rows[item_id] = previous
+                self._index_add(table, previous)
+    
+    def create_many(self, table: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several items with one ID reservation and one log append.
+        
+        The batch is all-or-nothing: if any item clashes on a unique index,
+        DuplicateKeyError is raised and none of them is stored. (On a
+        partitioned table this holds per segment.)
+        """
+        if table not in self.files or not items:
+            return items
+        
+        now = datetime.now().isoformat()
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        for item in items:
+            batches.setdefault(self._part_for(table, item, now), []).append(item)
+        self._prepare_ids(table)
+        
+        for part, batch in batches.items():
+            with self._writing(part):
+                ids = iter(self.reserve_ids(table, len(batch)))
+                staged, records = [], []
+                try:
+                    for item in batch:
+                        item_id = next(ids)
+                        records.append(self._stage_create(part, item, item_id, now))
+                        staged.append((item_id, None))
+                except DuplicateKeyError:
+                    self._undo(part, staged)
+                    raise
+                self._append_log(part, *records)
+        return items
     
     def read(self, table: str, item_id: int) -> Optional[Dict[str, Any]]:
         """Read an item by ID"""
-        data = self._load_data(table)
-        for item in data:
-            if item.get('id') == item_id:
-                return item
-        return None
+        if table in self.partitions:
+            part = self._part_holding(table, item_id)
+            return self.read(part, item_id) if part else None
+        with self._reading(table):
+            item = self._cached_rows(table).get(item_id)
+            return _clone(item) if item is not None else None
     
     def read_all(self, table: str) -> List[Dict[str, Any]]:
         """Read all items from a table"""
-        return self._load_data(table)
+        if table in self.partitions:
+            return [item for part in self._parts(table) for item in self.read_all(part)]
+        with self._reading(table):
+            return _clone(list(self._cached_rows(table).values()))
+    
+    def _apply_changes(self, table: str, item: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply field changes to a cached record, keeping indexes and the log in step"""
+        self._append_log(table, self._stage_changes(table, item, changes))
+        return _clone(item)
+    
+    def _writable_part(self, table: str, item_id: Any, updates: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Segment of a partitioned table that may change the given row, or None if it doesn't exist.
+        
+        Rows of past months are immutable, and a row never moves between
+        segments, so changing its partition field to another month is refused.
+        """
+        part = self._part_holding(table, item_id)
+        if part is None:
+            return None
+        self._check_writable(part)
+        field = self.partitions[table]
+        if updates and field in updates and _partition_key(updates[field]) != part.partition('/')[2]:
+            raise ValueError(f"Changing {field} would move the row to another segment of {table}")
+        return part
     
     def update(self, table: str, item_id: int, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update an item by ID"""
-        data = self._load_data(table)
-        for i, item in enumerate(data):
-            if item.get('id') == item_id:
-                data[i].update(updates)
-                data[i]['updated_at'] = datetime.now().isoformat()
-                self._save_data(table, data)
-                return data[i]
-        return None
+        if table in self.partitions:
+            part = self._writable_part(table, item_id, updates)
+            return self.update(part, item_id, updates) if part else None
+        with self._writing(table):
+            item = self._cached_rows(table).get(item_id)
+            if item is None:
+                return None
+            return self._apply_changes(table, item, _clone(updates))
+    
+    def update_many(self, table: str, updates: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Update several items by ID with one log append.
+        
+        IDs that don't exist are skipped. A unique-key clash raises
+        DuplicateKeyError and leaves every item unchanged.
+        """
+        if table in self.partitions:
+            batches: Dict[str, Dict[int, Dict[str, Any]]] = {}
+            for item_id, changes in updates.items():
+                part = self._writable_part(table, item_id, changes)
+                if part:
+                    batches.setdefault(part, {})[item_id] = changes
+            return [item for part, batch in batches.items() for item in self.update_many(part, batch)]
+        with self._writing(table):
+            rows = self._cached_rows(table)
+            staged, records = [], []
+            try:
+                for item_id, changes in updates.items():
+                    item = rows.get(item_id)
+                    if item is None:
+                        continue
+                    previous = _clone(item)
+                    records.append(self._stage_changes(table, item, _clone(changes)))
+                    staged.append((item_id, previous))
+            except DuplicateKeyError:
+                self._undo(table, staged)
+                raise
+            if records:
+                self._append_log(table, *records)
+            return [_clone(rows[item_id]) for item_id, _ in staged]
+    
+    def upsert_by_field(self, table: str, field: str, items: List[Dict[str, Any]],
+                        update_existing: bool = True) -> List[Dict[str, Any]]:
+        """Create or update items matched on a natural key field, in one batch.
+        
+        Items whose field value is already stored update the first matching
+        row (or leave it untouched when update_existing is False); the rest are
+        created. Returns the resulting records in input order.
+        """
+        if table not in self.files or not items:
+            return []
+        if table in self.partitions:
+            results = []
+            for item in items:
+                existing = self.find_one_by_field(table, field, item.get(field))
+                if existing is None:
+                    results.append(self.create(table, item))
+                elif update_existing:
+                    changes = {key: value for key, value in item.items() if key not in ('id', 'created_at')}
+                    results.append(self.update(table, existing['id'], changes))
+                else:
+                    results.append(existing)
+            return results
+        
+        self._prepare_ids(table)
+        with self._writing(table):
+            rows = self._cached_rows(table)
+            entries = self._indexes.get(table, {}).get((field,))
+            if entries is None:
+                entries = {}
+                for row in rows.values():
+                    if _hashable(row.get(field)):
+                        entries.setdefault(row.get(field), {})[row['id']] = row
+            
+            new_keys = {item.get(field) for item in items} - set(entries)
+            ids = iter(self.reserve_ids(table, len(new_keys)))
+            now = datetime.now().isoformat()
+            staged, records, results = [], [], []
+            try:
+                for item in items:
+                    matches = entries.get(item.get(field))
+                    if not matches:
+                        item_id = next(ids)
+                        records.append(self._stage_create(table, item, item_id, now))
+                        staged.append((item_id, None))
+                        entries.setdefault(item.get(field), {})[item_id] = rows[item_id]
+                        results.append(item)
+                        continue
+                    
+                    existing = next(iter(matches.values()))
+                    if update_existing:
+                        previous = _clone(existing)
+                        changes = {key: _clone(value) for key, value in item.items() if key not in ('id', 'created_at')}
+                        records.append(self._stage_changes(table, existing, changes))
+                        staged.append((existing['id'], previous))
+                    results.append(_clone(existing))
+            except DuplicateKeyError:
+                self._undo(table, staged)
+                raise
+            if records:
+                self._append_log(table, *records)
+            return results
+    
+    def increment(self, table: str, item_id: int, field: str, delta: int = 1,
+                  minimum: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Atomically add delta to a numeric field of an item, optionally clamped at a minimum.
+        
+        The read-modify-write happens under the table's write locks, so
+        concurrent increments from any worker are never lost.
+        """
+        if table in self.partitions:
+            part = self._writable_part(table, item_id)
+            return self.increment(part, item_id, field, delta, minimum) if part else None
+        with self._writing(table):
+            item = self._cached_rows(table).get(item_id)
+            if item is None:
+                return None
+            value = (item.get(field) or 0) + delta
+            if minimum is not None:
+                value = max(minimum, value)
+            return self._apply_changes(table, item, {field: value})
+    
+    def increment_many(self, table: str, deltas: Dict[int, Dict[str, int]],
+                       minimum: Optional[Dict[str, int]] = None) -> int:
+        """Atomically add deltas to numeric fields of several items with one log append.
+        
+        deltas maps IDs to {field: delta}; minimum optionally clamps fields.
+        IDs that don't exist are skipped. Returns the number of items changed.
+        """
+        minimum = minimum or {}
+        if table in self.partitions:
+            batches: Dict[str, Dict[int, Dict[str, int]]] = {}
+            for item_id, changes in deltas.items():
+                part = self._writable_part(table, item_id)
+                if part:
+                    batches.setdefault(part, {})[item_id] = changes
+            return sum(self.increment_many(part, batch, minimum) for part, batch in batches.items())
+        with self._writing(table):
+            rows = self._cached_rows(table)
+            records = []
+            for item_id, changes in deltas.items():
+                item = rows.get(item_id)
+                if item is None:
+                    continue
+                values = {}
+                for field, delta in changes.items():
+                    value = (item.get(field) or 0) + delta
+                    values[field] = value if field not in minimum else max(minimum[field], value)
+                records.append(self._stage_changes(table, item, values))
+            if records:
+                self._append_log(table, *records)
+            return len(records)
+    
+    def _is_committed(self, tx: str) -> bool:
+        """Whether a transaction wrote its commit marker, reading new journal entries as needed"""
+        if tx in self._committed:
+            return True
+        with self._journal_lock:
+            stamp = self._file_stamp(self.journal)
+            if stamp is None:
+                return False
+            inode, offset = self._journal_position
+            if inode != stamp[2]:
+                offset = 0
+            with open(self.journal, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+            end = chunk.rfind(b'\n') + 1
+            self._committed.update(line.decode('ascii') for line in chunk[:end].split() if line)
+            self._journal_position = (stamp[2], offset + end)
+            return tx in self._committed
+    
+    def _append_journal(self, tx: str):
+        """Durably record a transaction's commit marker; this single write is the commit point"""
+        with self._journal_lock:
+            with open(self.journal, 'ab') as f:
+                f.write(tx.encode('ascii') + b'\n')
+                f.flush()
+                if settings.wal_fsync:
+                    os.fsync(f.fileno())
+            self._committed.add(tx)
+    
+    def _checkpoint_journal(self, tables: List[str]):
+        """Drop the commit markers once no table log can refer to them.
+        
+        Only done while every table log is empty (all folded into snapshots),
+        holding all table locks. The journal is replaced rather than
+        truncated, so other processes notice by its inode.
+        """
+        if self._file_stamp(self.journal) is None:
+            return
+        with ExitStack() as stack:
+            for name in sorted(tables):
+                stack.enter_context(self._table_lock(name).write())
+                stack.enter_context(self._file_lock(name, exclusive=True))
+            if any(os.path.exists(self.logs[name]) and os.path.getsize(self.logs[name]) for name in tables):
+                return
+            with self._journal_lock:
+                tmp_path = f'{self.journal}.{os.getpid()}.tmp'
+                open(tmp_path, 'wb').close()
+                os.replace(tmp_path, self.journal)
+                self._committed.clear()
+                self._journal_position = (None, 0)
+    
+    @contextmanager
+    def transaction(self):
+        """Stage mutations across tables and commit them atomically.
+        
+            with db.transaction() as tx:
+                like = tx.create("likes", {...})
+                tx.increment("articles", article_id, "likes")
+        """
+        tx = Transaction()
+        yield tx
+        self.commit(tx)
+    
+    def commit(self, tx: Transaction):
+        """Apply a transaction's operations all-or-nothing (group commit).
+        
+        Every table involved is locked (in name order, so concurrent
+        transactions cannot deadlock) and its records are appended to its
+        log in one write, tagged with the transaction ID. A single fsynced
+        marker in the journal then commits them: replays ignore tagged
+        records without a marker, so a crash midway leaves no partial
+        effects. A DuplicateKeyError or any other failure rolls back every
+        staged change.
+        """
+        if not tx.operations:
+            return
+        now = datetime.now().isoformat()
+        
+        # Physical table of each operation; segments are resolved up front
+        resolved = []
+        for operation in tx.operations:
+            kind, table = operation[0], operation[1]
+            if kind == 'create':
+                part = self._part_for(table, operation[2], now)
+            elif table in self.partitions:
+                part = self._writable_part(table, operation[2], operation[3] if kind == 'update' else None)
+            else:
+                part = table if table in self.files else None
+            if part is not None:
+                resolved.append((part, operation))
+        if not resolved:
+            return
+        created = {}
+        for _, operation in resolved:
+            if operation[0] == 'create':
+                created[operation[1]] = created.get(operation[1], 0) + 1
+        for table in created:
+            self._prepare_ids(table)
+        parts = sorted({part for part, _ in resolved})
+        
+        with ExitStack() as stack:
+            for part in parts:
+                stack.enter_context(self._writing(part))
+            ids = {table: iter(self.reserve_ids(table, count)) for table, count in created.items()}
+            staged = {part: [] for part in parts}
+            records = {part: [] for part in parts}
+            try:
+                for part, operation in resolved:
+                    kind, table, *args = operation
+                    rows = self._cached_rows(part)
+                    if kind == 'create':
+                        item_id = next(ids[table])
+                        records[part].append(self._stage_create(part, args[0], item_id, now))
+                        staged[part].append((item_id, None))
+                    elif kind == 'delete':
+                        item = rows.pop(args[0], None)
+                        if item is None:
+                            continue
+                        self._index_remove(part, item)
+                        self._rewritten(part)
+                        if self.changes.active:
+                            self._stage_event(part, 'delete', args[0], item, None)
+                        records[part].append({'op': 'delete', 'id': args[0]})
+                        staged[part].append((args[0], item))
+                    else:
+                        item = rows.get(args[0])
+                        if item is None:
+                            continue
+                        if kind == 'update':
+                            changes = _clone(args[1])
+                        else:
+                            field, delta, minimum = args[1:]
+                            value = (item.get(field) or 0) + delta
+                            changes = {field: value if minimum is None else max(minimum, value)}
+                        previous = _clone(item)
+                        records[part].append(self._stage_changes(part, item, changes))
+                        staged[part].append((args[0], previous))
+                
+                tx_id = uuid.uuid4().hex
+                for part in parts:
+                    if records[part]:
+                        self._append_log(part, *({**record, 'tx': tx_id} for record in records[part]), commit=False)
+                self._append_journal(tx_id)
+            except BaseException:
+                for part in parts:
+                    self._undo(part, staged[part])
+                raise
+            
+            self._publish_events()
+            for part in parts:
+                self._maybe_compact(part)
     
     def delete(self, table: str, item_id: int) -> bool:
         """Delete an item by ID"""
-        data = self._load_data(table)
-        for i, item in enumerate(data):
-            if item.get('id') == item_id:
-                data.pop(i)
-                self._save_data(table, data)
-                return True
-        return False
+        if table in self.partitions:
+            part = self._writable_part(table, item_id)
+            return self.delete(part, item_id) if part else False
+        with self._writing(table):
+            item = self._cached_rows(table).pop(item_id, None)
+            if item is None:
+                return False
+            self._index_remove(table, item)
+            self._rewritten(table)
+            if self.changes.active:
+                self._stage_event(table, 'delete', item_id, item, None)
+            self._append_log(table, {'op': 'delete', 'id': item_id})
+            return True
     
     def find_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
-        """Find items by a specific field value"""
-        data = self._load_data(table)
-        return [item for item in data if item.get(field) == value]
+        """Find items by a specific field value, through a secondary index when one exists"""
+        if table in self.partitions:
+            return [item for part in self._parts(table) for item in self.find_by_field(part, field, value)]
+        with self._reading(table):
+            rows = self._cached_rows(table)
+            entries = self._indexes.get(table, {}).get((field,))
+            if entries is not None and _hashable(value):
+                return [_clone(item) for item in entries.get(value, {}).values()]
+            return [_clone(item) for item in rows.values() if item.get(field) == value]
     
     def find_one_by_field(self, table: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
         """Find one item by a specific field value"""
-        results = self.find_by_field(table, field, value)
-        return results[0] if results else None
+        if table in self.partitions:
+            for part in self._parts(table):
+                item = self.find_one_by_field(part, field, value)
+                if item is not None:
+                    return item
+            return None
+        with self._reading(table):
+            rows = self._cached_rows(table)
+            entries = self._indexes.get(table, {}).get((field,))
+            if entries is not None and _hashable(value):
+                matches = entries.get(value)
+                return _clone(next(iter(matches.values()))) if matches else None
+            for item in rows.values():
+                if item.get(field) == value:
+                    return _clone(item)
+            return None
+    
+    def _match_fields(self, table: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Live records matching every field in criteria, using the best available index"""
+        rows = self._cached_rows(table)
+        entries = self._indexes.get(table, {})
+        fields = tuple(criteria)
+        
+        # An index covering exactly these fields answers the query directly
+        for index in self.indexes.get(table, []):
+            if set(index.fields) == set(fields) and not index.casefold and not index.multi:
+                key = index.key(criteria)
+                if _hashable(key):
+                    metrics.count('index_lookup', table)
+                    return list(entries[index.fields].get(key, {}).values())
+        
+        # Otherwise narrow down with a single-field index and filter the rest
+        candidates = None
+        for field in fields:
+            if (field,) in entries and _hashable(criteria[field]):
+                candidates = entries[(field,)].get(criteria[field], {}).values()
+                break
+        metrics.count('scan' if candidates is None else 'index_lookup', table)
+        if candidates is None:
+            candidates = rows.values()
+        return [
+            item for item in candidates
+            if all(item.get(field) == value for field, value in criteria.items())
+        ]
+    
+    def find_by_fields(self, table: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Find items matching all of the given field values"""
+        if table in self.partitions:
+            return [item for part in self._parts(table) for item in self.find_by_fields(part, criteria)]
+        with self._reading(table):
+            return [_clone(item) for item in self._match_fields(table, criteria)]
+    
+    def find_one_by_fields(self, table: str, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find one item matching all of the given field values"""
+        if table in self.partitions:
+            for part in self._parts(table):
+                item = self.find_one_by_fields(part, criteria)
+                if item is not None:
+                    return item
+            return None
+        with self._reading(table):
+            matches = self._match_fields(table, criteria)
+            return _clone(matches[0]) if matches else None
+    
+    def exists(self, table: str, criteria: Dict[str, Any]) -> bool:
+        """Check whether any item matches all of the given field values"""
+        if table in self.partitions:
+            return any(self.exists(part, criteria) for part in self._parts(table))
+        with self._reading(table):
+            return bool(self._match_fields(table, criteria))
+    
+    def _sorted_ids(self, table: str) -> List[Any]:
+        """Primary keys of a physical table in ascending order; callers hold the lock.
+        
+        Kept between calls: appended rows extend the list, anything else
+        (updates, deletes, reloads) rebuilds it.
+        """
+        rows = self._cached_rows(table)
+        marker = (self._rewrites.get(table, 0), len(rows))
+        since, ids = self._id_order.get(table, (None, None))
+        if since == marker:
+            return ids
+        if since is not None and since[0] == marker[0] and since[1] <= marker[1]:
+            tail = list(itertools.islice(rows, since[1], None))
+            # IDs come from an increasing sequence, so appends normally sort last
+            if ids and tail and min(tail) <= ids[-1]:
+                ids = sorted(itertools.chain(ids, tail))
+            else:
+                ids = ids + tail
+        else:
+            ids = sorted(rows)
+        self._id_order[table] = (marker, ids)
+        return ids
+    
+    def _rows_after(self, table: str, after: Any = None, descending: bool = False) -> Any:
+        """Live records in ID order past the after ID (from the start without one); callers hold the lock"""
+        rows = self._cached_rows(table)
+        ids = self._sorted_ids(table)
+        # Seek in the primary-key order: page N costs the same as page 1
+        if descending:
+            end = len(ids) if after is None else bisect.bisect_left(ids, after)
+            positions = range(end - 1, -1, -1)
+        else:
+            positions = range(0 if after is None else bisect.bisect_right(ids, after), len(ids))
+        return (rows[ids[position]] for position in positions)
+    
+    def _query_candidates(self, table: str, lookups: List[tuple], keyset: Optional[bool] = None,
+                          after: Any = None) -> Any:
+        """Live records that may satisfy the lookups, narrowed through secondary indexes.
+        
+        keyset asks for ID order (True for descending), starting past the
+        after ID when one is given.
+        """
+        criteria = {
+            fields[0]: operand for fields, op, operand in lookups
+            if op == 'eq' and len(fields) == 1 and _hashable(operand)
+        }
+        matches = None
+        for fields, op, operand in lookups:
+            if fields == ('id',) and op in ('eq', 'in'):
+                # Point lookups on the primary key
+                rows = self._cached_rows(table)
+                wanted = [operand] if op == 'eq' else operand
+                found = sorted(item_id for item_id in wanted if _hashable(item_id) and item_id in rows)
+                matches = [rows[item_id] for item_id in found]
+                break
+        if matches is None and len(criteria) > 1 and any(
+            set(index.fields) == set(criteria) and not index.casefold and not index.multi
+            for index in self.indexes.get(table, [])
+        ):
+            # A composite index answers all the equality lookups at once
+            matches = self._match_fields(table, criteria)
+        
+        if matches is None:
+            # Posting lists of every indexed lookup, intersected smallest first
+            entries = self._indexes.get(table, {})
+            buckets = []
+            for fields, op, operand in lookups:
+                if len(fields) != 1:
+                    continue
+                if op == 'eq' and fields in entries and _hashable(operand):
+                    buckets.append(entries[fields].get(operand, {}))
+                elif op == 'ieq' and ('ieq',) + fields in entries and isinstance(operand, str):
+                    buckets.append(entries[('ieq',) + fields].get(operand, {}))
+                elif op == 'in' and fields in entries:
+                    union = {
+                        item_id: item
+                        for value in operand if _hashable(value)
+                        for item_id, item in entries[fields].get(value, {}).items()
+                    }
+                    # Several buckets: restore ID order
+                    buckets.append({item_id: union[item_id] for item_id in sorted(union)})
+            if buckets:
+                metrics.count('index_lookup', table)
+                buckets.sort(key=len)
+                smallest, others = buckets[0], buckets[1:]
+                if keyset is not None and len(smallest) ** 2 >= len(self._cached_rows(table)):
+                    # A broad match in ID order: seek to the cursor through the
+                    # primary key and keep members, so a page stops after its
+                    # rows instead of sorting every match
+                    return (
+                        item for item in self._rows_after(table, after, keyset)
+                        if all(item['id'] in bucket for bucket in buckets)
+                    )
+                matches = [
+                    item for item_id, item in smallest.items()
+                    if all(item_id in other for other in others)
+                ]
+            elif criteria:
+                matches = self._match_fields(table, criteria)
+        
+        if matches is None:
+            metrics.count('scan', table)
+            # Full scan; in ID order a cursor seeks through the primary key
+            # instead of skipping rows
+            if keyset is None:
+                return self._cached_rows(table).values()
+            return self._rows_after(table, after, keyset)
+        if keyset is not None:
+            if len(matches) ** 2 >= len(self._cached_rows(table)):
+                found = {item['id'] for item in matches}
+                return (item for item in self._rows_after(table, after, keyset) if item['id'] in found)
+            # Few matches: sorting them is cheaper than walking the primary key
+            if after is not None:
+                matches = [item for item in matches if (item['id'] < after if keyset else item['id'] > after)]
+            matches = sorted(matches, key=lambda item: item['id'], reverse=keyset)
+        return matches
+    
+    def query(self, table: str, where: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+              order_by: Any = None, limit: Optional[int] = None, offset: int = 0,
+              after: Any = None) -> List[Dict[str, Any]]:
+        """Rows matching where, filtered, sorted and sliced inside the storage layer.
+        
+        where maps lookups to operands: "category": "x" tests equality,
+        "level__ieq": "beginner" picks an operator from QUERY_OPERATORS, and
+        "title|description__icontains": "x" holds when any listed field matches.
+        On list fields a lookup holds when any element matches. Equality and
+        "in" lookups go through secondary indexes when one exists. order_by is
+        a field name or list of them ("-field" for descending; insertion order
+        by default). Only the rows in the [offset, offset + limit) window are
+        copied, and only their requested fields.
+        
+        Ordering by "id" or "-id" walks the primary key instead of sorting,
+        and after then continues past that ID (keyset pagination: pass the
+        last ID of the previous page, ascending by default).
+        """
+        lookups = [parse_lookup(key, operand) for key, operand in (where or {}).items()]
+        order_by = [order_by] if isinstance(order_by, str) else list(order_by or [])
+        if after is not None and not order_by:
+            order_by = ['id']
+        keyset = {('id',): False, ('-id',): True}.get(tuple(order_by))
+        if after is not None and keyset is None:
+            raise ValueError('Keyset pagination (after) requires ordering by "id" or "-id"')
+        window = None if limit is None else offset + limit
+        parts = self._parts(table)
+        # Sorted segments of a partitioned table are merged afterwards, so
+        # their rows keep every field until then
+        merge = bool(order_by) and len(parts) > 1
+        projection = None if merge else fields
+        
+        results = []
+        for part in parts:
+            with self._reading(part):
+                matches = (
+                    item for item in self._query_candidates(part, lookups, keyset, after)
+                    if all(_lookup_matches(item, *lookup) for lookup in lookups)
+                )
+                if order_by and keyset is None:
+                    matches = sort_rows(matches, order_by)
+                results.extend(project_row(item, projection) for item in itertools.islice(matches, window))
+            if not order_by and window is not None and len(results) >= window:
+                break
+        
+        if merge:
+            results = [project_row(item, fields) for item in sort_rows(results, order_by)]
+        return results[offset:window]
+    
+    def facets(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[Any, int]]:
+        """How many rows matching where hold each value of the given fields.
+        
+        Values are grouped case-insensitively and labelled with the spelling of
+        the lowest-ID row holding them; on list fields every element counts.
+        Each field's values come most frequent first. Without
+        a filter, fields with a casefold index are counted from its posting
+        lists; everything else takes a single pass over the matching rows.
+        """
+        lookups = [parse_lookup(key, operand) for key, operand in (where or {}).items()]
+        # field -> folded value -> [spelling on the lowest ID, count, that ID]
+        counts: Dict[str, Dict[Any, list]] = {field: {} for field in fields}
+        for part in self._parts(table):
+            with self._reading(part):
+                entries = self._indexes.get(part, {})
+                scanned = []
+                for field in fields:
+                    if lookups or ('ieq', field) not in entries:
+                        scanned.append(field)
+                        continue
+                    for key, bucket in entries[('ieq', field)].items():
+                        if key is None:
+                            continue  # rows without the field, skipped like in the scan below
+                        first = min(bucket)
+                        value = bucket[first].get(field)
+                        if isinstance(value, list):
+                            value = next((element for element in value if _facet_key(element) == key), key)
+                        tally = counts[field].setdefault(key, [value, 0, first])
+                        tally[1] += len(bucket)
+                        if first < tally[2]:
+                            tally[0], tally[2] = value, first
+                if not scanned:
+                    continue
+                for item in self._query_candidates(part, lookups):
+                    if not all(_lookup_matches(item, *lookup) for lookup in lookups):
+                        continue
+                    for field in scanned:
+                        value = item.get(field)
+                        seen = set()
+                        for element in (value if isinstance(value, list) else [value]):
+                            key = _facet_key(element)
+                            if element is None or not _hashable(key) or key in seen:
+                                continue
+                            seen.add(key)
+                            tally = counts[field].setdefault(key, [element, 0, item['id']])
+                            tally[1] += 1
+                            if item['id'] < tally[2]:
+                                tally[0], tally[2] = element, item['id']
+        return {
+            field: dict(sorted((tally[:2] for tally in tallies.values()), key=lambda tally: (-tally[1], str(tally[0]))))
+            for field, tallies in counts.items()
+        }
+    
+    def find_in_range(self, table: str, field: str, start: Any = None, end: Any = None,
+                      criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Find items whose field lies in [start, end), optionally also matching criteria.
+        
+        On a table partitioned by that field, only the segments overlapping the
+        range are loaded. Datetime bounds are compared as ISO strings.
+        """
+        start, end = (bound.isoformat() if isinstance(bound, datetime) else bound for bound in (start, end))
+        pruned = self.partitions.get(table) == field
+        results = []
+        for part in (self._parts(table, start, end) if pruned else self._parts(table)):
+            with self._reading(part):
+                candidates = self._match_fields(part, criteria) if criteria else self._cached_rows(part).values()
+                results.extend(
+                    _clone(item) for item in candidates
+                    if item.get(field) is not None
+                    and (start is None or item[field] >= start)
+                    and (end is None or item[field] < end)
+                )
+        return results
+    
+    def segments(self, table: str, start: Any = None, end: Any = None) -> List[str]:
+        """Physical tables holding a table's rows: its monthly segments, or the table itself"""
+        return self._parts(table, start, end)
+    
+    def source_stamp(self, table: str) -> list:
+        """On-disk state of a physical table, comparable with column_source() stamps"""
+        stamp = self._file_stamp(self.files[table])
+        log_stamp = self._file_stamp(self.logs[table])
+        return [*(stamp or (None, None, None)), *((log_stamp[2], log_stamp[1]) if log_stamp else (None, 0))]
+    
+    def column_source(self, table: str, fields: List[str], since: Optional[tuple] = None) -> tuple:
+        """Raw field values of a physical table's rows, for derived columnar snapshots.
+        
+        Returns (marker, stamp, values, appended): values holds one tuple per
+        row in insertion order. When since is the marker of an earlier call
+        and rows were only appended in between, just the new rows are
+        returned and appended is True.
+        """
+        with self._reading(table):
+            rows = self._cached_rows(table)
+            marker = (self._rewrites.get(table, 0), len(rows))
+            appended = since is not None and since[0] == marker[0] and since[1] <= marker[1]
+            source = itertools.islice(rows.values(), since[1], None) if appended else rows.values()
+            values = [tuple(item.get(field) for field in fields) for item in source]
+            stamp = [*(self._cache_stamps.get(table) or (None, None, None)), *self._log_positions[table]]
+            return marker, stamp, values, appended
+    
+    def select_columns(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None,
+                       ranges: Optional[Dict[str, tuple]] = None) -> Optional[Dict[str, Any]]:
+        """Numeric columns of the rows matching where (equality) and ranges ([low, high)).
+        
+        Served from columnar snapshots as NumPy arrays (a ColumnSet, which
+        aggregates them without per-row objects); returns None when they are
+        disabled or unavailable, and callers fall back to row queries.
+        """
+        if self.read_only:
+            return None
+        if self._columns is None:
+            from app.columnar import ColumnStore
+            self._columns = ColumnStore(self)
+        return self._columns.select(table, fields, where, ranges)
     
     def search(self, table: str, search_term: str, fields: List[str]) -> List[Dict[str, Any]]:
         """Search items by multiple fields"""
-        data = self._load_data(table)
         results = []
         search_term = search_term.lower()
         
-        for item in data:
-            for field in fields:
-                if field in item and search_term in str(item[field]).lower():
-                    results.append(item)
-                    break
+        for part in self._parts(table):
+            with self._reading(part):
+                for item in self._cached_rows(part).values():
+                    for field in fields:
+                        if field in item and search_term in str(item[field]).lower():
+                            results.append(_clone(item))
+                            break
         
         return results
 
+class AsyncDatabase:
+    """Awaitable facade over a storage backend.
+    
+    Calls run on a bounded thread pool, so blocking file or SQLite I/O and
+    JSON parsing never stall the event loop serving the async route handlers.
+    """
+    
+    def __init__(self, database, max_workers: Optional[int] = None):
+        self.database = database
+        self.max_workers = max_workers or settings.db_executor_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    async def _run(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        loop = asyncio.get_running_loop()
+        # Carry the request's context (its route for the storage metrics) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+    
+    async def create(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._run(self.database.create, table, item)
+    
+    async def read(self, table: str, item_id: int) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.read, table, item_id)
+    
+    async def read_all(self, table: str) -> List[Dict[str, Any]]:
+        return await self._run(self.database.read_all, table)
+    
+    async def update(self, table: str, item_id: int, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.update, table, item_id, updates)
+    
+    async def create_many(self, table: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self.database.create_many, table, items)
+    
+    async def update_many(self, table: str, updates: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._run(self.database.update_many, table, updates)
+    
+    async def upsert_by_field(self, table: str, field: str, items: List[Dict[str, Any]],
+                              update_existing: bool = True) -> List[Dict[str, Any]]:
+        return await self._run(self.database.upsert_by_field, table, field, items, update_existing)
+    
+    async def increment(self, table: str, item_id: int, field: str, delta: int = 1,
+                        minimum: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.increment, table, item_id, field, delta, minimum)
+    
+    async def increment_many(self, table: str, deltas: Dict[int, Dict[str, int]],
+                             minimum: Optional[Dict[str, int]] = None) -> int:
+        return await self._run(self.database.increment_many, table, deltas, minimum)
+    
+    async def delete(self, table: str, item_id: int) -> bool:
+        return await self._run(self.database.delete, table, item_id)
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """Awaitable db.transaction(): staging is in memory, the commit runs on the pool"""
+        tx = Transaction()
+        yield tx
+        await self._run(self.database.commit, tx)
+    
+    async def find_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        return await self._run(self.database.find_by_field, table, field, value)
+    
+    async def find_one_by_field(self, table: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.find_one_by_field, table, field, value)
+    
+    async def find_by_fields(self, table: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._run(self.database.find_by_fields, table, criteria)
+    
+    async def find_one_by_fields(self, table: str, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.find_one_by_fields, table, criteria)
+    
+    async def exists(self, table: str, criteria: Dict[str, Any]) -> bool:
+        return await self._run(self.database.exists, table, criteria)
+    
+    async def find_in_range(self, table: str, field: str, start: Any = None, end: Any = None,
+                            criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return await self._run(self.database.find_in_range, table, field, start, end, criteria)
+    
+    async def query(self, table: str, where: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+                    order_by: Any = None, limit: Optional[int] = None, offset: int = 0,
+                    after: Any = None) -> List[Dict[str, Any]]:
+        return await self._run(self.database.query, table, where, fields, order_by, limit, offset, after)
+    
+    async def select_columns(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None,
+                             ranges: Optional[Dict[str, tuple]] = None) -> Optional[Dict[str, Any]]:
+        return await self._run(self.database.select_columns, table, fields, where, ranges)
+    
+    async def search(self, table: str, search_term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        return await self._run(self.database.search, table, search_term, fields)
+    
+    async def facets(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[Any, int]]:
+        return await self._run(self.database.facets, table, fields, where)
+    
+    async def call(self, func, *args, **kwargs):
+        """Run another blocking, storage-bound function on the same thread pool"""
+        return await self._run(func, *args, **kwargs)
+    
+    def shutdown(self):
+        """Wait for queued calls and stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+def create_database():
+    """Instantiate the storage backend selected by settings.storage_backend.
+    
+    Unless counter_flush_interval is 0, it is wrapped in a CounterBuffer so
+    view, like and student counters are written behind in batches.
+    """
+    if settings.storage_backend == "sqlite":
+        from app.sqlite_database import SQLiteDatabase
+        backend = SQLiteDatabase()
+    else:
+        backend = JSONDatabase()
+    if settings.counter_flush_interval > 0:
+        from app.counters import CounterBuffer
+        return CounterBuffer(backend)
+    return backend
+
 # Global database instance
-db = JSONDatabase() 
\ No newline at end of file
+db = create_database()
+# Non-blocking access for async route handlers
+async_db = AsyncDatabase(db) 
\ No newline at end of file
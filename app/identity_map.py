@@ -0,0 +1,106 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+from app.database import async_db
+
+
+class IdentityMap:
+    """Request-scoped unit of work over async_db: every table and row is loaded at most once.
+
+    Loads are memoized for the lifetime of the object, and a row is handed
+    out as the same dict however it was found (read, read_many, read_all
+    or find_by_field), so callers must treat rows as read-only and copy
+    before changing them. Writes go straight to the database and forget
+    what was memoized for their table. Create one per request through the
+    get_identity_map dependency; never share one between requests.
+    """
+
+    def __init__(self, database=None):
+        self.database = database or async_db
+        # table -> id -> row (None when known to be missing)
+        self._rows: Dict[str, Dict[Any, Optional[Dict[str, Any]]]] = {}
+        # table -> every row, once read_all() ran
+        self._tables: Dict[str, List[Dict[str, Any]]] = {}
+        # (table, field, value) -> matching rows
+        self._lookups: Dict[tuple, List[Dict[str, Any]]] = {}
+
+    def _remember(self, table: str, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Register loaded rows, returning the already known instance for each ID"""
+        rows = self._rows.setdefault(table, {})
+        result = []
+        for item in items:
+            known = rows.get(item.get("id"))
+            if known is None:
+                rows[item.get("id")] = known = item
+            result.append(known)
+        return result
+
+    async def read_all(self, table: str) -> List[Dict[str, Any]]:
+        if table not in self._tables:
+            self._tables[table] = self._remember(table, await self.database.read_all(table))
+        return self._tables[table]
+
+    async def read(self, table: str, item_id: Any) -> Optional[Dict[str, Any]]:
+        rows = self._rows.setdefault(table, {})
+        if item_id not in rows:
+            if table in self._tables:
+                return None
+            item = await self.database.read(table, item_id)
+            rows[item_id] = item
+        return rows[item_id]
+
+    async def read_many(self, table: str, item_ids: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        """Rows by ID, fetching the ones not seen yet in a single query; missing IDs are left out"""
+        rows = self._rows.setdefault(table, {})
+        wanted = {item_id for item_id in item_ids if isinstance(item_id, Hashable)}
+        missing = [item_id for item_id in wanted if item_id not in rows]
+        if missing and table not in self._tables:
+            found = self._remember(table, await self.database.query(table, where={"id__in": missing}))
+            for item_id in set(missing) - {item.get("id") for item in found}:
+                rows[item_id] = None
+        return {item_id: rows[item_id] for item_id in wanted if rows.get(item_id) is not None}
+
+    async def find_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        if not isinstance(value, Hashable):
+            return self._remember(table, await self.database.find_by_field(table, field, value))
+        key = (table, field, value)
+        if key not in self._lookups:
+            if table in self._tables:
+                self._lookups[key] = [item for item in self._tables[table] if item.get(field) == value]
+            else:
+                self._lookups[key] = self._remember(table, await self.database.find_by_field(table, field, value))
+        return self._lookups[key]
+
+    def invalidate(self, table: Optional[str] = None):
+        """Forget memoized rows (of one table, or all)"""
+        if table is None:
+            self._rows.clear()
+            self._tables.clear()
+            self._lookups.clear()
+            return
+        self._rows.pop(table, None)
+        self._tables.pop(table, None)
+        for key in [key for key in self._lookups if key[0] == table]:
+            del self._lookups[key]
+
+    # Writes pass through and invalidate their table
+
+    async def create(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        self.invalidate(table)
+        return await self.database.create(table, item)
+
+    async def update(self, table: str, item_id: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        self.invalidate(table)
+        return await self.database.update(table, item_id, updates)
+
+    async def increment(self, table: str, item_id: Any, field: str, delta: int = 1,
+                        minimum: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        self.invalidate(table)
+        return await self.database.increment(table, item_id, field, delta, minimum)
+
+    async def delete(self, table: str, item_id: Any) -> bool:
+        self.invalidate(table)
+        return await self.database.delete(table, item_id)
+
+
+def get_identity_map() -> IdentityMap:
+    """FastAPI dependency: a fresh identity map for the current request"""
+    return IdentityMap()
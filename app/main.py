@@ -1,13 +1,30 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from app.config import settings
-from app.routers import auth, courses, tutorials, articles, quizzes, users, dashboard
+from app.database import db, async_db, SealedSegmentError
+from app.counters import CounterBuffer
+from app.metrics import current_route
+from app.routers import auth, courses, tutorials, articles, quizzes, users, dashboard, admin, search
+
+async def tag_storage_metrics(request: Request):
+    """Tag storage metrics recorded while serving a request with its route template.
+    
+    Runs as the first dependency of every route, in the request's own task and
+    context, so the value reaches the route's other dependencies and the
+    endpoint; the matched route is already in the scope.
+    """
+    route = request.scope.get("route")
+    current_route.set(f"{request.method} {getattr(route, 'path', request.url.path)}")
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
-    description="A comprehensive educational platform API for courses, tutorials, articles, and quizzes"
+    description="A comprehensive educational platform API for courses, tutorials, articles, and quizzes",
+    # Serialize responses with orjson when the storage codec uses it
+    default_response_class=ORJSONResponse if db.codec.name == "orjson" else JSONResponse,
+    dependencies=[Depends(tag_storage_metrics)]
 )
 
 # Add CORS middleware
@@ -27,6 +44,27 @@ app.include_router(tutorials.router, prefix="/api/tutorials", tags=["Tutorials"]
 app.include_router(articles.router, prefix="/api/articles", tags=["Articles"])
 app.include_router(quizzes.router, prefix="/api/quizzes", tags=["Quizzes"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+
+@app.exception_handler(SealedSegmentError)
+async def sealed_segment_error(request: Request, exc: SealedSegmentError):
+    """Records of past months are read-only"""
+    return JSONResponse(status_code=status.HTTP_409_CONFLICT, content={"detail": str(exc)})
+
+@app.on_event("startup")
+def start_counter_flush():
+    """Start writing buffered counters behind in the background"""
+    if isinstance(db, CounterBuffer):
+        db.start()
+
+@app.on_event("shutdown")
+def compact_database():
+    """Drain pending storage calls, flush buffered counters and fold the mutation logs into the snapshots"""
+    async_db.shutdown()
+    if isinstance(db, CounterBuffer):
+        db.stop()
+    db.compact()
 
 @app.get("/")
 async def root():
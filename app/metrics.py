@@ -0,0 +1,151 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+# Route template of the request being served ("GET /api/articles/{article_id}"),
+# set by the tag_storage_metrics dependency in app.main; None outside requests (scripts, flush threads)
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last one is open
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+class OperationStats:
+    """Call count, bytes and latency histogram of one (operation, table, route)"""
+
+    __slots__ = ("count", "bytes", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: Optional[float], size: int):
+        self.count += 1
+        self.bytes += size
+        if elapsed_ms is not None:
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of the timed calls (capped at the maximum)"""
+        timed = sum(self.buckets)
+        if not timed:
+            return None
+        rank, seen = fraction * timed, 0
+        for position, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS_MS[position], self.max_ms) if position < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+class StorageMetrics:
+    """Counters and latency histograms of storage operations, tagged by table and route.
+
+    Operations are timed with timed() (or counted with count()) and
+    aggregated per (operation, table, route). Anything slower than
+    settings.slow_operation_ms is printed and kept in a short log of
+    recent slow operations. Metrics are per process.
+    """
+
+    def __init__(self, slow_ms: Optional[float] = None, slow_log_size: int = 100):
+        self.slow_ms = settings.slow_operation_ms if slow_ms is None else slow_ms
+        self._stats: Dict[tuple, OperationStats] = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, operation: str, table: str, elapsed_ms: Optional[float] = None, size: int = 0):
+        key = (operation, table, current_route.get())
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats()
+            stats.add(elapsed_ms, size)
+            slow = elapsed_ms is not None and self.slow_ms and elapsed_ms >= self.slow_ms
+            if slow:
+                self._slow.append({
+                    "at": datetime.now().isoformat(),
+                    "operation": operation,
+                    "table": table,
+                    "route": key[2],
+                    "ms": round(elapsed_ms, 3),
+                    "bytes": size,
+                })
+        if slow:
+            print(f"🐢 Slow storage operation: {operation} {table} took {elapsed_ms:.1f}ms"
+                  f"{f' ({size} bytes)' if size else ''} during {key[2] or 'background work'}")
+
+    def count(self, operation: str, table: str, size: int = 0):
+        """Count an untimed operation (cheap enough for hot paths)"""
+        self.record(operation, table, None, size)
+
+    @contextmanager
+    def timed(self, operation: str, table: str):
+        """Time the block; it may set the yielded dict's "bytes" entry"""
+        info = {"bytes": 0}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(operation, table, (time.perf_counter() - start) * 1000, info["bytes"])
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data, plus per-table totals and the recent slow operations"""
+        with self._lock:
+            items = [(key, stats) for key, stats in self._stats.items()]
+            slow = list(self._slow)
+
+        operations: List[Dict[str, Any]] = []
+        tables: Dict[str, Dict[str, Any]] = {}
+        for (operation, table, route), stats in sorted(items, key=lambda item: (item[0][1], item[0][0], item[0][2] or "")):
+            operations.append({
+                "operation": operation,
+                "table": table,
+                "route": route,
+                "count": stats.count,
+                "bytes": stats.bytes,
+                "total_ms": round(stats.total_ms, 3),
+                "max_ms": round(stats.max_ms, 3),
+                "p50_ms": stats.percentile(0.5),
+                "p95_ms": stats.percentile(0.95),
+                "p99_ms": stats.percentile(0.99),
+                "histogram": {
+                    (f"le_{bound}" if position < len(BUCKETS_MS) else "inf"): count
+                    for position, (bound, count) in enumerate(zip(BUCKETS_MS + [None], stats.buckets))
+                    if count
+                },
+            })
+            totals = tables.setdefault(table, {})
+            total = totals.setdefault(operation, {"count": 0, "bytes": 0, "total_ms": 0.0})
+            total["count"] += stats.count
+            total["bytes"] += stats.bytes
+            total["total_ms"] = round(total["total_ms"] + stats.total_ms, 3)
+
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "slow_operation_ms": self.slow_ms,
+            "tables": tables,
+            "operations": operations,
+            "slow_operations": slow,
+        }
+
+
+# Process-wide registry used by the storage backends
+metrics = StorageMetrics()
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from datetime import datetime
 from enum import Enum
 
+T = TypeVar("T")
+
 class UserRole(str, Enum):
     STUDENT = "student"
     RECRUITER = "recruiter"
@@ -259,4 +261,20 @@ class SearchResults(BaseModel):
     courses: List[Course] = []
     tutorials: List[Tutorial] = []
     articles: List[Article] = []
-    quizzes: List[Quiz] = [] 
\ No newline at end of file
+    quizzes: List[Quiz] = [] 
+
+class Suggestion(BaseModel):
+    text: str
+    type: str  # course, tutorial, quiz, article, category, tag or author
+    id: Optional[int] = None  # set for course, tutorial, quiz and article titles
+    count: int = 1  # records using the text
+
+class CategorySummary(BaseModel):
+    name: str
+    count: int  # items in the category
+    difficulties: Dict[str, int] = {}  # items per level/difficulty, most common first
+
+# One page of a list endpoint; pass next_cursor back as ?cursor= for the next one
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
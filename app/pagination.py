@@ -0,0 +1,81 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Query, status
+from app.config import settings
+from app.database import async_db
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor resuming a listing after the given ID"""
+    raw = json.dumps({"after": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """ID a cursor resumes after, or None for the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after = json.loads(raw)["after"]
+    except (ValueError, KeyError, TypeError):
+        after = None
+    if not isinstance(after, int) or isinstance(after, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return after
+
+def page_limit(
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.max_page_size,
+        description=f"Items per page (default {settings.default_page_size} with a cursor); without both, the full list"
+    )
+) -> Optional[int]:
+    """Page size query parameter shared by the list endpoints"""
+    return limit
+
+def is_paged(limit: Optional[int], *cursors: Optional[str]) -> bool:
+    """Whether a list request asked for pages.
+    
+    Requests without limit or cursor predate pagination and keep getting the
+    bare list of every item, so existing clients are not broken.
+    """
+    return limit is not None or any(cursors)
+
+def page_or_list(page: Dict[str, Any], limit: Optional[int], *cursors: Optional[str]) -> Any:
+    """The page for paged requests, otherwise just its items (see is_paged)"""
+    return page if is_paged(limit, *cursors) else page["items"]
+
+async def paginate(
+    table: str,
+    limit: Optional[int],
+    cursor: Optional[str] = None,
+    where: Optional[Dict[str, Any]] = None,
+    fields: Optional[List[str]] = None,
+    descending: bool = False
+) -> Dict[str, Any]:
+    """One keyset page of a table in ID order (newest first if descending).
+    
+    Fetches one row beyond the page to tell whether another page follows,
+    and resumes from the last ID seen, so page N costs the same as page 1.
+    Without limit and cursor the single "page" holds every matching row.
+    """
+    if not is_paged(limit, cursor):
+        rows = await async_db.query(table, where=where, fields=fields, order_by="-id" if descending else "id")
+        return {"items": rows, "next_cursor": None}
+    if limit is None:
+        limit = settings.default_page_size
+    rows = await async_db.query(
+        table,
+        where=where,
+        fields=fields,
+        order_by="-id" if descending else "id",
+        limit=limit + 1,
+        after=decode_cursor(cursor)
+    )
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
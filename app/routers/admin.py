@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from app.models import User
+from app.auth import get_current_active_user
+from app.metrics import metrics
+
+router = APIRouter()
+
+def _require_admin(current_user: User):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+@router.get("/metrics")
+async def get_storage_metrics(current_user: User = Depends(get_current_active_user)):
+    """Storage load/save/index timings, bytes and call counts per table and route (admin only)"""
+    _require_admin(current_user)
+    return metrics.snapshot()
+
+@router.delete("/metrics", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_storage_metrics(current_user: User = Depends(get_current_active_user)):
+    """Start collecting storage metrics afresh (admin only)"""
+    _require_admin(current_user)
+    metrics.reset()
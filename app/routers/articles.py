@@ -1,56 +1,60 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
-from app.models import Article, ArticleCreate, ArticleUpdate, ArticleBookmark, ArticleLike, User
-from app.database import db
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+from app.models import Article, ArticleCreate, ArticleUpdate, ArticleBookmark, ArticleLike, User, Page
+from app.database import async_db, DuplicateKeyError
 from app.auth import get_current_active_user
+from app.pagination import paginate, page_limit, page_or_list
+from app.search import search_index
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Article])
-async def get_articles(
-    search: Optional[str] = Query(None, description="Search in title, excerpt, and tags"),
+async def article_filters(
+    search: Optional[str] = Query(None, description="Words to find in title, excerpt, tags and author; all must match (typo-tolerant)"),
     author: Optional[str] = Query(None, description="Filter by author"),
     tag: Optional[str] = Query(None, description="Filter by tag")
-):
-    """Get all articles with optional filtering"""
-    articles = db.read_all("articles")
-    
-    # Convert to Article objects
-    article_list = [Article(**article) for article in articles]
-    
-    # Apply filters
+) -> dict:
+    """Storage-layer where clause of the articles list filters"""
+    # Author and tag lookups intersect the case-insensitive posting lists;
+    # on the tags list a lookup matches when any tag does
+    where = {}
     if search:
-        search_term = search.lower()
-        article_list = [
-            a for a in article_list 
-            if search_term in a.title.lower() or 
-               search_term in a.excerpt.lower() or
-               any(search_term in tag.lower() for tag in a.tags)
-        ]
+        await search_index.filter("articles", search, where)
     
     if author:
-        article_list = [a for a in article_list if a.author.lower() == author.lower()]
+        where["author__ieq"] = author
     
     if tag:
-        article_list = [a for a in article_list if tag.lower() in [t.lower() for t in a.tags]]
+        where["tags__ieq"] = tag
     
-    return article_list
+    return where
+
+@router.get("/", response_model=Union[Page[Article], List[Article]])
+async def get_articles(
+    where: dict = Depends(article_filters),
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Get articles with optional filtering, paged when limit or cursor is given"""
+    page = await paginate("articles", limit, cursor, where=where, fields=list(Article.model_fields))
+    return page_or_list(page, limit, cursor)
+
+@router.get("/facets", response_model=Dict[str, Dict[str, int]])
+async def get_article_facets(where: dict = Depends(article_filters)):
+    """Tag and author counts of the articles matching the same filters as the list"""
+    return await async_db.facets("articles", ["tags", "author"], where)
 
 @router.get("/{article_id}", response_model=Article)
 async def get_article(article_id: int):
     """Get article by ID"""
-    article = db.read("articles", article_id)
+    # Increment view count
+    article = await async_db.increment("articles", article_id, "views")
     if not article:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Article not found"
         )
     
-    # Increment view count
-    current_views = article.get("views", 0)
-    db.update("articles", article_id, {"views": current_views + 1})
-    article["views"] = current_views + 1
-    
     return Article(**article)
 
 @router.post("/", response_model=Article, status_code=status.HTTP_201_CREATED)
@@ -66,10 +70,9 @@ async def create_article(
         )
     
     article_data = article.dict()
-    from datetime import datetime
     article_data["published_date"] = datetime.now().isoformat()
     
-    created_article = db.create("articles", article_data)
+    created_article = await async_db.create("articles", article_data)
     
     return Article(**created_article)
 
@@ -86,7 +89,7 @@ async def update_article(
             detail="Not enough permissions"
         )
     
-    existing_article = db.read("articles", article_id)
+    existing_article = await async_db.read("articles", article_id)
     if not existing_article:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -94,7 +97,7 @@ async def update_article(
         )
     
     update_data = article_update.dict(exclude_unset=True)
-    updated_article = db.update("articles", article_id, update_data)
+    updated_article = await async_db.update("articles", article_id, update_data)
     
     return Article(**updated_article)
 
@@ -110,7 +113,7 @@ async def delete_article(
             detail="Not enough permissions"
         )
     
-    success = db.delete("articles", article_id)
+    success = await async_db.delete("articles", article_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -126,29 +129,26 @@ async def bookmark_article(
 ):
     """Bookmark an article"""
     # Check if article exists
-    article = db.read("articles", article_id)
+    article = await async_db.read("articles", article_id)
     if not article:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Article not found"
         )
     
-    # Check if already bookmarked
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    existing_bookmark = next((b for b in bookmarks if b.get("article_id") == article_id), None)
-    if existing_bookmark:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Article already bookmarked"
-        )
-    
-    # Create bookmark
+    # Create bookmark; the unique (user_id, article_id) index rejects duplicates
     bookmark_data = {
         "user_id": current_user.id,
         "article_id": article_id
     }
     
-    bookmark = db.create("bookmarks", bookmark_data)
+    try:
+        bookmark = await async_db.create("bookmarks", bookmark_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Article already bookmarked"
+        )
     
     return ArticleBookmark(**bookmark)
 
@@ -159,8 +159,7 @@ async def remove_bookmark(
 ):
     """Remove article bookmark"""
     # Find bookmark
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    bookmark = next((b for b in bookmarks if b.get("article_id") == article_id), None)
+    bookmark = await async_db.find_one_by_fields("bookmarks", {"user_id": current_user.id, "article_id": article_id})
     
     if not bookmark:
         raise HTTPException(
@@ -169,7 +168,7 @@ async def remove_bookmark(
         )
     
     # Delete bookmark
-    db.delete("bookmarks", bookmark["id"])
+    await async_db.delete("bookmarks", bookmark["id"])
     
     return {"message": "Bookmark removed successfully"}
 
@@ -179,8 +178,7 @@ async def check_bookmark(
     current_user: User = Depends(get_current_active_user)
 ):
     """Check if user has bookmarked an article"""
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    bookmarked = any(b.get("article_id") == article_id for b in bookmarks)
+    bookmarked = await async_db.exists("bookmarks", {"user_id": current_user.id, "article_id": article_id})
     
     return {"bookmarked": bookmarked}
 
@@ -191,33 +189,30 @@ async def like_article(
 ):
     """Like an article"""
     # Check if article exists
-    article = db.read("articles", article_id)
+    article = await async_db.read("articles", article_id)
     if not article:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Article not found"
         )
     
-    # Check if already liked
-    likes = db.find_by_field("likes", "user_id", current_user.id)
-    existing_like = next((l for l in likes if l.get("article_id") == article_id), None)
-    if existing_like:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Article already liked"
-        )
-    
-    # Create like
+    # Create like; the unique (user_id, article_id) index rejects duplicates
     like_data = {
         "user_id": current_user.id,
-        "article_id": article_id
+        "article_id": article_id,
+        "liked_at": datetime.now().isoformat()
     }
     
-    like = db.create("likes", like_data)
-    
-    # Update article like count
-    current_likes = article.get("likes", 0)
-    db.update("articles", article_id, {"likes": current_likes + 1})
+    # The like and the article's like count are committed together
+    try:
+        async with async_db.transaction() as tx:
+            like = tx.create("likes", like_data)
+            tx.increment("articles", article_id, "likes")
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Article already liked"
+        )
     
     return ArticleLike(**like)
 
@@ -228,8 +223,7 @@ async def unlike_article(
 ):
     """Remove article like"""
     # Find like
-    likes = db.find_by_field("likes", "user_id", current_user.id)
-    like = next((l for l in likes if l.get("article_id") == article_id), None)
+    like = await async_db.find_one_by_fields("likes", {"user_id": current_user.id, "article_id": article_id})
     
     if not like:
         raise HTTPException(
@@ -237,14 +231,10 @@ async def unlike_article(
             detail="Like not found"
         )
     
-    # Delete like
-    db.delete("likes", like["id"])
-    
-    # Update article like count
-    article = db.read("articles", article_id)
-    if article:
-        current_likes = max(0, article.get("likes", 1) - 1)
-        db.update("articles", article_id, {"likes": current_likes})
+    # Delete the like and update the article's like count together
+    async with async_db.transaction() as tx:
+        tx.delete("likes", like["id"])
+        tx.increment("articles", article_id, "likes", -1, minimum=0)
     
     return {"message": "Like removed successfully"}
 
@@ -254,7 +244,6 @@ async def check_like(
     current_user: User = Depends(get_current_active_user)
 ):
     """Check if user has liked an article"""
-    likes = db.find_by_field("likes", "user_id", current_user.id)
-    liked = any(l.get("article_id") == article_id for l in likes)
+    liked = await async_db.exists("likes", {"user_id": current_user.id, "article_id": article_id})
     
     return {"liked": liked} 
\ No newline at end of file
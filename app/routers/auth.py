@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from app.models import UserCreate, User, UserLogin, Token
-from app.database import db
+from app.database import async_db, DuplicateKeyError
 from app.auth import (
     get_password_hash,
     authenticate_user,
@@ -17,7 +18,7 @@ router = APIRouter()
 async def register(user: UserCreate):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.find_one_by_field("users", "email", user.email)
+    existing_user = await async_db.find_one_by_field("users", "email", user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,7 +26,7 @@ async def register(user: UserCreate):
         )
     
     # Check if username already exists
-    existing_username = db.find_one_by_field("users", "username", user.username)
+    existing_username = await async_db.find_one_by_field("users", "username", user.username)
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,7 +35,7 @@ async def register(user: UserCreate):
     
     # Create new user
     user_data = user.dict()
-    user_data["password"] = get_password_hash(user.password)
+    user_data["password"] = await run_in_threadpool(get_password_hash, user.password)
     
     # Add default values
     user_data.update({
@@ -43,7 +44,13 @@ async def register(user: UserCreate):
         "skills": []
     })
     
-    created_user = db.create("users", user_data)
+    try:
+        created_user = await async_db.create("users", user_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     
     # Remove password from response
     created_user.pop("password", None)
@@ -52,7 +59,7 @@ async def register(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login user with email and password"""
-    user = authenticate_user(form_data.username, form_data.password)  # username field is used for email
+    user = await run_in_threadpool(authenticate_user, form_data.username, form_data.password)  # username field is used for email
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -69,7 +76,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 @router.post("/login-json", response_model=Token)
 async def login_json(user_login: UserLogin):
     """Login user with JSON payload"""
-    user = authenticate_user(user_login.email, user_login.password)
+    user = await run_in_threadpool(authenticate_user, user_login.email, user_login.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,43 +1,63 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
-from app.models import Course, CourseCreate, CourseUpdate, CourseEnrollment, User
-from app.database import db
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+from app.models import Course, CourseCreate, CourseUpdate, CourseEnrollment, CategorySummary, User, Page
+from app.database import async_db, DuplicateKeyError
 from app.auth import get_current_active_user
+from app.pagination import paginate, page_limit, page_or_list
+from app.search import search_index
+from app.catalog import category_catalog
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Course])
-async def get_courses(
+async def course_filters(
     category: Optional[str] = Query(None, description="Filter by category"),
     level: Optional[str] = Query(None, description="Filter by difficulty level"),
-    search: Optional[str] = Query(None, description="Search in title and description")
-):
-    """Get all courses with optional filtering"""
-    courses = db.read_all("courses")
-    
-    # Convert to Course objects
-    course_list = [Course(**course) for course in courses]
-    
-    # Apply filters
+    search: Optional[str] = Query(None, description="Words to find in title, description and category; all must match (typo-tolerant)")
+) -> dict:
+    """Storage-layer where clause of the courses list filters"""
+    where = {}
     if category:
-        course_list = [c for c in course_list if c.category.lower() == category.lower()]
+        where["category__ieq"] = category
     
     if level:
-        course_list = [c for c in course_list if c.level.lower() == level.lower()]
+        where["level__ieq"] = level
     
     if search:
-        search_term = search.lower()
-        course_list = [
-            c for c in course_list 
-            if search_term in c.title.lower() or search_term in c.description.lower()
-        ]
+        await search_index.filter("courses", search, where)
     
-    return course_list
+    return where
+
+@router.get("/", response_model=Union[Page[Course], List[Course]])
+async def get_courses(
+    where: dict = Depends(course_filters),
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Get courses with optional filtering, paged when limit or cursor is given"""
+    # Filters are evaluated in the storage layer; only matching rows are copied
+    page = await paginate("courses", limit, cursor, where=where, fields=list(Course.model_fields))
+    return page_or_list(page, limit, cursor)
+
+@router.get("/facets", response_model=Dict[str, Dict[str, int]])
+async def get_course_facets(where: dict = Depends(course_filters)):
+    """Category and level counts of the courses matching the same filters as the list"""
+    return await async_db.facets("courses", ["category", "level"], where)
+
+@router.get("/categories", response_model=List[str])
+async def get_course_categories():
+    """Get all course categories"""
+    return await category_catalog.get_names("courses")
+
+@router.get("/categories/summary", response_model=List[CategorySummary])
+async def get_course_category_summary():
+    """Course count and level breakdown of every category, largest first"""
+    return await category_catalog.get_summary("courses")
 
 @router.get("/{course_id}", response_model=Course)
 async def get_course(course_id: int):
     """Get course by ID"""
-    course = db.read("courses", course_id)
+    course = await async_db.read("courses", course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -59,7 +79,7 @@ async def create_course(
         )
     
     course_data = course.dict()
-    created_course = db.create("courses", course_data)
+    created_course = await async_db.create("courses", course_data)
     
     return Course(**created_course)
 
@@ -70,33 +90,30 @@ async def enroll_in_course(
 ):
     """Enroll in a course"""
     # Check if course exists
-    course = db.read("courses", course_id)
+    course = await async_db.read("courses", course_id)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Course not found"
         )
     
-    # Check if already enrolled
-    enrollments = db.find_by_field("enrollments", "user_id", current_user.id)
-    existing_enrollment = next((e for e in enrollments if e.get("course_id") == course_id), None)
-    if existing_enrollment:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already enrolled in this course"
-        )
-    
-    # Create enrollment
+    # Create enrollment; the unique (user_id, course_id) index rejects duplicates
     enrollment_data = {
         "user_id": current_user.id,
         "course_id": course_id,
+        "enrolled_at": datetime.now().isoformat(),
         "progress": 0.0
     }
     
-    enrollment = db.create("enrollments", enrollment_data)
-    
-    # Update course student count
-    current_students = course.get("students", 0)
-    db.update("courses", course_id, {"students": current_students + 1})
+    # The enrollment and the course's student count are committed together
+    try:
+        async with async_db.transaction() as tx:
+            enrollment = tx.create("enrollments", enrollment_data)
+            tx.increment("courses", course_id, "students")
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Already enrolled in this course"
+        )
     
     return CourseEnrollment(**enrollment) 
\ No newline at end of file
@@ -1,38 +1,73 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from app.models import DashboardStats, SearchResults, User, Course, Tutorial, Article, Quiz
-from app.database import db
+from app.database import async_db
 from app.auth import get_current_active_user
+from app.config import settings
+from app.pagination import paginate, page_limit, is_paged, page_or_list
+from app.identity_map import IdentityMap, get_identity_map
+from app.search import search_index
 
 router = APIRouter()
 
+async def _joined_page(
+    table: str,
+    user_id: int,
+    limit: Optional[int],
+    cursor: Optional[str],
+    target: str,
+    key: str,
+    descending: bool = False
+) -> dict:
+    """A page of a user's rows in table, each paired with its record in target.
+    
+    Only the records referenced by the page are read (by primary key), not
+    the whole target table. Rows whose target no longer exists are dropped.
+    """
+    page = await paginate(table, limit, cursor, where={"user_id": user_id}, descending=descending)
+    ids = {row[key] for row in page["items"] if row.get(key) is not None}
+    targets = await async_db.query(target, where={"id__in": ids})
+    target_dict = {item["id"]: item for item in targets}
+    page["items"] = [(row, target_dict[row[key]]) for row in page["items"] if row.get(key) in target_dict]
+    return page
+
+async def _user_totals(table: str, user_id: int, field: str) -> Tuple[int, float, int]:
+    """How many rows a user has in table, the sum of a numeric field over them,
+    and how many have the field set.
+    
+    Aggregated on the packed columnar snapshot when available, so no records
+    are loaded; otherwise falls back to the user_id index.
+    """
+    columns = await async_db.select_columns(table, [field], where={"user_id": user_id})
+    if columns is not None:
+        return columns.count(), columns.total(field), columns.present(field)
+    rows = await async_db.find_by_field(table, "user_id", user_id)
+    values = [row.get(field) for row in rows]
+    total = sum(value for value in values if isinstance(value, (int, float)))
+    return len(rows), total, len([value for value in values if value])
+
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(current_user: User = Depends(get_current_active_user)):
     """Get comprehensive dashboard statistics for the user"""
     
     # Get enrollments
-    enrollments = db.find_by_field("enrollments", "user_id", current_user.id)
-    enrolled_courses = len(enrollments)
-    completed_courses = len([e for e in enrollments if e.get("completed_at")])
+    enrolled_courses, _, completed_courses = await _user_totals("enrollments", current_user.id, "completed_at")
     
     # Get tutorial completions
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    completed_tutorials = len(completions)
-    total_tutorials = len(db.read_all("tutorials"))
+    completed_tutorials, _, _ = await _user_totals("completions", current_user.id, "id")
+    total_tutorials = len(await async_db.read_all("tutorials"))
     
     # Get article interactions
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    likes = db.find_by_field("likes", "user_id", current_user.id)
+    bookmarks = await async_db.find_by_field("bookmarks", "user_id", current_user.id)
+    read_articles, _, _ = await _user_totals("likes", current_user.id, "id")  # Using likes as a proxy for read articles
     bookmarked_articles = len(bookmarks)
-    read_articles = len(likes)  # Using likes as a proxy for read articles
     
     # Get quiz attempts
-    quiz_attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    total_quiz_attempts = len(quiz_attempts)
+    total_quiz_attempts, total_score, _ = await _user_totals("quiz_attempts", current_user.id, "score")
     
     # Calculate average quiz score
-    if quiz_attempts:
-        average_quiz_score = sum(attempt.get("score", 0) for attempt in quiz_attempts) / len(quiz_attempts)
+    if total_quiz_attempts:
+        average_quiz_score = total_score / total_quiz_attempts
     else:
         average_quiz_score = 0
     
@@ -56,119 +91,117 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_active_us
     )
 
 @router.get("/my-courses")
-async def get_my_courses(current_user: User = Depends(get_current_active_user)):
-    """Get user's enrolled courses with progress"""
-    enrollments = db.find_by_field("enrollments", "user_id", current_user.id)
+async def get_my_courses(
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the user's enrolled courses with progress, paged when limit or cursor is given"""
+    page = await _joined_page("enrollments", current_user.id, limit, cursor, "courses", "course_id")
     
-    # Get course details
+    # Attach the enrollment to each course
     courses = []
-    all_courses = db.read_all("courses")
-    course_dict = {course["id"]: course for course in all_courses}
-    
-    for enrollment in enrollments:
-        course_id = enrollment.get("course_id")
-        if course_id in course_dict:
-            course_data = course_dict[course_id].copy()
-            course_data["enrollment"] = enrollment
-            courses.append(course_data)
+    for enrollment, course in page["items"]:
+        course_data = course.copy()
+        course_data["enrollment"] = enrollment
+        courses.append(course_data)
     
-    return courses
+    return page_or_list({"items": courses, "next_cursor": page["next_cursor"]}, limit, cursor)
 
 @router.get("/my-tutorials")
-async def get_my_tutorials(current_user: User = Depends(get_current_active_user)):
-    """Get user's completed tutorials"""
-    completions = db.find_by_field("completions", "user_id", current_user.id)
+async def get_my_tutorials(
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the user's completed tutorials, paged when limit or cursor is given"""
+    page = await _joined_page("completions", current_user.id, limit, cursor, "tutorials", "tutorial_id")
     
-    # Get tutorial details
+    # Attach the completion to each tutorial
     tutorials = []
-    all_tutorials = db.read_all("tutorials")
-    tutorial_dict = {tutorial["id"]: tutorial for tutorial in all_tutorials}
+    for completion, tutorial in page["items"]:
+        tutorial_data = tutorial.copy()
+        tutorial_data["completion"] = completion
+        tutorials.append(tutorial_data)
     
-    for completion in completions:
-        tutorial_id = completion.get("tutorial_id")
-        if tutorial_id in tutorial_dict:
-            tutorial_data = tutorial_dict[tutorial_id].copy()
-            tutorial_data["completion"] = completion
-            tutorials.append(tutorial_data)
-    
-    return tutorials
+    return page_or_list({"items": tutorials, "next_cursor": page["next_cursor"]}, limit, cursor)
 
 @router.get("/my-articles")
-async def get_my_articles(current_user: User = Depends(get_current_active_user)):
-    """Get user's bookmarked and liked articles"""
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    likes = db.find_by_field("likes", "user_id", current_user.id)
-    
-    # Get article details
-    all_articles = db.read_all("articles")
-    article_dict = {article["id"]: article for article in all_articles}
+async def get_my_articles(
+    limit: Optional[int] = Depends(page_limit),
+    bookmarked_cursor: Optional[str] = Query(None, description="bookmarked.next_cursor of the previous page"),
+    liked_cursor: Optional[str] = Query(None, description="liked.next_cursor of the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the user's bookmarked and liked articles, a page of each when limit or a cursor is given"""
+    paged = is_paged(limit, bookmarked_cursor, liked_cursor)
+    if paged and limit is None:
+        # Either cursor pages both lists
+        limit = settings.default_page_size
+    bookmarks = await _joined_page("bookmarks", current_user.id, limit, bookmarked_cursor, "articles", "article_id")
+    likes = await _joined_page("likes", current_user.id, limit, liked_cursor, "articles", "article_id")
     
     bookmarked_articles = []
-    for bookmark in bookmarks:
-        article_id = bookmark.get("article_id")
-        if article_id in article_dict:
-            article_data = article_dict[article_id].copy()
-            article_data["bookmarked_at"] = bookmark.get("bookmarked_at")
-            bookmarked_articles.append(article_data)
+    for bookmark, article in bookmarks["items"]:
+        article_data = article.copy()
+        article_data["bookmarked_at"] = bookmark.get("bookmarked_at")
+        bookmarked_articles.append(article_data)
     
     liked_articles = []
-    for like in likes:
-        article_id = like.get("article_id")
-        if article_id in article_dict:
-            article_data = article_dict[article_id].copy()
-            article_data["liked_at"] = like.get("liked_at")
-            liked_articles.append(article_data)
+    for like, article in likes["items"]:
+        article_data = article.copy()
+        article_data["liked_at"] = like.get("liked_at")
+        liked_articles.append(article_data)
+    
+    if not paged:
+        return {"bookmarked": bookmarked_articles, "liked": liked_articles}
     
     return {
-        "bookmarked": bookmarked_articles,
-        "liked": liked_articles
+        "bookmarked": {"items": bookmarked_articles, "next_cursor": bookmarks["next_cursor"]},
+        "liked": {"items": liked_articles, "next_cursor": likes["next_cursor"]}
     }
 
 @router.get("/my-quiz-history")
-async def get_my_quiz_history(current_user: User = Depends(get_current_active_user)):
-    """Get user's quiz attempt history"""
-    attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    
-    # Get quiz details
-    all_quizzes = db.read_all("quizzes")
-    quiz_dict = {quiz["id"]: quiz for quiz in all_quizzes}
+async def get_my_quiz_history(
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the user's quiz attempt history (most recent first), paged when limit or cursor is given"""
+    page = await _joined_page(
+        "quiz_attempts", current_user.id, limit, cursor, "quizzes", "quiz_id", descending=True
+    )
     
     # Enhance attempts with quiz details
     enhanced_attempts = []
-    for attempt in attempts:
-        quiz_id = attempt.get("quiz_id")
-        if quiz_id in quiz_dict:
-            attempt_data = attempt.copy()
-            attempt_data["quiz"] = quiz_dict[quiz_id]
-            enhanced_attempts.append(attempt_data)
-    
-    # Sort by attempt date (most recent first)
-    enhanced_attempts.sort(key=lambda x: x.get("attempted_at", ""), reverse=True)
+    for attempt, quiz in page["items"]:
+        attempt_data = attempt.copy()
+        attempt_data["quiz"] = quiz
+        enhanced_attempts.append(attempt_data)
     
-    return enhanced_attempts
+    return page_or_list({"items": enhanced_attempts, "next_cursor": page["next_cursor"]}, limit, cursor)
 
 @router.get("/search", response_model=SearchResults)
 async def search_content(
     q: str = Query(..., description="Search query"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum results per content type"),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Search across all content types"""
-    search_term = q.lower()
-    
+    """Search across all content types, best matches first"""
     # Search courses
-    courses = db.search("courses", search_term, ["title", "description", "category"])
+    courses = await search_index.search_rows("courses", q, limit)
     course_results = [Course(**course) for course in courses]
     
     # Search tutorials
-    tutorials = db.search("tutorials", search_term, ["title", "description", "category"])
+    tutorials = await search_index.search_rows("tutorials", q, limit)
     tutorial_results = [Tutorial(**tutorial) for tutorial in tutorials]
     
     # Search articles
-    articles = db.search("articles", search_term, ["title", "excerpt", "author", "tags"])
+    articles = await search_index.search_rows("articles", q, limit)
     article_results = [Article(**article) for article in articles]
     
     # Search quizzes
-    quizzes = db.search("quizzes", search_term, ["title", "description", "category"])
+    quizzes = await search_index.search_rows("quizzes", q, limit)
     quiz_results = [Quiz(**quiz) for quiz in quizzes]
     
     return SearchResults(
@@ -181,15 +214,17 @@ async def search_content(
 @router.get("/recent-activity")
 async def get_recent_activity(
     limit: int = Query(20, le=50),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: IdentityMap = Depends(get_identity_map)
 ):
     """Get user's recent activity across all content types"""
     activities = []
     
     # Recent enrollments
-    enrollments = db.find_by_field("enrollments", "user_id", current_user.id)
-    for enrollment in enrollments[-5:]:  # Last 5 enrollments
-        course = db.read("courses", enrollment.get("course_id"))
+    enrollments = (await store.find_by_field("enrollments", "user_id", current_user.id))[-5:]  # Last 5 enrollments
+    courses = await store.read_many("courses", [e.get("course_id") for e in enrollments])
+    for enrollment in enrollments:
+        course = courses.get(enrollment.get("course_id"))
         if course:
             activities.append({
                 "type": "enrollment",
@@ -201,9 +236,10 @@ async def get_recent_activity(
             })
     
     # Recent tutorial completions
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    for completion in completions[-5:]:  # Last 5 completions
-        tutorial = db.read("tutorials", completion.get("tutorial_id"))
+    completions = (await store.find_by_field("completions", "user_id", current_user.id))[-5:]  # Last 5 completions
+    tutorials = await store.read_many("tutorials", [c.get("tutorial_id") for c in completions])
+    for completion in completions:
+        tutorial = tutorials.get(completion.get("tutorial_id"))
         if tutorial:
             activities.append({
                 "type": "completion",
@@ -215,9 +251,10 @@ async def get_recent_activity(
             })
     
     # Recent article bookmarks
-    bookmarks = db.find_by_field("bookmarks", "user_id", current_user.id)
-    for bookmark in bookmarks[-5:]:  # Last 5 bookmarks
-        article = db.read("articles", bookmark.get("article_id"))
+    bookmarks = (await store.find_by_field("bookmarks", "user_id", current_user.id))[-5:]  # Last 5 bookmarks
+    articles = await store.read_many("articles", [b.get("article_id") for b in bookmarks])
+    for bookmark in bookmarks:
+        article = articles.get(bookmark.get("article_id"))
         if article:
             activities.append({
                 "type": "bookmark",
@@ -229,9 +266,10 @@ async def get_recent_activity(
             })
     
     # Recent quiz attempts
-    quiz_attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    for attempt in quiz_attempts[-5:]:  # Last 5 attempts
-        quiz = db.read("quizzes", attempt.get("quiz_id"))
+    quiz_attempts = (await store.find_by_field("quiz_attempts", "user_id", current_user.id))[-5:]  # Last 5 attempts
+    quizzes = await store.read_many("quizzes", [a.get("quiz_id") for a in quiz_attempts])
+    for attempt in quiz_attempts:
+        quiz = quizzes.get(attempt.get("quiz_id"))
         if quiz:
             activities.append({
                 "type": "quiz_attempt",
@@ -243,26 +281,27 @@ async def get_recent_activity(
             })
     
     # Sort by date (most recent first)
-    activities.sort(key=lambda x: x.get("date", ""), reverse=True)
+    activities.sort(key=lambda x: x.get("date") or "", reverse=True)
     
     return activities[:limit]
 
 @router.get("/recommendations")
 async def get_recommendations(
     limit: int = Query(10, le=20),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    store: IdentityMap = Depends(get_identity_map)
 ):
     """Get personalized content recommendations"""
     # Get user's interests based on their activity
-    enrollments = db.find_by_field("enrollments", "user_id", current_user.id)
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    quiz_attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
+    enrollments = await store.find_by_field("enrollments", "user_id", current_user.id)
+    completions = await store.find_by_field("completions", "user_id", current_user.id)
+    quiz_attempts = await store.find_by_field("quiz_attempts", "user_id", current_user.id)
     
     # Collect categories from user's activity
     user_categories = set()
     
     # From enrolled courses
-    all_courses = db.read_all("courses")
+    all_courses = await store.read_all("courses")
     course_dict = {course["id"]: course for course in all_courses}
     for enrollment in enrollments:
         course_id = enrollment.get("course_id")
@@ -270,7 +309,7 @@ async def get_recommendations(
             user_categories.add(course_dict[course_id].get("category", "").lower())
     
     # From completed tutorials
-    all_tutorials = db.read_all("tutorials")
+    all_tutorials = await store.read_all("tutorials")
     tutorial_dict = {tutorial["id"]: tutorial for tutorial in all_tutorials}
     for completion in completions:
         tutorial_id = completion.get("tutorial_id")
@@ -278,7 +317,7 @@ async def get_recommendations(
             user_categories.add(tutorial_dict[tutorial_id].get("category", "").lower())
     
     # From quiz attempts
-    all_quizzes = db.read_all("quizzes")
+    all_quizzes = await store.read_all("quizzes")
     quiz_dict = {quiz["id"]: quiz for quiz in all_quizzes}
     for attempt in quiz_attempts:
         quiz_id = attempt.get("quiz_id")
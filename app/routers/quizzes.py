@@ -1,43 +1,124 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
-from app.models import Quiz, QuizCreate, QuizUpdate, QuizAttempt, QuizSubmission, QuizResult, User
-from app.database import db
+from typing import Dict, List, Optional, Union
+from datetime import datetime, timedelta
+from app.models import Quiz, QuizCreate, QuizUpdate, QuizAttempt, QuizSubmission, QuizResult, CategorySummary, User, Page
+from app.database import async_db
 from app.auth import get_current_active_user
+from app.pagination import paginate, page_limit, page_or_list
+from app.search import search_index
+from app.catalog import category_catalog
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Quiz])
-async def get_quizzes(
+async def quiz_filters(
     category: Optional[str] = Query(None, description="Filter by category"),
     difficulty: Optional[str] = Query(None, description="Filter by difficulty level"),
-    search: Optional[str] = Query(None, description="Search in title and description")
-):
-    """Get all quizzes with optional filtering"""
-    quizzes = db.read_all("quizzes")
-    
-    # Convert to Quiz objects
-    quiz_list = [Quiz(**quiz) for quiz in quizzes]
-    
-    # Apply filters
+    search: Optional[str] = Query(None, description="Words to find in title, description and category; all must match (typo-tolerant)")
+) -> dict:
+    """Storage-layer where clause of the quizzes list filters"""
+    where = {}
     if category:
-        quiz_list = [q for q in quiz_list if q.category.lower() == category.lower()]
+        where["category__ieq"] = category
     
     if difficulty:
-        quiz_list = [q for q in quiz_list if q.difficulty.lower() == difficulty.lower()]
+        where["difficulty__ieq"] = difficulty
     
     if search:
-        search_term = search.lower()
-        quiz_list = [
-            q for q in quiz_list 
-            if search_term in q.title.lower() or search_term in q.description.lower()
-        ]
+        await search_index.filter("quizzes", search, where)
     
-    return quiz_list
+    return where
+
+@router.get("/", response_model=Union[Page[Quiz], List[Quiz]])
+async def get_quizzes(
+    where: dict = Depends(quiz_filters),
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Get quizzes with optional filtering, paged when limit or cursor is given"""
+    # Filters are evaluated in the storage layer; only matching rows are copied
+    page = await paginate("quizzes", limit, cursor, where=where, fields=list(Quiz.model_fields))
+    return page_or_list(page, limit, cursor)
+
+@router.get("/facets", response_model=Dict[str, Dict[str, int]])
+async def get_quiz_facets(where: dict = Depends(quiz_filters)):
+    """Category and difficulty counts of the quizzes matching the same filters as the list"""
+    return await async_db.facets("quizzes", ["category", "difficulty"], where)
+
+@router.get("/categories")
+async def get_quiz_categories():
+    """Get all quiz categories"""
+    return await category_catalog.get_names("quizzes")
+
+@router.get("/categories/summary", response_model=List[CategorySummary])
+async def get_quiz_category_summary():
+    """Quiz count and difficulty breakdown of every category, largest first"""
+    return await category_catalog.get_summary("quizzes")
+
+@router.get("/stats")
+async def get_quiz_stats(current_user: User = Depends(get_current_active_user)):
+    """Get user's quiz statistics"""
+    # Only quiz_id and score are needed, so aggregate the packed columns when available
+    columns = await async_db.select_columns("quiz_attempts", ["quiz_id", "score"], where={"user_id": current_user.id})
+    if columns is not None:
+        total_attempts = columns.count()
+        passed_attempts = columns.at_least("score", 60)
+        quiz_totals = columns.totals_by("quiz_id", "score")
+    else:
+        attempts = await async_db.find_by_field("quiz_attempts", "user_id", current_user.id)
+        total_attempts = len(attempts)
+        passed_attempts = len([a for a in attempts if a.get("score", 0) >= 60])
+        # Score sum and attempt count per quiz
+        quiz_totals = {}
+        for attempt in attempts:
+            totals = quiz_totals.setdefault(attempt.get("quiz_id"), [0, 0])
+            totals[0] += attempt.get("score", 0)
+            totals[1] += 1
+    
+    if not total_attempts:
+        return {
+            "total_attempts": 0,
+            "quizzes_attempted": 0,
+            "average_score": 0,
+            "passed_quizzes": 0,
+            "best_category": None
+        }
+    
+    # Calculate stats
+    unique_quizzes = len(quiz_totals)
+    average_score = sum(total for total, _ in quiz_totals.values()) / total_attempts
+    
+    # Find best category (one step per attempted quiz, not per attempt)
+    quizzes = await async_db.query("quizzes", where={"id__in": list(quiz_totals)}, fields=["id", "category"])
+    quiz_dict = {q["id"]: q for q in quizzes}
+    
+    category_scores = {}
+    for quiz_id, (total, count) in quiz_totals.items():
+        if quiz_id in quiz_dict:
+            category = quiz_dict[quiz_id].get("category", "")
+            scores = category_scores.setdefault(category, [0, 0])
+            scores[0] += total
+            scores[1] += count
+    
+    best_category = None
+    best_avg = 0
+    for category, (total, count) in category_scores.items():
+        avg = total / count
+        if avg > best_avg:
+            best_avg = avg
+            best_category = category
+    
+    return {
+        "total_attempts": total_attempts,
+        "quizzes_attempted": unique_quizzes,
+        "average_score": round(average_score, 2),
+        "passed_quizzes": passed_attempts,
+        "best_category": best_category
+    }
 
 @router.get("/{quiz_id}", response_model=Quiz)
 async def get_quiz(quiz_id: int, include_answers: bool = Query(False)):
     """Get quiz by ID"""
-    quiz = db.read("quizzes", quiz_id)
+    quiz = await async_db.read("quizzes", quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,7 +146,7 @@ async def create_quiz(
         )
     
     quiz_data = quiz.dict()
-    created_quiz = db.create("quizzes", quiz_data)
+    created_quiz = await async_db.create("quizzes", quiz_data)
     
     return Quiz(**created_quiz)
 
@@ -82,7 +163,7 @@ async def update_quiz(
             detail="Not enough permissions"
         )
     
-    existing_quiz = db.read("quizzes", quiz_id)
+    existing_quiz = await async_db.read("quizzes", quiz_id)
     if not existing_quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -90,7 +171,7 @@ async def update_quiz(
         )
     
     update_data = quiz_update.dict(exclude_unset=True)
-    updated_quiz = db.update("quizzes", quiz_id, update_data)
+    updated_quiz = await async_db.update("quizzes", quiz_id, update_data)
     
     return Quiz(**updated_quiz)
 
@@ -106,7 +187,7 @@ async def delete_quiz(
             detail="Not enough permissions"
         )
     
-    success = db.delete("quizzes", quiz_id)
+    success = await async_db.delete("quizzes", quiz_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -123,7 +204,7 @@ async def submit_quiz(
 ):
     """Submit quiz answers and get results"""
     # Check if quiz exists
-    quiz = db.read("quizzes", quiz_id)
+    quiz = await async_db.read("quizzes", quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -180,10 +261,9 @@ async def submit_quiz(
         "answers": submission.answers
     }
     
-    from datetime import datetime
     attempt_data["completed_at"] = datetime.now().isoformat()
     
-    db.create("quiz_attempts", attempt_data)
+    await async_db.create("quiz_attempts", attempt_data)
     
     return QuizResult(
         quiz_id=quiz_id,
@@ -200,8 +280,7 @@ async def get_quiz_attempts(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get user's quiz attempts"""
-    attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    quiz_attempts = [a for a in attempts if a.get("quiz_id") == quiz_id]
+    quiz_attempts = await async_db.find_by_fields("quiz_attempts", {"user_id": current_user.id, "quiz_id": quiz_id})
     
     return quiz_attempts
 
@@ -211,8 +290,7 @@ async def get_best_score(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get user's best score for a quiz"""
-    attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    quiz_attempts = [a for a in attempts if a.get("quiz_id") == quiz_id]
+    quiz_attempts = await async_db.find_by_fields("quiz_attempts", {"user_id": current_user.id, "quiz_id": quiz_id})
     
     if not quiz_attempts:
         return {"best_score": None, "attempts": 0}
@@ -226,11 +304,31 @@ async def get_best_score(
     }
 
 @router.get("/{quiz_id}/leaderboard")
-async def get_quiz_leaderboard(quiz_id: int, limit: int = Query(10, le=50)):
+async def get_quiz_leaderboard(
+    quiz_id: int,
+    limit: int = Query(10, le=50),
+    days: Optional[int] = Query(None, ge=1, description="Only count attempts from the last N days")
+):
     """Get quiz leaderboard"""
-    # Get all attempts for this quiz
-    all_attempts = db.read_all("quiz_attempts")
-    quiz_attempts = [a for a in all_attempts if a.get("quiz_id") == quiz_id]
+    since = datetime.now() - timedelta(days=days) if days else None
+    
+    # Packed columns of this quiz's attempts when columnar snapshots are on;
+    # only the monthly attempt segments inside the window are read
+    fields = ["user_id", "score", "correct_answers", "total_questions"]
+    columns = await async_db.select_columns(
+        "quiz_attempts", fields, where={"quiz_id": quiz_id},
+        ranges={"completed_at": (since, None)} if since else None
+    )
+    if columns is not None:
+        # Best attempt per user, ranked on the arrays; only the top rows become dicts
+        quiz_attempts = [columns.row(position) for position in columns.best_per("user_id", "score", limit)]
+    elif since:
+        quiz_attempts = await async_db.find_in_range(
+            "quiz_attempts", "completed_at", start=since, criteria={"quiz_id": quiz_id}
+        )
+    else:
+        # Get all attempts for this quiz
+        quiz_attempts = await async_db.find_by_field("quiz_attempts", "quiz_id", quiz_id)
     
     # Group by user and get best score
     user_best_scores = {}
@@ -251,7 +349,7 @@ async def get_quiz_leaderboard(quiz_id: int, limit: int = Query(10, le=50)):
     leaderboard = sorted(user_best_scores.values(), key=lambda x: x["score"], reverse=True)
     
     # Add user information
-    users = db.read_all("users")
+    users = await async_db.read_all("users")
     user_dict = {user["id"]: user for user in users}
     
     for entry in leaderboard:
@@ -263,60 +361,4 @@ async def get_quiz_leaderboard(quiz_id: int, limit: int = Query(10, le=50)):
             entry["username"] = "Unknown"
             entry["full_name"] = ""
     
-    return leaderboard[:limit]
-
-@router.get("/categories")
-async def get_quiz_categories():
-    """Get all quiz categories"""
-    quizzes = db.read_all("quizzes")
-    categories = list(set(quiz.get("category", "") for quiz in quizzes if quiz.get("category")))
-    return sorted(categories)
-
-@router.get("/stats")
-async def get_quiz_stats(current_user: User = Depends(get_current_active_user)):
-    """Get user's quiz statistics"""
-    attempts = db.find_by_field("quiz_attempts", "user_id", current_user.id)
-    
-    if not attempts:
-        return {
-            "total_attempts": 0,
-            "quizzes_attempted": 0,
-            "average_score": 0,
-            "passed_quizzes": 0,
-            "best_category": None
-        }
-    
-    # Calculate stats
-    total_attempts = len(attempts)
-    unique_quizzes = len(set(a.get("quiz_id") for a in attempts))
-    average_score = sum(a.get("score", 0) for a in attempts) / total_attempts
-    passed_attempts = len([a for a in attempts if a.get("score", 0) >= 60])
-    
-    # Find best category
-    quizzes = db.read_all("quizzes")
-    quiz_dict = {q["id"]: q for q in quizzes}
-    
-    category_scores = {}
-    for attempt in attempts:
-        quiz_id = attempt.get("quiz_id")
-        if quiz_id in quiz_dict:
-            category = quiz_dict[quiz_id].get("category", "")
-            if category not in category_scores:
-                category_scores[category] = []
-            category_scores[category].append(attempt.get("score", 0))
-    
-    best_category = None
-    best_avg = 0
-    for category, scores in category_scores.items():
-        avg = sum(scores) / len(scores)
-        if avg > best_avg:
-            best_avg = avg
-            best_category = category
-    
-    return {
-        "total_attempts": total_attempts,
-        "quizzes_attempted": unique_quizzes,
-        "average_score": round(average_score, 2),
-        "passed_quizzes": passed_attempts,
-        "best_category": best_category
-    } 
\ No newline at end of file
+    return leaderboard[:limit] 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+from typing import List
+from app.models import Suggestion
+from app.database import async_db
+from app.search import search_index
+
+router = APIRouter()
+
+@router.get("/suggest", response_model=List[Suggestion])
+async def suggest(
+    q: str = Query(..., description="What has been typed so far"),
+    limit: int = Query(10, ge=1, le=20)
+):
+    """Typeahead completions from titles, categories, tags and authors"""
+    return await async_db.call(search_index.suggest, q, limit)
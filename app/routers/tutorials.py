@@ -1,54 +1,70 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
-from app.models import Tutorial, TutorialCreate, TutorialUpdate, TutorialCompletion, User
-from app.database import db
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+from app.models import Tutorial, TutorialCreate, TutorialUpdate, TutorialCompletion, CategorySummary, User, Page
+from app.database import async_db, DuplicateKeyError
 from app.auth import get_current_active_user
+from app.pagination import paginate, page_limit, page_or_list
+from app.search import search_index
+from app.catalog import category_catalog
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Tutorial])
-async def get_tutorials(
+async def tutorial_filters(
     category: Optional[str] = Query(None, description="Filter by category"),
     level: Optional[str] = Query(None, description="Filter by difficulty level"),
-    search: Optional[str] = Query(None, description="Search in title and description")
-):
-    """Get all tutorials with optional filtering"""
-    tutorials = db.read_all("tutorials")
-    
-    # Convert to Tutorial objects
-    tutorial_list = [Tutorial(**tutorial) for tutorial in tutorials]
-    
-    # Apply filters
+    search: Optional[str] = Query(None, description="Words to find in title, description and category; all must match (typo-tolerant)")
+) -> dict:
+    """Storage-layer where clause of the tutorials list filters"""
+    where = {}
     if category:
-        tutorial_list = [t for t in tutorial_list if t.category.lower() == category.lower()]
+        where["category__ieq"] = category
     
     if level:
-        tutorial_list = [t for t in tutorial_list if t.level.lower() == level.lower()]
+        where["level__ieq"] = level
     
     if search:
-        search_term = search.lower()
-        tutorial_list = [
-            t for t in tutorial_list 
-            if search_term in t.title.lower() or search_term in t.description.lower()
-        ]
+        await search_index.filter("tutorials", search, where)
     
-    return tutorial_list
+    return where
+
+@router.get("/", response_model=Union[Page[Tutorial], List[Tutorial]])
+async def get_tutorials(
+    where: dict = Depends(tutorial_filters),
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Get tutorials with optional filtering, paged when limit or cursor is given"""
+    # Filters are evaluated in the storage layer; only matching rows are copied
+    page = await paginate("tutorials", limit, cursor, where=where, fields=list(Tutorial.model_fields))
+    return page_or_list(page, limit, cursor)
+
+@router.get("/facets", response_model=Dict[str, Dict[str, int]])
+async def get_tutorial_facets(where: dict = Depends(tutorial_filters)):
+    """Category and level counts of the tutorials matching the same filters as the list"""
+    return await async_db.facets("tutorials", ["category", "level"], where)
+
+@router.get("/categories", response_model=List[str])
+async def get_tutorial_categories():
+    """Get all tutorial categories"""
+    return await category_catalog.get_names("tutorials")
+
+@router.get("/categories/summary", response_model=List[CategorySummary])
+async def get_tutorial_category_summary():
+    """Tutorial count and level breakdown of every category, largest first"""
+    return await category_catalog.get_summary("tutorials")
 
 @router.get("/{tutorial_id}", response_model=Tutorial)
 async def get_tutorial(tutorial_id: int):
     """Get tutorial by ID"""
-    tutorial = db.read("tutorials", tutorial_id)
+    # Increment view count
+    tutorial = await async_db.increment("tutorials", tutorial_id, "views")
     if not tutorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tutorial not found"
         )
     
-    # Increment view count
-    current_views = tutorial.get("views", 0)
-    db.update("tutorials", tutorial_id, {"views": current_views + 1})
-    tutorial["views"] = current_views + 1
-    
     return Tutorial(**tutorial)
 
 @router.post("/", response_model=Tutorial, status_code=status.HTTP_201_CREATED)
@@ -64,7 +80,7 @@ async def create_tutorial(
         )
     
     tutorial_data = tutorial.dict()
-    created_tutorial = db.create("tutorials", tutorial_data)
+    created_tutorial = await async_db.create("tutorials", tutorial_data)
     
     return Tutorial(**created_tutorial)
 
@@ -81,7 +97,7 @@ async def update_tutorial(
             detail="Not enough permissions"
         )
     
-    existing_tutorial = db.read("tutorials", tutorial_id)
+    existing_tutorial = await async_db.read("tutorials", tutorial_id)
     if not existing_tutorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,7 +105,7 @@ async def update_tutorial(
         )
     
     update_data = tutorial_update.dict(exclude_unset=True)
-    updated_tutorial = db.update("tutorials", tutorial_id, update_data)
+    updated_tutorial = await async_db.update("tutorials", tutorial_id, update_data)
     
     return Tutorial(**updated_tutorial)
 
@@ -105,7 +121,7 @@ async def delete_tutorial(
             detail="Not enough permissions"
         )
     
-    success = db.delete("tutorials", tutorial_id)
+    success = await async_db.delete("tutorials", tutorial_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -122,7 +138,7 @@ async def complete_tutorial(
 ):
     """Mark tutorial as completed"""
     # Check if tutorial exists
-    tutorial = db.read("tutorials", tutorial_id)
+    tutorial = await async_db.read("tutorials", tutorial_id)
     if not tutorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -130,9 +146,7 @@ async def complete_tutorial(
         )
     
     # Check if already completed
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    existing_completion = next((c for c in completions if c.get("tutorial_id") == tutorial_id), None)
-    if existing_completion:
+    if await async_db.exists("completions", {"user_id": current_user.id, "tutorial_id": tutorial_id}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Tutorial already completed"
@@ -149,10 +163,17 @@ async def complete_tutorial(
     completion_data = {
         "user_id": current_user.id,
         "tutorial_id": tutorial_id,
+        "completed_at": datetime.now().isoformat(),
         "rating": rating
     }
     
-    completion = db.create("completions", completion_data)
+    try:
+        completion = await async_db.create("completions", completion_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tutorial already completed"
+        )
     
     return TutorialCompletion(**completion)
 
@@ -162,8 +183,7 @@ async def check_completion(
     current_user: User = Depends(get_current_active_user)
 ):
     """Check if user has completed a tutorial"""
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    completed = any(c.get("tutorial_id") == tutorial_id for c in completions)
+    completed = await async_db.exists("completions", {"user_id": current_user.id, "tutorial_id": tutorial_id})
     
     return {"completed": completed}
 
@@ -174,8 +194,7 @@ async def uncomplete_tutorial(
 ):
     """Remove tutorial completion"""
     # Find completion
-    completions = db.find_by_field("completions", "user_id", current_user.id)
-    completion = next((c for c in completions if c.get("tutorial_id") == tutorial_id), None)
+    completion = await async_db.find_one_by_fields("completions", {"user_id": current_user.id, "tutorial_id": tutorial_id})
     
     if not completion:
         raise HTTPException(
@@ -184,6 +203,6 @@ async def uncomplete_tutorial(
         )
     
     # Delete completion
-    db.delete("completions", completion["id"])
+    await async_db.delete("completions", completion["id"])
     
     return {"message": "Tutorial completion removed successfully"} 
\ No newline at end of file
@@ -1,26 +1,28 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
-from app.models import User, UserUpdate
-from app.database import db
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import List, Optional, Union
+from app.models import User, UserUpdate, Page
+from app.database import async_db, DuplicateKeyError
 from app.auth import get_current_active_user, get_password_hash
+from app.pagination import paginate, page_limit, page_or_list
 
 router = APIRouter()
 
-@router.get("/", response_model=List[User])
-async def get_users(current_user: User = Depends(get_current_active_user)):
-    """Get all users (admin only)"""
+@router.get("/", response_model=Union[Page[User], List[User]])
+async def get_users(
+    limit: Optional[int] = Depends(page_limit),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get users, paged when limit or cursor is given (admin only)"""
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
     
-    users = db.read_all("users")
-    # Remove passwords from response
-    for user in users:
-        user.pop("password", None)
-    
-    return [User(**user) for user in users]
+    # Project onto the response fields, so password hashes are never copied
+    page = await paginate("users", limit, cursor, fields=list(User.model_fields))
+    return page_or_list(page, limit, cursor)
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: int, current_user: User = Depends(get_current_active_user)):
@@ -31,7 +33,7 @@ async def get_user(user_id: int, current_user: User = Depends(get_current_active
             detail="Not enough permissions"
         )
     
-    user = db.read("users", user_id)
+    user = await async_db.read("users", user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,7 +57,7 @@ async def update_user(
         )
     
     # Check if user exists
-    existing_user = db.read("users", user_id)
+    existing_user = await async_db.read("users", user_id)
     if not existing_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +69,7 @@ async def update_user(
     
     # Check for email uniqueness if email is being updated
     if "email" in update_data and update_data["email"] != existing_user["email"]:
-        existing_email = db.find_one_by_field("users", "email", update_data["email"])
+        existing_email = await async_db.find_one_by_field("users", "email", update_data["email"])
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -76,7 +78,7 @@ async def update_user(
     
     # Check for username uniqueness if username is being updated
     if "username" in update_data and update_data["username"] != existing_user["username"]:
-        existing_username = db.find_one_by_field("users", "username", update_data["username"])
+        existing_username = await async_db.find_one_by_field("users", "username", update_data["username"])
         if existing_username:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -84,7 +86,13 @@ async def update_user(
             )
     
     # Update user
-    updated_user = db.update("users", user_id, update_data)
+    try:
+        updated_user = await async_db.update("users", user_id, update_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email or username already registered"
+        )
     updated_user.pop("password", None)
     
     return User(**updated_user)
@@ -98,7 +106,7 @@ async def delete_user(user_id: int, current_user: User = Depends(get_current_act
             detail="Not enough permissions"
         )
     
-    success = db.delete("users", user_id)
+    success = await async_db.delete("users", user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,485 @@
+import bisect
+import difflib
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+try:
+    import numpy as np
+except ImportError:  # scoring falls back to plain dict loops
+    np = None
+from app.config import settings
+from app.changes import ChangeEvent, DerivedState
+from app.database import db, async_db
+
+# Searchable fields per table with their weight in the term frequencies
+# (a title hit counts three times as much as a description hit)
+SEARCH_FIELDS: Dict[str, Dict[str, float]] = {
+    "courses": {"title": 3.0, "description": 1.0, "category": 2.0},
+    "tutorials": {"title": 3.0, "description": 1.0, "category": 2.0},
+    "quizzes": {"title": 3.0, "description": 1.0, "category": 2.0},
+    "articles": {"title": 3.0, "excerpt": 1.0, "author": 2.0, "tags": 2.0},
+}
+
+# Fields offered as typeahead completions per table, with the suggestion type
+SUGGEST_FIELDS: Dict[str, Dict[str, str]] = {
+    "courses": {"title": "course", "category": "category"},
+    "tutorials": {"title": "tutorial", "category": "category"},
+    "quizzes": {"title": "quiz", "category": "category"},
+    "articles": {"title": "article", "tags": "tag", "author": "author"},
+}
+
+# Types whose suggestions name a single record (and carry its ID)
+RECORD_TYPES = frozenset({"course", "tutorial", "quiz", "article"})
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or the this to with your you".split()
+)
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Vocabulary terms sharing fewer trigrams than this (Dice coefficient) with a
+# query word are not considered as typo corrections at all
+TRIGRAM_CUTOFF = 0.3
+# Weight of a term that merely contains the query word ("dev" in "development")
+SUBSTRING_WEIGHT = 0.9
+
+# BM25 parameters: term frequency saturation and document length normalization
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: Any) -> List[str]:
+    """Case-folded word tokens of a value (lists are joined), without stopwords"""
+    if text is None:
+        return []
+    if isinstance(text, (list, tuple, set)):
+        text = " ".join(str(value) for value in text)
+    return [token for token in _TOKEN.findall(str(text).casefold()) if token not in STOPWORDS]
+
+
+def trigrams(word: str, padded: bool = True) -> set:
+    """Character trigrams of a word; padding marks its start and end"""
+    if padded:
+        word = f"  {word} "
+    return {word[start:start + 3] for start in range(len(word) - 2)}
+
+
+def normalize(text: Any) -> str:
+    """Case-folded words of a phrase joined by single spaces, stopwords kept"""
+    return " ".join(_TOKEN.findall(str(text).casefold()))
+
+
+class PrefixIndex:
+    """Sorted completion keys for prefix lookups with bisect.
+
+    A phrase is keyed from its first word and, in a second list, from each
+    later non-stopword word, so "react" also completes "Getting Started
+    with React" (after the phrases that start with it). Entries are
+    (key, type, text, id) tuples, reference-counted so a category shared
+    by many records is stored once. A lookup ranks at most SCAN entries per
+    list, which keeps broad one-letter prefixes as cheap as narrow ones;
+    results are memoized per prefix until the next change.
+    """
+
+    SCAN = 256
+    # Above this many queued additions they are merged with one sort, not bisect inserts
+    BULK = 64
+
+    def __init__(self):
+        # [leading keys, inner keys]
+        self.lists: List[List[tuple]] = [[], []]
+        self.counts: Dict[tuple, int] = {}
+        self._pending: List[List[tuple]] = [[], []]
+        self._memo: Dict[tuple, list] = {}
+
+    @staticmethod
+    def _keys(text: str) -> List[Tuple[int, str]]:
+        words = normalize(text).split(" ")
+        return [
+            (0 if start == 0 else 1, " ".join(words[start:]))
+            for start, word in enumerate(words)
+            if word and (start == 0 or word not in STOPWORDS)
+        ]
+
+    def add(self, kind: str, text: str, item_id: Any = None):
+        for which, key in self._keys(text):
+            entry = (key, kind, text, item_id)
+            count = self.counts.get(entry, 0)
+            if not count:
+                self._pending[which].append(entry)
+            self.counts[entry] = count + 1
+        self._memo.clear()
+
+    def remove(self, kind: str, text: str, item_id: Any = None):
+        self._merge()
+        for which, key in self._keys(text):
+            entry = (key, kind, text, item_id)
+            count = self.counts.get(entry, 0)
+            if count > 1:
+                self.counts[entry] = count - 1
+            elif count == 1:
+                del self.counts[entry]
+                entries = self.lists[which]
+                position = bisect.bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+        self._memo.clear()
+
+    def _merge(self):
+        for entries, pending in zip(self.lists, self._pending):
+            if len(pending) > self.BULK:
+                entries.extend(pending)
+                entries.sort()
+            else:
+                for entry in pending:
+                    bisect.insort(entries, entry)
+            pending.clear()
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, str, Any, int, bool]]:
+        """(type, text, id, count, leading) of the best completions of a normalized prefix.
+
+        Phrases starting with the prefix (leading) rank before those matching
+        at a later word, then the more widely used (higher count) and
+        shorter ones.
+        """
+        memo = self._memo.get((prefix, limit))
+        if memo is not None:
+            return memo
+        self._merge()
+        best: Dict[tuple, tuple] = {}
+        for which, entries in enumerate(self.lists):
+            low = bisect.bisect_left(entries, (prefix,))
+            high = min(bisect.bisect_left(entries, (prefix + "\U0010ffff",)), low + self.SCAN)
+            for entry in entries[low:high]:
+                key, kind, text, item_id = entry
+                match = (kind, text, item_id)
+                if match not in best:
+                    best[match] = (which == 0, self.counts[entry], -len(text))
+            if len(best) >= limit:
+                break
+        top = heapq.nlargest(limit, best.items(), key=lambda match: match[1])
+        results = [(kind, text, item_id, rank[1], rank[0]) for (kind, text, item_id), rank in top]
+        if len(self._memo) > 4096:
+            self._memo.clear()
+        self._memo[(prefix, limit)] = results
+        return results
+
+
+class TableIndex:
+    """Inverted index of one table: term -> {id: weighted term frequency}.
+
+    Documents also get a dense slot, so that with numpy a term's postings
+    are scored as whole arrays (cached per term until it changes) instead
+    of one dict entry at a time. A trigram index over the vocabulary
+    expands query words to the terms containing them or close to them
+    (typos), touching only the terms that share trigrams with the word.
+    """
+
+    def __init__(self, fields: Dict[str, float], suggest_fields: Optional[Dict[str, str]] = None):
+        self.fields = fields
+        self.suggest_fields = suggest_fields or {}
+        self.phrases = PrefixIndex()
+        self.postings: Dict[str, Dict[Any, float]] = {}
+        self.lengths: Dict[Any, float] = {}
+        self.total_length = 0.0
+        # id -> (searchable field values, term frequencies, completion phrases);
+        # unchanged text is not reindexed
+        self.documents: Dict[Any, Tuple[tuple, Dict[str, float], List[tuple]]] = {}
+        self._slots: Dict[Any, int] = {}
+        self._slot_ids: List[Any] = []
+        self._free: List[int] = []
+        self._slot_lengths = np.zeros(1024) if np is not None else None
+        # term -> (slots, frequencies) arrays
+        self._arrays: Dict[str, tuple] = {}
+        # trigram -> vocabulary terms containing it, and memoized query word expansions
+        self.grams: Dict[str, set] = {}
+        self._expansions: Dict[tuple, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, item: Dict[str, Any]):
+        item_id = item.get("id")
+        values = tuple(str(item.get(field)) for field in self.fields)
+        known = self.documents.get(item_id)
+        if known is not None and known[0] == values:
+            return
+        self.remove(item_id)
+        frequencies: Dict[str, float] = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(item.get(field)):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                for gram in trigrams(term):
+                    self.grams.setdefault(gram, set()).add(term)
+                self._expansions.clear()
+            self.postings[term][item_id] = frequency
+            self._arrays.pop(term, None)
+        length = sum(frequencies.values())
+        self.lengths[item_id] = length
+        self.total_length += length
+        phrases = []
+        for field, kind in self.suggest_fields.items():
+            value = item.get(field)
+            for text in (value if isinstance(value, list) else [value]):
+                if isinstance(text, str) and text.strip():
+                    phrase = (kind, text.strip(), item_id if kind in RECORD_TYPES else None)
+                    self.phrases.add(*phrase)
+                    phrases.append(phrase)
+        self.documents[item_id] = (values, frequencies, phrases)
+        if np is not None:
+            slot = self._free.pop() if self._free else len(self._slot_ids)
+            if slot == len(self._slot_ids):
+                self._slot_ids.append(item_id)
+                if slot >= len(self._slot_lengths):
+                    self._slot_lengths = np.concatenate([self._slot_lengths, np.zeros(len(self._slot_lengths))])
+            else:
+                self._slot_ids[slot] = item_id
+            self._slots[item_id] = slot
+            self._slot_lengths[slot] = length
+
+    def remove(self, item_id: Any):
+        known = self.documents.pop(item_id, None)
+        if known is None:
+            return
+        for term in known[1]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(item_id, None)
+                if not posting:
+                    del self.postings[term]
+                    for gram in trigrams(term):
+                        terms = self.grams.get(gram)
+                        if terms is not None:
+                            terms.discard(term)
+                            if not terms:
+                                del self.grams[gram]
+                    self._expansions.clear()
+            self._arrays.pop(term, None)
+        self.total_length -= self.lengths.pop(item_id, 0.0)
+        for phrase in known[2]:
+            self.phrases.remove(*phrase)
+        slot = self._slots.pop(item_id, None)
+        if slot is not None:
+            self._slot_ids[slot] = None
+            self._slot_lengths[slot] = 0.0
+            self._free.append(slot)
+
+    def apply(self, event: ChangeEvent):
+        if event.op == "delete" or event.after is None:
+            self.remove(event.id)
+        else:
+            self.add(event.after)
+
+    def _term_arrays(self, term: str) -> tuple:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings[term]
+            slots = np.fromiter((self._slots[item_id] for item_id in posting), dtype=np.int64, count=len(posting))
+            frequencies = np.fromiter(posting.values(), dtype=np.float64, count=len(posting))
+            arrays = self._arrays[term] = (slots, frequencies)
+        return arrays
+
+    def expand(self, word: str, threshold: float) -> Dict[str, float]:
+        """Vocabulary terms matching a query word, with their similarity to it.
+
+        The word itself scores 1, terms containing it SUBSTRING_WEIGHT and
+        typo candidates their difflib ratio when at least threshold.
+        Candidates are only drawn from terms sharing trigrams with the word.
+        Words under three letters have no inner trigram and are too short
+        for typo matching; they match the terms starting with them instead
+        ("ja" finds "javascript"), through the padded trigram of a term's start.
+        """
+        memo = self._expansions.get((word, threshold))
+        if memo is not None:
+            return memo
+        matches: Dict[str, float] = {}
+        if word in self.postings:
+            matches[word] = 1.0
+        if len(word) < 3:
+            for term in self.grams.get(f"  {word}"[-3:], ()):
+                if term != word:
+                    matches[term] = SUBSTRING_WEIGHT
+        else:
+            # Terms containing every inner trigram, then checked for the substring
+            buckets = sorted((self.grams.get(gram, set()) for gram in trigrams(word, padded=False)), key=len)
+            if buckets and buckets[0]:
+                for term in buckets[0].intersection(*buckets[1:]):
+                    if term != word and word in term:
+                        matches[term] = SUBSTRING_WEIGHT
+            grams = trigrams(word)
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for term in self.grams.get(gram, ()):
+                    shared[term] = shared.get(term, 0) + 1
+            for term, count in shared.items():
+                if term in matches or 2 * count / (len(grams) + len(term) + 1) < TRIGRAM_CUTOFF:
+                    continue
+                similarity = difflib.SequenceMatcher(None, word, term).ratio()
+                if similarity >= threshold:
+                    matches[term] = similarity
+        if len(self._expansions) > 4096:
+            self._expansions.clear()
+        self._expansions[(word, threshold)] = matches
+        return matches
+
+    def _weights(self, words: Iterable[str], threshold: Optional[float]) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for word in set(words):
+            if threshold is None:
+                matches = {word: 1.0} if word in self.postings else {}
+            else:
+                matches = self.expand(word, threshold)
+            for term, weight in matches.items():
+                weights[term] = max(weight, weights.get(term, 0.0))
+        return weights
+
+    def match(self, words: Iterable[str], threshold: float) -> set:
+        """IDs of the documents matching every query word (fuzzily)"""
+        result: Optional[set] = None
+        for word in set(words):
+            ids = set()
+            for term in self.expand(word, threshold):
+                ids.update(self.postings[term])
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result or set()
+
+    def search(self, words: Iterable[str], limit: int, threshold: Optional[float] = None) -> List[Tuple[Any, float]]:
+        """Top documents for the query words by BM25 score, best first.
+
+        With a threshold, words also match similar terms (see expand()),
+        weighted by their similarity.
+        """
+        count = len(self.documents)
+        weights = self._weights(words, threshold)
+        if not count or not weights:
+            return []
+        average = (self.total_length / count) or 1.0
+
+        if np is not None:
+            scores = np.zeros(len(self._slot_ids))
+            lengths = self._slot_lengths[:len(self._slot_ids)]
+            for term, weight in weights.items():
+                slots, frequencies = self._term_arrays(term)
+                idf = weight * math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                norm = K1 * (1 - B + B * lengths[slots] / average)
+                scores[slots] += idf * frequencies * (K1 + 1) / (frequencies + norm)
+            matched = np.flatnonzero(scores)
+            if len(matched) > limit:
+                matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+            # Best score first, earlier slot first on ties
+            matched = matched[np.lexsort((matched, -scores[matched]))]
+            return [(self._slot_ids[slot], round(float(scores[slot]), 6)) for slot in matched]
+
+        scores: Dict[Any, float] = {}
+        lengths = self.lengths
+        for term, weight in weights.items():
+            posting = self.postings[term]
+            idf = weight * math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for item_id, frequency in posting.items():
+                norm = K1 * (1 - B + B * lengths[item_id] / average)
+                scores[item_id] = scores.get(item_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda entry: entry[1])
+        return [(item_id, round(score, 6)) for item_id, score in best]
+
+
+class SearchIndex(DerivedState):
+    """BM25-ranked full-text search over the tables in SEARCH_FIELDS.
+
+    A table is indexed on its first search and then kept up to date
+    incrementally from the database's change events (see DerivedState);
+    without CHANGE_FEED, rebuilds after other workers' writes happen at
+    most every settings.search_rebuild_interval seconds.
+    """
+
+    def __init__(self, database, fields: Optional[Dict[str, Dict[str, float]]] = None):
+        self.fields = fields or SEARCH_FIELDS
+        super().__init__(database, self.fields)
+
+    def build(self, table: str) -> TableIndex:
+        index = TableIndex(self.fields[table], SUGGEST_FIELDS.get(table))
+        for item in self.database.read_all(table):
+            index.add(item)
+        return index
+
+    def rebuild_interval(self) -> float:
+        return settings.search_rebuild_interval
+
+    def _index(self, table: str) -> TableIndex:
+        if table not in self.fields:
+            raise ValueError(f"Table {table} has no search index")
+        return self._state(table)
+
+    def search(self, table: str, query: str, limit: int = 20, fuzzy: bool = True) -> List[Tuple[Any, float]]:
+        """(id, score) of the best matches for a free-text query, best first.
+
+        fuzzy also matches words containing a query word and likely typos
+        of it (similarity of at least settings.search_fuzzy_threshold).
+        """
+        words = tokenize(query)
+        if not words or limit <= 0:
+            return []
+        index = self._index(table)
+        with self._lock:
+            return index.search(words, limit, settings.search_fuzzy_threshold if fuzzy else None)
+
+    def matching_ids(self, table: str, query: str) -> Optional[set]:
+        """IDs of the records matching every word of query (fuzzily); None when it has no searchable words"""
+        words = tokenize(query)
+        if not words:
+            return None
+        index = self._index(table)
+        with self._lock:
+            return index.match(words, settings.search_fuzzy_threshold)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top typeahead completions of a partial query across the SUGGEST_FIELDS tables"""
+        prefix = normalize(query)
+        if not prefix or limit <= 0:
+            return []
+        merged: Dict[tuple, list] = {}
+        for table in SUGGEST_FIELDS:
+            self._refresh(table)
+            with self._lock:
+                matches = self._tables[table].phrases.complete(prefix, limit)
+            for kind, text, item_id, count, leading in matches:
+                # A category used by several tables is one suggestion
+                entry = merged.setdefault((kind, text, item_id), [leading, 0])
+                entry[1] += count
+        top = heapq.nlargest(limit, merged.items(), key=lambda match: (match[1][0], match[1][1], -len(match[0][1])))
+        return [
+            {"text": text, "type": kind, "id": item_id, "count": count}
+            for (kind, text, item_id), (_, count) in top
+        ]
+
+    async def search_rows(self, table: str, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """The matching records themselves, best first"""
+        ranked = await async_db.call(self.search, table, query, limit)
+        if not ranked:
+            return []
+        rows = {row["id"]: row for row in await async_db.query(table, where={"id__in": [item_id for item_id, _ in ranked]})}
+        return [rows[item_id] for item_id, _ in ranked if item_id in rows]
+
+    async def filter(self, table: str, query: str, where: Dict[str, Any]):
+        """Narrow a list endpoint's where clause to the records matching query.
+
+        A record matches when every word of the query matches a word of its
+        indexed fields (SEARCH_FIELDS): the word itself, a word containing
+        it, or a likely typo of it. Queries without searchable words (only
+        stopwords or punctuation) fall back to a case-insensitive substring
+        test on the same fields.
+        """
+        ids = await async_db.call(self.matching_ids, table, query)
+        if ids is None:
+            where["|".join(self.fields[table]) + "__icontains"] = query
+        else:
+            where["id__in"] = ids
+
+
+# Shared index over the global database
+search_index = SearchIndex(db)
@@ -0,0 +1,640 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from app.config import settings
+from app.changes import ChangeEvent, ChangeFeed, ChangeHub
+from app.metrics import metrics
+from app.database import (
+    TABLES, TABLE_INDEXES, Index, DuplicateKeyError, JSONCodec, Transaction, get_codec, parse_lookup,
+    project_row
+)
+
+
+def _field_expr(field: str) -> str:
+    """SQL expression reading a top-level field from the JSON document"""
+    if not field.isidentifier():
+        raise ValueError(f"Invalid field name: {field!r}")
+    if field == 'id':
+        # Stored as the INTEGER PRIMARY KEY column
+        return 'id'
+    return f"json_extract(data, '$.{field}')"
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+# SQL for each query operator, applied to a value expression
+_OPERATOR_SQL = {
+    'eq': '{} IS ?',
+    'ne': '{} IS NOT ?',
+    'lt': '{} < ?',
+    'lte': '{} <= ?',
+    'gt': '{} > ?',
+    'gte': '{} >= ?',
+    'ieq': 'lower({}) = ?',
+    'contains': 'instr({}, ?) > 0',
+    'icontains': 'instr(lower({}), ?) > 0',
+}
+
+
+def _lookup_sql(fields: tuple, op: str, operand: Any) -> tuple:
+    """WHERE clause for a parsed query lookup; list fields match on any element"""
+    clauses, params = [], []
+    for field in fields:
+        expr = _field_expr(field)
+        if op == 'in':
+            # One JSON array parameter, however many values: a placeholder per
+            # value would hit SQLite's bound-variable limit on large id sets
+            values = [json.dumps(sorted(operand, key=repr))]
+            test = '{} IN (SELECT value FROM json_each(?))'
+        else:
+            values = [operand]
+            test = _OPERATOR_SQL[op]
+        if field == 'id':
+            # The primary key column, never a list
+            clauses.append(test.format(expr))
+            params.extend(values)
+            continue
+        array = f"json_each(data, '$.{field}')"
+        clauses.append(
+            f"({test.format(expr)} OR (json_type(data, '$.{field}') = 'array' "
+            f"AND EXISTS (SELECT 1 FROM {array} WHERE {test.format('value')})))"
+        )
+        params.extend(values + values)
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+class SQLiteDatabase:
+    """SQLite storage backend with the same interface as JSONDatabase.
+
+    Each table stores one JSON document per row next to an INTEGER PRIMARY KEY,
+    and the declared secondary indexes become expression indexes over
+    json_extract(). Connections run in WAL mode, one per thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, indexes: Optional[Dict[str, List[Index]]] = None,
+                 codec: Optional[JSONCodec] = None):
+        self.path = path or settings.sqlite_path or os.path.join(settings.data_dir, 'quiz_quest.db')
+        self.codec = codec or get_codec()
+        self.tables = list(TABLES)
+        self.indexes: Dict[str, List[Index]] = {
+            table: list(declared)
+            for table, declared in (TABLE_INDEXES if indexes is None else indexes).items()
+        }
+        self._local = threading.local()
+        # Version bumps committed by this instance per table; the rest of a
+        # table's version is other workers' writes (see external_version)
+        self._own_versions: Dict[str, int] = {}
+        self._own_lock = threading.Lock()
+        # Change events, published after each write transaction commits
+        feed = None
+        if settings.change_feed:
+            feed = ChangeFeed(os.path.join(os.path.dirname(self.path) or '.', '_changes'), self.codec)
+        self.changes = ChangeHub(feed)
+        self._initialize_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA busy_timeout=30000')
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _write(self):
+        """Run a block of statements in one immediate (write-locked) transaction"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        self._local.events = []
+        self._local.bumped = []
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            self._local.events = []
+            raise
+        # Statements do not name one table, so commits are tagged with "*"
+        with metrics.timed('commit', '*'), self._own_lock:
+            connection.execute('COMMIT')
+            for table in self._local.bumped:
+                self._own_versions[table] = self._own_versions.get(table, 0) + 1
+        events, self._local.events = self._local.events, []
+        self.changes.publish(events)
+
+    def _stage_event(self, table: str, op: str, item_id: Any, before: Optional[Dict[str, Any]],
+                     after: Optional[Dict[str, Any]]):
+        """Queue a change event until the surrounding write transaction commits"""
+        self._local.events.append(ChangeEvent(table, op, item_id, before, after))
+
+    def _current(self, connection: sqlite3.Connection, table: str, item_id: Any) -> Optional[Dict[str, Any]]:
+        row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (item_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def subscribe(self, callback, tables: Optional[List[str]] = None):
+        """Call callback(ChangeEvent) after every committed change (see JSONDatabase.subscribe)"""
+        return self.changes.subscribe(callback, tables)
+
+    def read_changes(self, offset: int = 0, limit: Optional[int] = None) -> tuple:
+        """(events, next offset) from the durable change feed of all processes"""
+        if self.changes.feed is None:
+            raise ValueError("The change feed is disabled; set CHANGE_FEED=true")
+        return self.changes.feed.read(offset, limit)
+
+    def _index_name(self, table: str, index: Index) -> str:
+        return f"idx_{table}_{'_'.join(index.fields)}{'_ci' if index.casefold else ''}"
+
+    def _create_index_sql(self, table: str, index: Index) -> Optional[str]:
+        """CREATE INDEX statement of a declared index; None for multi (list) indexes.
+
+        Elements of a JSON array cannot be indexed by an expression, so
+        lookups on list fields keep scanning through json_each().
+        """
+        if index.multi:
+            return None
+        columns = ', '.join(
+            f'lower({_field_expr(field)})' if index.casefold else _field_expr(field) for field in index.fields
+        )
+        unique = 'UNIQUE ' if index.unique else ''
+        return f'CREATE {unique}INDEX IF NOT EXISTS "{self._index_name(table, index)}" ON "{table}" ({columns})'
+
+    def _initialize_schema(self):
+        """Create tables and indexes if they don't exist"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._write() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS _table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            for table in self.tables:
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}" '
+                    '(id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)'
+                )
+                connection.execute(
+                    'INSERT OR IGNORE INTO _table_versions (name, version) VALUES (?, 0)', (table,)
+                )
+                for index in self.indexes.get(table, []):
+                    sql = self._create_index_sql(table, index)
+                    if sql:
+                        connection.execute(sql)
+
+    def _encode(self, item: Dict[str, Any]) -> str:
+        # Stored as TEXT so json_extract() can read it
+        return self.codec.dumps({key: value for key, value in item.items() if key != 'id'}).decode('utf-8')
+
+    def _decode(self, row: tuple) -> Dict[str, Any]:
+        item = self.codec.loads(row[1])
+        item['id'] = row[0]
+        return item
+
+    def _bump_version(self, connection: sqlite3.Connection, table: str):
+        connection.execute('UPDATE _table_versions SET version = version + 1 WHERE name = ?', (table,))
+        self._local.bumped.append(table)
+
+    def _duplicate_error(self, connection: sqlite3.Connection, table: str, item: Dict[str, Any],
+                         item_id: Any, error: sqlite3.IntegrityError) -> Exception:
+        """Translate a UNIQUE constraint failure into DuplicateKeyError"""
+        for index in self.indexes.get(table, []):
+            if not index.unique:
+                continue
+            criteria = {field: item.get(field) for field in index.fields}
+            where, params = self._where(criteria)
+            row = connection.execute(
+                f'SELECT id FROM "{table}" WHERE {where} AND id IS NOT ? LIMIT 1', params + [item_id]
+            ).fetchone()
+            if row is not None:
+                return DuplicateKeyError(table, index.fields, index.key(item))
+        return error
+
+    def _where(self, criteria: Dict[str, Any]) -> tuple:
+        clauses = [f'{_field_expr(field)} IS ?' for field in criteria]
+        return ' AND '.join(clauses) or '1', list(criteria.values())
+
+    def _select(self, table: str, where: str = '1', params: Optional[list] = None,
+                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        sql = f'SELECT id, data FROM "{table}" WHERE {where} ORDER BY id'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        with metrics.timed('select', table) as timing:
+            rows = self._connection().execute(sql, params or []).fetchall()
+            timing['bytes'] = sum(len(row[1]) for row in rows)
+        return [self._decode(row) for row in rows]
+
+    def get_version(self, table: str) -> int:
+        """Return a counter that changes whenever the table is written"""
+        row = self._connection().execute(
+            'SELECT version FROM _table_versions WHERE name = ?', (table,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def external_version(self, table: str) -> int:
+        """Return a counter that changes only when other workers write the table (see JSONDatabase)"""
+        with self._own_lock:
+            return self.get_version(table) - self._own_versions.get(table, 0)
+
+    def compact(self, table: Optional[str] = None):
+        """Checkpoint the SQLite WAL into the main database file"""
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def create_index(self, table: str, index: Index):
+        """Declare an extra secondary index at runtime and build it"""
+        self.indexes.setdefault(table, []).append(index)
+        sql = self._create_index_sql(table, index)
+        if sql:
+            with self._write() as connection:
+                connection.execute(sql)
+
+    def reserve_ids(self, table: str, count: int = 1) -> range:
+        """Reserve a block of consecutive IDs for a table"""
+        with self._write() as connection:
+            row = connection.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+            current = row[0] if row else 0
+            if row:
+                connection.execute('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (current + count, table))
+            else:
+                connection.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, current + count))
+        return range(current + 1, current + count + 1)
+
+    def import_rows(self, table: str, rows: List[Dict[str, Any]], next_id: Optional[int] = None):
+        """Insert rows keeping their IDs, replacing rows with the same ID (used by the JSON migration).
+
+        A row that collides with another on a unique index raises
+        DuplicateKeyError and nothing is imported; unlike INSERT OR REPLACE,
+        the other row is never silently deleted.
+        """
+        with self._write() as connection:
+            for row in rows:
+                try:
+                    connection.execute(
+                        f'INSERT INTO "{table}" (id, data) VALUES (?, ?) '
+                        'ON CONFLICT (id) DO UPDATE SET data = excluded.data',
+                        (row['id'], self._encode(row))
+                    )
+                except sqlite3.IntegrityError as error:
+                    raise self._duplicate_error(connection, table, row, row['id'], error)
+            if next_id is not None:
+                connection.execute(
+                    'UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (next_id - 1, table)
+                )
+                connection.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? '
+                    'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)',
+                    (table, next_id - 1, table)
+                )
+            self._bump_version(connection, table)
+
+    def create(self, table: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new item in the table"""
+        if table not in self.tables:
+            return item
+
+        with self._write() as connection:
+            self._insert(connection, table, item, datetime.now().isoformat())
+            self._bump_version(connection, table)
+        return item
+
+    def _insert(self, connection: sqlite3.Connection, table: str, item: Dict[str, Any], now: str):
+        item['created_at'] = now
+        item['updated_at'] = now
+        try:
+            cursor = connection.execute(f'INSERT INTO "{table}" (data) VALUES (?)', (self._encode(item),))
+        except sqlite3.IntegrityError as error:
+            raise self._duplicate_error(connection, table, item, None, error)
+        item['id'] = cursor.lastrowid
+        if self.changes.active:
+            self._stage_event(table, 'create', item['id'], None, project_row(item, None))
+
+    def _replace(self, connection: sqlite3.Connection, table: str, item: Dict[str, Any]):
+        item['updated_at'] = datetime.now().isoformat()
+        before = self._current(connection, table, item['id']) if self.changes.active else None
+        try:
+            connection.execute(f'UPDATE "{table}" SET data = ? WHERE id = ?', (self._encode(item), item['id']))
+        except sqlite3.IntegrityError as error:
+            raise self._duplicate_error(connection, table, item, item['id'], error)
+        if before is not None:
+            self._stage_event(table, 'update', item['id'], before, project_row(item, None))
+
+    def _remove(self, connection: sqlite3.Connection, table: str, item_id: Any) -> bool:
+        before = self._current(connection, table, item_id) if self.changes.active else None
+        cursor = connection.execute(f'DELETE FROM "{table}" WHERE id = ?', (item_id,))
+        if cursor.rowcount and before is not None:
+            self._stage_event(table, 'delete', item_id, before, None)
+        return cursor.rowcount > 0
+
+    def create_many(self, table: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several items in one transaction (all-or-nothing)"""
+        if table not in self.tables or not items:
+            return items
+
+        now = datetime.now().isoformat()
+        with self._write() as connection:
+            for item in items:
+                self._insert(connection, table, item, now)
+            self._bump_version(connection, table)
+        return items
+
+    def update_many(self, table: str, updates: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Update several items by ID in one transaction, skipping missing IDs"""
+        if table not in self.tables:
+            return []
+
+        results = []
+        with self._write() as connection:
+            for item_id, changes in updates.items():
+                row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (item_id,)).fetchone()
+                if row is None:
+                    continue
+                item = self._decode(row)
+                item.update(changes)
+                self._replace(connection, table, item)
+                results.append(item)
+            if results:
+                self._bump_version(connection, table)
+        return results
+
+    def upsert_by_field(self, table: str, field: str, items: List[Dict[str, Any]],
+                        update_existing: bool = True) -> List[Dict[str, Any]]:
+        """Create or update items matched on a natural key field, in one transaction"""
+        if table not in self.tables or not items:
+            return []
+
+        now = datetime.now().isoformat()
+        results = []
+        with self._write() as connection:
+            for item in items:
+                where, params = self._where({field: item.get(field)})
+                row = connection.execute(
+                    f'SELECT id, data FROM "{table}" WHERE {where} ORDER BY id LIMIT 1', params
+                ).fetchone()
+                if row is None:
+                    self._insert(connection, table, item, now)
+                    results.append(item)
+                    continue
+                existing = self._decode(row)
+                if update_existing:
+                    existing.update({key: value for key, value in item.items() if key not in ('id', 'created_at')})
+                    self._replace(connection, table, existing)
+                results.append(existing)
+            self._bump_version(connection, table)
+        return results
+
+    def read(self, table: str, item_id: int) -> Optional[Dict[str, Any]]:
+        """Read an item by ID"""
+        if table not in self.tables:
+            return None
+        rows = self._select(table, 'id = ?', [item_id])
+        return rows[0] if rows else None
+
+    def read_all(self, table: str) -> List[Dict[str, Any]]:
+        """Read all items from a table"""
+        if table not in self.tables:
+            return []
+        return self._select(table)
+
+    def update(self, table: str, item_id: int, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update an item by ID"""
+        if table not in self.tables:
+            return None
+
+        with self._write() as connection:
+            row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (item_id,)).fetchone()
+            if row is None:
+                return None
+            item = self._decode(row)
+            item.update(updates)
+            self._replace(connection, table, item)
+            self._bump_version(connection, table)
+        return item
+
+    def increment(self, table: str, item_id: int, field: str, delta: int = 1,
+                  minimum: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Atomically add delta to a numeric field of an item, optionally clamped at a minimum"""
+        if table not in self.tables:
+            return None
+
+        with self._write() as connection:
+            row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (item_id,)).fetchone()
+            if row is None:
+                return None
+            item = self._decode(row)
+            value = (item.get(field) or 0) + delta
+            item[field] = value if minimum is None else max(minimum, value)
+            self._replace(connection, table, item)
+            self._bump_version(connection, table)
+        return item
+
+    def increment_many(self, table: str, deltas: Dict[int, Dict[str, int]],
+                       minimum: Optional[Dict[str, int]] = None) -> int:
+        """Atomically add deltas to numeric fields of several items in one transaction"""
+        if table not in self.tables:
+            return 0
+
+        minimum = minimum or {}
+        changed = 0
+        with self._write() as connection:
+            for item_id, changes in deltas.items():
+                row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (item_id,)).fetchone()
+                if row is None:
+                    continue
+                item = self._decode(row)
+                for field, delta in changes.items():
+                    value = (item.get(field) or 0) + delta
+                    item[field] = value if field not in minimum else max(minimum[field], value)
+                self._replace(connection, table, item)
+                changed += 1
+            if changed:
+                self._bump_version(connection, table)
+        return changed
+
+    @contextmanager
+    def transaction(self):
+        """Stage mutations across tables and commit them atomically (see JSONDatabase.transaction)"""
+        tx = Transaction()
+        yield tx
+        self.commit(tx)
+
+    def commit(self, tx: Transaction):
+        """Apply a transaction's operations in one SQLite transaction, all-or-nothing"""
+        now = datetime.now().isoformat()
+        touched = set()
+        with self._write() as connection:
+            for kind, table, *args in tx.operations:
+                if table not in self.tables:
+                    continue
+                if kind == 'create':
+                    self._insert(connection, table, args[0], now)
+                    touched.add(table)
+                    continue
+                if kind == 'delete':
+                    if self._remove(connection, table, args[0]):
+                        touched.add(table)
+                    continue
+                row = connection.execute(f'SELECT id, data FROM "{table}" WHERE id = ?', (args[0],)).fetchone()
+                if row is None:
+                    continue
+                item = self._decode(row)
+                if kind == 'update':
+                    item.update(args[1])
+                else:
+                    field, delta, minimum = args[1:]
+                    value = (item.get(field) or 0) + delta
+                    item[field] = value if minimum is None else max(minimum, value)
+                self._replace(connection, table, item)
+                touched.add(table)
+            for table in touched:
+                self._bump_version(connection, table)
+
+    def delete(self, table: str, item_id: int) -> bool:
+        """Delete an item by ID"""
+        if table not in self.tables:
+            return False
+
+        with self._write() as connection:
+            deleted = self._remove(connection, table, item_id)
+            if deleted:
+                self._bump_version(connection, table)
+        return deleted
+
+    def find_by_fields(self, table: str, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Find items matching all of the given field values"""
+        if table not in self.tables:
+            return []
+        if not all(_is_scalar(value) for value in criteria.values()):
+            return [
+                item for item in self._select(table)
+                if all(item.get(field) == value for field, value in criteria.items())
+            ]
+        where, params = self._where(criteria)
+        return self._select(table, where, params)
+
+    def find_one_by_fields(self, table: str, criteria: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find one item matching all of the given field values"""
+        if table not in self.tables:
+            return None
+        if not all(_is_scalar(value) for value in criteria.values()):
+            results = self.find_by_fields(table, criteria)
+            return results[0] if results else None
+        where, params = self._where(criteria)
+        rows = self._select(table, where, params, limit=1)
+        return rows[0] if rows else None
+
+    def exists(self, table: str, criteria: Dict[str, Any]) -> bool:
+        """Check whether any item matches all of the given field values"""
+        return self.find_one_by_fields(table, criteria) is not None
+
+    def find_by_field(self, table: str, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Find items by a specific field value"""
+        return self.find_by_fields(table, {field: value})
+
+    def find_one_by_field(self, table: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Find one item by a specific field value"""
+        return self.find_one_by_fields(table, {field: value})
+
+    def find_in_range(self, table: str, field: str, start: Any = None, end: Any = None,
+                      criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Find items whose field lies in [start, end), optionally also matching criteria"""
+        if table not in self.tables:
+            return []
+        where, params = self._where(criteria or {})
+        clauses = [where, f'{_field_expr(field)} IS NOT NULL']
+        for operator, bound in (('>=', start), ('<', end)):
+            if bound is not None:
+                clauses.append(f'{_field_expr(field)} {operator} ?')
+                params.append(bound.isoformat() if isinstance(bound, datetime) else bound)
+        return self._select(table, ' AND '.join(clauses), params)
+
+    def query(self, table: str, where: Optional[Dict[str, Any]] = None, fields: Optional[List[str]] = None,
+              order_by: Any = None, limit: Optional[int] = None, offset: int = 0,
+              after: Any = None) -> List[Dict[str, Any]]:
+        """Rows matching where, filtered, sorted and sliced in SQL (see JSONDatabase.query)"""
+        if table not in self.tables:
+            return []
+        order_by = [order_by] if isinstance(order_by, str) else list(order_by or [])
+        if after is not None and not order_by:
+            order_by = ['id']
+        if after is not None and order_by not in (['id'], ['-id']):
+            raise ValueError('Keyset pagination (after) requires ordering by "id" or "-id"')
+
+        clauses, params = ['1'], []
+        for key, operand in (where or {}).items():
+            clause, values = _lookup_sql(*parse_lookup(key, operand))
+            clauses.append(clause)
+            params.extend(values)
+        if after is not None:
+            # Range scan on the INTEGER PRIMARY KEY
+            clauses.append('id < ?' if order_by == ['-id'] else 'id > ?')
+            params.append(after)
+
+        order = []
+        for key in order_by:
+            expr = _field_expr(key.lstrip('-'))
+            order.append(f"({expr} IS NULL), {expr} {'DESC' if key.startswith('-') else 'ASC'}")
+        sql = f'SELECT id, data FROM "{table}" WHERE {" AND ".join(clauses)} ORDER BY {", ".join(order + ["id"])}'
+        if limit is not None or offset:
+            sql += f' LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}'
+
+        with metrics.timed('select', table) as timing:
+            rows = self._connection().execute(sql, params).fetchall()
+            timing['bytes'] = sum(len(row[1]) for row in rows)
+        return [project_row(self._decode(row), fields) for row in rows]
+
+    def facets(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[Any, int]]:
+        """How many rows matching where hold each value of the given fields (see JSONDatabase.facets).
+
+        json_each() yields a scalar field's value as a single row and a list
+        field's elements one per row, so one GROUP BY covers both. The label of
+        each group is the spelling of its lowest-ID row, as in the JSON backend.
+        """
+        if table not in self.tables:
+            return {field: {} for field in fields}
+        clauses, params = ['1'], []
+        for key, operand in (where or {}).items():
+            clause, values = _lookup_sql(*parse_lookup(key, operand))
+            clauses.append(clause)
+            params.extend(values)
+
+        results = {}
+        for field in fields:
+            folded = "CASE WHEN value_type = 'text' THEN lower(value) ELSE value END"
+            sql = (
+                f'SELECT MIN(label), COUNT(DISTINCT row_id) FROM ('
+                f'SELECT row_id, {folded} AS folded, '
+                f'FIRST_VALUE(value) OVER (PARTITION BY {folded} ORDER BY row_id, position) AS label FROM ('
+                f'SELECT matching.row_id AS row_id, element.value AS value, element.type AS value_type, element.id AS position '
+                f'FROM (SELECT id AS row_id, data AS row_data FROM "{table}" WHERE {" AND ".join(clauses)}) AS matching, '
+                f"json_each(matching.row_data, '$.{field}') AS element WHERE element.type NOT IN ('null', 'object', 'array')"
+                f')) GROUP BY folded'
+            )
+            with metrics.timed('select', table):
+                rows = self._connection().execute(sql, params).fetchall()
+            results[field] = dict(sorted(rows, key=lambda row: (-row[1], str(row[0]))))
+        return results
+
+    def select_columns(self, table: str, fields: List[str], where: Optional[Dict[str, Any]] = None,
+                       ranges: Optional[Dict[str, tuple]] = None) -> Optional[Dict[str, Any]]:
+        """Columnar snapshots are a JSON backend feature; callers fall back to row queries"""
+        return None
+
+    def search(self, table: str, search_term: str, fields: List[str]) -> List[Dict[str, Any]]:
+        """Search items by multiple fields"""
+        results = []
+        search_term = search_term.lower()
+
+        for item in self.read_all(table):
+            for field in fields:
+                if field in item and search_term in str(item[field]).lower():
+                    results.append(item)
+                    break
+
+        return results
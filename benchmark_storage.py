@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Storage benchmarks for the Quiz Quest JSON database
+Run with: python benchmark_storage.py [--sizes 1000,10000,100000,1000000] [--codecs json,orjson]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app.database import CODECS, JSONDatabase, get_codec
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def write_table(data_dir, table, rows):
+    """Write a snapshot file for one table"""
+    with open(os.path.join(data_dir, f"{table}.json"), "w") as f:
+        json.dump(rows, f)
+
+
+def make_articles(count):
+    """Build synthetic article rows"""
+    return [
+        {
+            "id": i,
+            "title": f"Article {i}",
+            "excerpt": "Synthetic benchmark row",
+            "author": f"Author {i % 100}",
+            "tags": ["Benchmark", f"Tag {i % 50}"],
+            "views": i % 1000,
+            "likes": i % 100,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def time_per_call(func, args_list):
+    """Average wall time per call in microseconds"""
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1_000_000
+
+
+def bench_point_lookups(sizes, lookups=2_000):
+    """Primary-key read latency as the table grows"""
+    print("🔎 Primary-key lookups (db.read)")
+    print(f"{'rows':>10} {'load (s)':>10} {'read (µs)':>12} {'linear scan (µs)':>18}")
+
+    for size in sizes:
+        data_dir = tempfile.mkdtemp(prefix="qq-bench-")
+        try:
+            write_table(data_dir, "articles", make_articles(size))
+            database = JSONDatabase(data_dir=data_dir)
+
+            start = time.perf_counter()
+            rows = database._load_data("articles")
+            load_time = time.perf_counter() - start
+
+            ids = [("articles", random.randint(1, size)) for _ in range(lookups)]
+            read_us = time_per_call(database.read, ids)
+
+            # What every lookup cost before the primary-key index existed
+            def linear_scan(_table, item_id):
+                for item in rows:
+                    if item.get("id") == item_id:
+                        return item
+            scan_us = time_per_call(linear_scan, ids[: max(1, lookups // 100)])
+
+            print(f"{size:>10} {load_time:>10.2f} {read_us:>12.2f} {scan_us:>18.1f}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def bench_codecs(sizes, codecs):
+    """Full snapshot load and save throughput for each codec"""
+    print("💾 Snapshot load/save (cold _load_rows, _save_data)")
+    print(f"{'rows':>10} {'codec':>16} {'size (MB)':>10} {'load (s)':>10} {'save (s)':>10} {'load rows/s':>12}")
+
+    for size in sizes:
+        rows = make_articles(size)
+        data_dir = tempfile.mkdtemp(prefix="qq-bench-")
+        try:
+            path = os.path.join(data_dir, "articles.json")
+
+            # The previous format: indented stdlib JSON
+            start = time.perf_counter()
+            with open(path, "w") as f:
+                json.dump(rows, f, indent=2, default=str)
+            save_time = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(path, "r") as f:
+                json.loads(f.read())
+            load_time = time.perf_counter() - start
+            megabytes = os.path.getsize(path) / 1_000_000
+            print(f"{size:>10} {'json (indent=2)':>16} {megabytes:>10.1f} {load_time:>10.2f} "
+                  f"{save_time:>10.2f} {size / load_time:>12,.0f}")
+
+            for name in codecs:
+                codec = get_codec(name)
+                if codec.name != name:
+                    print(f"{size:>10} {name:>16}  (not installed)")
+                    continue
+                write_table(data_dir, "articles", rows)
+                database = JSONDatabase(data_dir=data_dir, codec=codec)
+
+                start = time.perf_counter()
+                database._load_rows("articles")
+                load_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                database._save_data("articles")
+                save_time = time.perf_counter() - start
+
+                megabytes = os.path.getsize(path) / 1_000_000
+                print(f"{size:>10} {name:>16} {megabytes:>10.1f} {load_time:>10.2f} "
+                      f"{save_time:>10.2f} {size / load_time:>12,.0f}")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON storage layer")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated table sizes",
+    )
+    parser.add_argument(
+        "--codecs",
+        default=",".join(reversed(list(CODECS))),
+        help="Comma separated JSON codecs to compare",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    codecs = [codec for codec in args.codecs.split(",") if codec]
+
+    print("⏱️  Quiz Quest storage benchmark")
+    print("=" * 56)
+    bench_point_lookups(sizes)
+    print()
+    bench_codecs(sizes, codecs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of the JSON data files into the SQLite storage backend
+Run with: python migrate_to_sqlite.py [--data-dir data] [--db data/quiz_quest.db] [--dedupe]
+Afterwards start the server with STORAGE_BACKEND=sqlite
+
+The JSON files are only read. Rows that collide on a unique index (e.g. a
+user liking an article twice, from before likes were indexed) are reported
+and stop the migration; --dedupe keeps the earliest row of each group and
+takes the dropped rows' increments off the counters they fed.
+"""
+
+import argparse
+import os
+import sys
+
+from app.config import settings
+from app.database import JSONDatabase, TABLES
+from app.sqlite_database import SQLiteDatabase
+
+# Counters incremented together with a relationship row:
+# table -> (field naming the target row, target table, counter field)
+ROW_COUNTERS = {
+    "likes": ("article_id", "articles", "likes"),
+    "enrollments": ("course_id", "courses", "students"),
+}
+
+
+def find_duplicates(source, table, rows):
+    """Rows that repeat an earlier row's key on a unique index, as (index fields, key, kept ID, duplicate row)"""
+    duplicates = []
+    for index in source.indexes.get(table, []):
+        if not index.unique:
+            continue
+        first = {}
+        for row in rows:
+            key = index.key(row)
+            if key is None or (isinstance(key, tuple) and None in key):
+                continue  # rows missing a key field never clash, as in both backends
+            if key in first:
+                duplicates.append((index.fields, key, first[key], row))
+            else:
+                first[key] = row["id"]
+    return duplicates
+
+
+def migrate(data_dir, db_path, dedupe=False):
+    """Copy every table, keeping IDs and ID sequences; returns False if duplicates stopped it"""
+    source = JSONDatabase(data_dir=data_dir, read_only=True)
+    tables = {table: sorted(source.read_all(table), key=lambda row: row["id"]) for table in TABLES}
+
+    dropped = {}
+    for table, rows in tables.items():
+        for fields, key, kept, row in find_duplicates(source, table, rows):
+            print(f"⚠️  {table} {row['id']} duplicates {kept} on {fields}={key}")
+            dropped.setdefault(table, []).append(row)
+    if dropped and not dedupe:
+        print("❌ Duplicate rows found; nothing was migrated. Rerun with --dedupe to drop them.")
+        return False
+
+    for table, rows in dropped.items():
+        ids = {row["id"] for row in rows}
+        tables[table] = [row for row in tables[table] if row["id"] not in ids]
+        if table in ROW_COUNTERS:
+            field, target_table, counter = ROW_COUNTERS[table]
+            targets = {row["id"]: row for row in tables[target_table]}
+            for row in rows:
+                target = targets.get(row.get(field))
+                if target is not None:
+                    target[counter] = max(0, (target.get(counter) or 0) - 1)
+        print(f"🧹 {table}: dropped {len(rows)} duplicate rows")
+
+    target = SQLiteDatabase(path=db_path)
+    for table, rows in tables.items():
+        # Carry the persisted sequence over so deleted IDs stay retired
+        target.import_rows(table, rows, next_id=source.peek_next_id(table))
+        print(f"✅ {table}: {len(rows)} rows")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import data/*.json into SQLite")
+    parser.add_argument("--data-dir", default=settings.data_dir, help="Directory with the JSON tables")
+    parser.add_argument("--db", default=None, help="SQLite database file (default: <data-dir>/quiz_quest.db)")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Drop rows that duplicate an earlier row on a unique index and fix their counters")
+    args = parser.parse_args()
+
+    db_path = args.db or settings.sqlite_path or os.path.join(args.data_dir, "quiz_quest.db")
+    print(f"📦 Migrating {args.data_dir}/*.json -> {db_path}")
+    print("=" * 50)
+    if not migrate(args.data_dir, db_path, dedupe=args.dedupe):
+        return 1
+    print("-" * 50)
+    print("🎉 Migration completed! Set STORAGE_BACKEND=sqlite to use it.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,23 @@ Data seeding script for Quiz Quest Courses API
 This script populates the database with sample data matching the frontend requirements
 """
 
+import argparse
 import json
 import os
+import random
+import time
 from datetime import datetime, timedelta
 from app.database import db
 from app.auth import get_password_hash
 
+def seed_table(table, key, items):
+    """Create the items whose key field isn't stored yet, in one batch"""
+    print(f"Seeding {table}...")
+    db.upsert_by_field(table, key, items, update_existing=False)
+    # Only newly created items get an id assigned
+    created = sum(1 for item in items if "id" in item)
+    print(f"Created {created} {table} ({len(items) - created} already present)")
+
 def seed_users():
     """Seed sample users"""
     users = [
@@ -35,12 +46,7 @@ def seed_users():
         }
     ]
     
-    print("Seeding users...")
-    for user_data in users:
-        existing = db.find_one_by_field("users", "email", user_data["email"])
-        if not existing:
-            db.create("users", user_data)
-            print(f"Created user: {user_data['username']}")
+    seed_table("users", "email", users)
 
 def seed_courses():
     """Seed sample courses"""
@@ -69,12 +75,7 @@ def seed_courses():
         }
     ]
     
-    print("Seeding courses...")
-    for course_data in courses:
-        existing = db.find_one_by_field("courses", "title", course_data["title"])
-        if not existing:
-            db.create("courses", course_data)
-            print(f"Created course: {course_data['title']}")
+    seed_table("courses", "title", courses)
 
 def seed_tutorials():
     """Seed sample tutorials"""
@@ -92,12 +93,7 @@ def seed_tutorials():
         }
     ]
     
-    print("Seeding tutorials...")
-    for tutorial_data in tutorials:
-        existing = db.find_one_by_field("tutorials", "title", tutorial_data["title"])
-        if not existing:
-            db.create("tutorials", tutorial_data)
-            print(f"Created tutorial: {tutorial_data['title']}")
+    seed_table("tutorials", "title", tutorials)
 
 def seed_articles():
     """Seed sample articles"""
@@ -116,12 +112,7 @@ def seed_articles():
         }
     ]
     
-    print("Seeding articles...")
-    for article_data in articles:
-        existing = db.find_one_by_field("articles", "title", article_data["title"])
-        if not existing:
-            db.create("articles", article_data)
-            print(f"Created article: {article_data['title']}")
+    seed_table("articles", "title", articles)
 
 def seed_quizzes():
     """Seed sample quizzes"""
@@ -147,14 +138,63 @@ def seed_quizzes():
         }
     ]
     
-    print("Seeding quizzes...")
-    for quiz_data in quizzes:
-        existing = db.find_one_by_field("quizzes", "title", quiz_data["title"])
-        if not existing:
-            db.create("quizzes", quiz_data)
-            print(f"Created quiz: {quiz_data['title']}")
+    seed_table("quizzes", "title", quizzes)
+
+SYNTHETIC_CATEGORIES = ["Programming", "Data Science", "Design", "Web Development", "Business"]
+SYNTHETIC_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+def synthetic_item(table, i):
+    """Build one synthetic record for load and performance testing"""
+    category = SYNTHETIC_CATEGORIES[i % len(SYNTHETIC_CATEGORIES)]
+    level = SYNTHETIC_LEVELS[i % len(SYNTHETIC_LEVELS)]
+    published = (datetime.now() - timedelta(minutes=i)).isoformat()
+    if table == "courses":
+        return {
+            "title": f"Synthetic Course {i}", "description": f"Generated {category} course #{i}.",
+            "duration": f"{4 + i % 12} weeks", "price": f"${19 + i % 180}", "category": category,
+            "level": level, "image": "", "students": random.randint(0, 5000),
+            "rating": round(random.uniform(3.0, 5.0), 1)
+        }
+    if table == "tutorials":
+        return {
+            "title": f"Synthetic Tutorial {i}", "description": f"Generated {category} tutorial #{i}.",
+            "duration": f"{10 + i % 50} min", "difficulty": level, "image": "", "category": category,
+            "level": level, "views": random.randint(0, 20000), "rating": round(random.uniform(3.0, 5.0), 1)
+        }
+    if table == "articles":
+        return {
+            "title": f"Synthetic Article {i}", "excerpt": f"Generated {category} article #{i}.",
+            "content": f"Synthetic content for article {i}.", "author": f"Author {i % 100}",
+            "read_time": f"{1 + i % 15} min read", "image": "", "tags": [category, level],
+            "views": random.randint(0, 10000), "likes": random.randint(0, 500), "published_date": published
+        }
+    return {
+        "title": f"Synthetic Quiz {i}", "description": f"Generated {category} quiz #{i}.",
+        "questions_count": 1, "difficulty": level, "time_limit": "10 min", "category": category,
+        "questions": [
+            {
+                "id": 1,
+                "question": f"Synthetic question {i}?",
+                "options": [
+                    {"id": "a", "text": "Right", "is_correct": True},
+                    {"id": "b", "text": "Wrong", "is_correct": False}
+                ],
+                "explanation": "Synthetic data."
+            }
+        ]
+    }
+
+def seed_synthetic(count):
+    """Seed count synthetic records spread over courses, tutorials, articles and quizzes"""
+    tables = ["courses", "tutorials", "articles", "quizzes"]
+    start = time.perf_counter()
+    for n, table in enumerate(tables):
+        # Spread the remainder so exactly count records are generated
+        size = count // len(tables) + (1 if n < count % len(tables) else 0)
+        seed_table(table, "title", [synthetic_item(table, i) for i in range(1, size + 1)])
+    print(f"⏱️  {count} synthetic records in {time.perf_counter() - start:.2f}s")
 
-def main():
+def main(synthetic=0):
     """Main seeding function"""
     print("🌱 Starting database seeding...")
     seed_users()
@@ -162,9 +202,13 @@ def main():
     seed_tutorials()
     seed_articles()
     seed_quizzes()
+    if synthetic:
+        seed_synthetic(synthetic)
     print("✅ Database seeding completed!")
     print("Login: admin@example.com / admin123")
     print("Login: john.doe@example.com / password123")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the Quiz Quest database")
+    parser.add_argument("--synthetic", type=int, default=0, help="Also generate this many synthetic records")
+    main(parser.parse_args().synthetic) 
\ No newline at end of file
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Multi-worker stress test for the storage layer
+Starts uvicorn with several worker processes on a scratch data directory,
+hammers POST /api/articles/{id}/like and GET /api/articles/{id} from many
+threads, then checks that no like, like count or view was lost.
+
+Run with: python stress_likes.py [--workers 4] [--users 200] [--threads 32]
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(method, url, token=None):
+    """Send a request and return the HTTP status code"""
+    req = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None)
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def wait_for_server(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if request("GET", f"{base_url}/api/health") == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the like endpoint from several uvicorn workers")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker processes")
+    parser.add_argument("--users", type=int, default=200, help="distinct users liking the article")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent client threads")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="qq-stress-")
+    # Small threshold so compaction races with appends from other workers
+    os.environ.update({"DATA_DIR": data_dir, "WAL_COMPACTION_THRESHOLD": "50"})
+
+    from app.auth import create_access_token
+    from app.database import JSONDatabase
+
+    setup_db = JSONDatabase(data_dir=data_dir)
+    article = setup_db.create("articles", {
+        "title": "Stress test", "excerpt": "", "content": "", "author": "bench",
+        "read_time": "1 min", "image": "", "tags": [], "views": 0, "likes": 0,
+        "published_date": "2024-01-01T00:00:00",
+    })
+    tokens = []
+    for i in range(args.users):
+        user = setup_db.create("users", {
+            "email": f"stress{i}@example.com", "username": f"stress{i}", "password": "",
+            "role": "student", "is_active": True,
+        })
+        tokens.append(create_access_token({"sub": user["email"]}))
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+
+    print(f"🔥 {args.workers} workers, {args.users} users, {args.threads} client threads")
+    print("=" * 50)
+    try:
+        if not wait_for_server(base_url):
+            print("❌ Server did not start")
+            return 1
+
+        article_url = f"{base_url}/api/articles/{article['id']}"
+
+        def hammer(token):
+            # Like twice (the second must be rejected) and view once
+            return [
+                request("POST", f"{article_url}/like", token),
+                request("GET", article_url),
+                request("POST", f"{article_url}/like", token),
+            ]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            statuses = Counter(code for codes in pool.map(hammer, tokens) for code in codes)
+        elapsed = time.perf_counter() - start
+        print(f"⏱️  {sum(statuses.values())} requests in {elapsed:.2f}s, status codes: {dict(statuses)}")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    check_db = JSONDatabase(data_dir=data_dir)
+    stored = check_db.read("articles", article["id"])
+    likes = check_db.find_by_field("likes", "article_id", article["id"])
+    checks = [
+        ("like rows", len(likes), args.users),
+        ("distinct likers", len({like["user_id"] for like in likes}), args.users),
+        ("article.likes", stored["likes"], args.users),
+        ("article.views", stored["views"], args.users),
+    ]
+
+    print("-" * 50)
+    failed = False
+    for name, actual, expected in checks:
+        ok = actual == expected
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name}: {actual} (expected {expected})")
+
+    shutil.rmtree(data_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Keep the global database created on import of app.database out of data/,
+# and skip fsyncs and counter write-behind so tests are fast and deterministic
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="quiz-quest-tests-"))
+os.environ.setdefault("WAL_FSYNC", "false")
+os.environ.setdefault("COUNTER_FLUSH_INTERVAL", "0")
+os.environ.setdefault("COLUMNAR_SNAPSHOTS", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import JSONDatabase  # noqa: E402  (after the environment is set)
+
+
+@pytest.fixture
+def json_db(tmp_path):
+    return JSONDatabase(str(tmp_path))
+
+
+@pytest.fixture
+def reopen():
+    """Open a fresh instance over a database's files, as after a restart"""
+    return lambda database: JSONDatabase(database.data_dir)
@@ -0,0 +1,32 @@
+import json
+import os
+
+
+def test_returned_rows_are_copies_of_the_cache(json_db):
+    course = json_db.create("courses", {"title": "a", "tags": ["python"]})
+    course["title"] = "changed by the caller"
+
+    for row in (json_db.read("courses", 1), json_db.read_all("courses")[0],
+                json_db.find_by_field("courses", "title", "a")[0], json_db.query("courses")[0]):
+        assert row["title"] == "a"
+        row["title"] = "changed by the caller"
+        row["tags"].append("mutated")
+
+    assert json_db.read("courses", 1)["title"] == "a"
+    assert json_db.read("courses", 1)["tags"] == ["python"]
+    assert json_db.find_by_field("courses", "title", "changed by the caller") == []
+
+
+def test_cache_is_invalidated_when_the_file_changes_on_disk(json_db):
+    json_db.create("courses", {"title": "a"})
+    json_db.compact()
+    assert json_db.read("courses", 1)["title"] == "a"
+
+    # Another process (or a hand edit) replaces the snapshot
+    path = json_db.files["courses"]
+    with open(path + ".tmp", "w") as f:
+        json.dump([{"id": 1, "title": "b"}, {"id": 2, "title": "c"}], f)
+    os.replace(path + ".tmp", path)
+
+    assert json_db.read("courses", 1)["title"] == "b"
+    assert [course["title"] for course in json_db.read_all("courses")] == ["b", "c"]
@@ -0,0 +1,57 @@
+import pytest
+
+from app.catalog import CategoryCatalog
+from app.config import settings
+from app.database import JSONDatabase
+from app.search import SearchIndex
+
+
+@pytest.fixture(params=[False, True], ids=["no-feed", "feed"])
+def workers(tmp_path, monkeypatch, request):
+    """Two JSONDatabase instances over one data directory, like two uvicorn workers"""
+    monkeypatch.setattr(settings, "change_feed", request.param)
+    monkeypatch.setattr(settings, "search_rebuild_interval", 0.0)
+    return JSONDatabase(str(tmp_path)), JSONDatabase(str(tmp_path))
+
+
+def counts(catalog, table="courses"):
+    return {entry["name"]: (entry["count"], entry["difficulties"]) for entry in catalog.summary(table)}
+
+
+def test_local_writes_are_counted_once(workers):
+    database, _ = workers
+    catalog = CategoryCatalog(database)
+    database.create("courses", {"title": "Python", "category": "Programming", "level": "Beginner"})
+    assert counts(catalog) == {"Programming": (1, {"Beginner": 1})}
+
+    second = database.create("courses", {"title": "Go", "category": "Programming", "level": "Advanced"})
+    database.create("courses", {"title": "Stats", "category": "Data Science", "level": "Beginner"})
+    database.increment("courses", second["id"], "students")
+    assert counts(catalog) == {
+        "Programming": (2, {"Beginner": 1, "Advanced": 1}),
+        "Data Science": (1, {"Beginner": 1}),
+    }
+
+    database.update("courses", second["id"], {"category": "data science"})
+    database.delete("courses", 1)
+    assert counts(catalog) == {"Data Science": (2, {"Beginner": 1, "Advanced": 1})}
+    assert catalog.names("courses") == ["Data Science"]
+
+
+def test_other_workers_writes_are_picked_up(workers):
+    worker_a, worker_b = workers
+    catalog = CategoryCatalog(worker_a)
+    search = SearchIndex(worker_a)
+    course = worker_a.create("courses", {"title": "Alpha", "category": "Programming", "level": "Beginner"})
+    assert counts(catalog) == {"Programming": (1, {"Beginner": 1})}
+    assert search.search("courses", "gamma") == []
+
+    # Worker A keeps writing while worker B adds a course
+    worker_b.create("courses", {"title": "Gamma", "category": "Design", "level": "Beginner"})
+    worker_a.update("courses", course["id"], {"title": "Alpha 2"})
+
+    assert counts(catalog) == {"Programming": (1, {"Beginner": 1}), "Design": (1, {"Beginner": 1})}
+    assert [item_id for item_id, _ in search.search("courses", "gamma")] == [2]
+
+    worker_a.create("courses", {"title": "Beta", "category": "Design", "level": "Advanced"})
+    assert counts(catalog) == {"Design": (2, {"Beginner": 1, "Advanced": 1}), "Programming": (1, {"Beginner": 1})}
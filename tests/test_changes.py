@@ -0,0 +1,66 @@
+import pytest
+
+from app.changes import ChangeEvent, ChangeFeed, ChangeFeedGap
+from app.config import settings
+from app.database import DuplicateKeyError, JSONDatabase
+
+
+def test_subscribers_get_committed_changes(json_db):
+    events = []
+    unsubscribe = json_db.subscribe(events.append, tables=["courses"])
+    course = json_db.create("courses", {"title": "a"})
+    json_db.update("courses", course["id"], {"title": "b"})
+    json_db.create("articles", {"title": "not subscribed"})
+    json_db.delete("courses", course["id"])
+
+    assert [(event.op, event.id) for event in events] == [("create", 1), ("update", 1), ("delete", 1)]
+    assert events[0].before is None and events[0].after["title"] == "a"
+    assert (events[1].before["title"], events[1].after["title"]) == ("a", "b")
+    assert events[2].after is None
+
+    unsubscribe()
+    json_db.create("courses", {"title": "c"})
+    assert len(events) == 3
+
+
+def test_rolled_back_transactions_publish_nothing(json_db):
+    json_db.create("likes", {"user_id": 1, "article_id": 1})
+    events = []
+    json_db.subscribe(events.append)
+    with pytest.raises(DuplicateKeyError):
+        with json_db.transaction() as tx:
+            tx.create("bookmarks", {"user_id": 1, "article_id": 1})
+            tx.create("likes", {"user_id": 1, "article_id": 1})
+    assert events == []
+
+
+def test_feed_offsets_resume_where_the_reader_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "change_feed", True)
+    writer = JSONDatabase(str(tmp_path))
+    for title in ("a", "b", "c"):
+        writer.create("courses", {"title": title})
+
+    reader = JSONDatabase(str(tmp_path))
+    first, offset = reader.read_changes(0, limit=2)
+    assert [event.after["title"] for event in first] == ["a", "b"]
+    assert first[0].offset == 0 and first[1].offset > 0
+    assert all(event.origin == writer.changes.origin for event in first)
+
+    writer.delete("courses", 1)
+    rest, offset = reader.read_changes(offset)
+    assert [(event.op, event.id) for event in rest] == [("create", 3), ("delete", 1)]
+    assert reader.read_changes(offset) == ([], offset)
+    assert offset == writer.changes.feed.end()
+
+
+def test_trimmed_offsets_raise_a_gap(tmp_path, json_db):
+    # One event per segment, two segments kept
+    feed = ChangeFeed(str(tmp_path / "_changes"), json_db.codec, segment_bytes=1, retain_segments=2)
+    for number in range(4):
+        feed.append([ChangeEvent("courses", "create", number, None, {"id": number})])
+
+    with pytest.raises(ChangeFeedGap) as raised:
+        feed.read(0)
+    events, offset = feed.read(raised.value.oldest)
+    assert [event.id for event in events] == [2, 3]
+    assert offset == feed.end()
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.config import settings
+from app.database import JSONDatabase
+
+
+@pytest.fixture
+def attempts_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "columnar_snapshots", True)
+    database = JSONDatabase(str(tmp_path))
+    generator = random.Random(7)
+    rows = []
+    for _ in range(400):
+        row = {"user_id": generator.randint(1, 40), "quiz_id": generator.randint(1, 6),
+               "correct_answers": generator.randint(0, 5), "total_questions": 5}
+        if generator.random() > 0.1:  # some attempts have no score
+            row["score"] = generator.choice([0, 20, 40, 60, 60, 80, 100, 66.5])
+        rows.append(row)
+    database.create_many("quiz_attempts", rows)
+    return database
+
+
+def test_aggregates_match_row_computation(attempts_db):
+    rows = attempts_db.find_by_field("quiz_attempts", "user_id", 3)
+    columns = attempts_db.select_columns("quiz_attempts", ["quiz_id", "score"], where={"user_id": 3})
+
+    assert columns.count() == len(rows)
+    assert columns.total("score") == pytest.approx(sum(row.get("score", 0) for row in rows))
+    assert columns.present("score") == len([row for row in rows if row.get("score")])
+    assert columns.at_least("score", 60) == len([row for row in rows if row.get("score", 0) >= 60])
+
+    expected = {}
+    for row in rows:
+        totals = expected.setdefault(row["quiz_id"], [0, 0])
+        totals[0] += row.get("score", 0)
+        totals[1] += 1
+    totals = columns.totals_by("quiz_id", "score")
+    assert {quiz_id: (pytest.approx(total), count) for quiz_id, (total, count) in expected.items()} == totals
+    assert all(type(quiz_id) is int for quiz_id in totals)
+
+
+def test_best_per_matches_row_leaderboard(attempts_db):
+    fields = ["user_id", "score", "correct_answers", "total_questions"]
+    rows = attempts_db.find_by_field("quiz_attempts", "quiz_id", 2)
+    columns = attempts_db.select_columns("quiz_attempts", fields, where={"quiz_id": 2})
+
+    # The leaderboard's row-based grouping: first best attempt per user, then by score
+    best = {}
+    for row in rows:
+        if row["user_id"] not in best or row.get("score", 0) > best[row["user_id"]].get("score", 0):
+            best[row["user_id"]] = row
+    expected = sorted(best.values(), key=lambda row: row.get("score", 0), reverse=True)[:10]
+
+    top = [columns.row(position) for position in columns.best_per("user_id", "score", 10)]
+    assert top == [{field: row[field] for field in fields if field in row} for row in expected]
+    assert all(type(row["user_id"]) is int for row in top)
+    assert columns.best_per("user_id", "score", 0) == []
@@ -0,0 +1,62 @@
+import pytest
+
+from app.counters import CounterBuffer
+
+
+@pytest.fixture
+def buffered(json_db):
+    # A long interval: only explicit flushes write
+    return CounterBuffer(json_db, interval=3600)
+
+
+def test_reads_merge_pending_deltas_before_any_write(buffered, json_db):
+    course = json_db.create("courses", {"title": "a", "students": 5})
+    for _ in range(3):
+        buffered.increment("courses", course["id"], "students")
+    assert buffered.increment("courses", course["id"], "students", -1)["students"] == 7
+
+    assert json_db.read("courses", course["id"])["students"] == 5
+    assert buffered.read("courses", course["id"])["students"] == 7
+    assert buffered.read_all("courses")[0]["students"] == 7
+    assert buffered.query("courses", fields=["id", "students"]) == [{"id": course["id"], "students": 7}]
+    assert buffered.increment("courses", 99, "students") is None
+
+
+def test_flush_writes_coalesced_deltas_once(buffered, json_db):
+    first = json_db.create("articles", {"title": "a", "likes": 0})
+    second = json_db.create("articles", {"title": "b", "likes": 0})
+    buffered.increment("articles", first["id"], "likes")
+    buffered.increment("articles", first["id"], "likes")
+    buffered.increment("articles", second["id"], "likes")
+    buffered.increment("articles", second["id"], "likes", -1)
+
+    # The second article's deltas cancel out and need no write
+    assert buffered.flush() == 1
+    assert json_db.read("articles", first["id"])["likes"] == 2
+    assert buffered.read("articles", first["id"])["likes"] == 2
+    assert buffered.flush() == 0
+
+
+def test_counter_filters_flush_first(buffered, json_db):
+    course = json_db.create("courses", {"title": "a", "students": 0})
+    buffered.increment("courses", course["id"], "students", 10)
+    assert [row["id"] for row in buffered.query("courses", where={"students__gte": 10})] == [course["id"]]
+    assert json_db.read("courses", course["id"])["students"] == 10
+
+
+def test_minimum_clamps_merged_and_flushed_values(buffered, json_db):
+    article = json_db.create("articles", {"title": "a", "likes": 1})
+    for _ in range(3):
+        buffered.increment("articles", article["id"], "likes", -1, minimum=0)
+    assert buffered.read("articles", article["id"])["likes"] == 0
+    buffered.flush()
+    assert json_db.read("articles", article["id"])["likes"] == 0
+
+
+def test_stop_flushes_what_is_left(json_db, reopen):
+    buffered = CounterBuffer(json_db, interval=3600)
+    buffered.start()
+    article = json_db.create("articles", {"title": "a", "views": 0})
+    buffered.increment("articles", article["id"], "views", 4)
+    buffered.stop()
+    assert reopen(json_db).read("articles", article["id"])["views"] == 4
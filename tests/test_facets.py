@@ -0,0 +1,41 @@
+import pytest
+
+from app.database import JSONDatabase
+from app.sqlite_database import SQLiteDatabase
+
+COURSES = [
+    {"title": "Python Basics", "category": "Programming", "level": "Beginner", "students": 30, "tags": ["python"]},
+    {"title": "Advanced Python", "category": "programming", "level": "advanced", "students": 12, "tags": ["Python", "async"]},
+    {"title": "Statistics", "category": "Data Science", "level": "BEGINNER", "students": 50, "tags": ["math", "MATH"]},
+    {"title": "Deep Learning", "category": "data science", "level": "Advanced", "students": 7, "tags": ["Math", "python"]},
+    {"title": "CSS Layouts", "category": "Web Development", "level": "Intermediate", "students": 0, "tags": []},
+    {"title": "No Category", "level": "Beginner", "students": 3},
+]
+
+
+@pytest.fixture
+def backends(tmp_path):
+    (tmp_path / "json").mkdir()
+    json_backend = JSONDatabase(str(tmp_path / "json"))
+    sqlite_backend = SQLiteDatabase(str(tmp_path / "quiz_quest.db"))
+    for backend in (json_backend, sqlite_backend):
+        for course in COURSES:
+            backend.create("courses", dict(course))
+        # Re-indexes course 1 behind course 2 in the JSON category bucket
+        backend.update("courses", 1, {"students": 31})
+    return json_backend, sqlite_backend
+
+
+@pytest.mark.parametrize("where", [None, {"level__ieq": "beginner"}, {"students__gt": 10}])
+def test_backends_agree_on_facets(backends, where):
+    json_backend, sqlite_backend = backends
+    fields = ["category", "level", "tags"]
+    assert json_backend.facets("courses", fields, where) == sqlite_backend.facets("courses", fields, where)
+
+
+def test_labels_are_the_spelling_of_the_lowest_id(backends):
+    for backend in backends:
+        facets = backend.facets("courses", ["category", "level", "tags"])
+        assert facets["category"] == {"Data Science": 2, "Programming": 2, "Web Development": 1}
+        assert facets["level"] == {"Beginner": 3, "advanced": 2, "Intermediate": 1}
+        assert facets["tags"] == {"python": 3, "math": 2, "async": 1}
@@ -0,0 +1,31 @@
+import os
+
+from app.database import JSONDatabase
+
+
+def test_ids_are_not_reused_after_deleting_the_highest_row(json_db, reopen):
+    for title in ("a", "b", "c"):
+        json_db.create("courses", {"title": title})
+    json_db.delete("courses", 3)
+    assert json_db.create("courses", {"title": "d"})["id"] == 4
+
+    json_db.delete("courses", 4)
+    restarted = reopen(json_db)
+    assert restarted.create("courses", {"title": "e"})["id"] == 5
+
+
+def test_sequence_covers_rows_written_before_it_existed(json_db, reopen):
+    json_db.create_many("courses", [{"title": "a"}, {"title": "b"}])
+    os.remove(json_db.sequences["courses"])
+    assert reopen(json_db).create("courses", {"title": "c"})["id"] == 3
+
+
+def test_workers_never_hand_out_the_same_id(tmp_path):
+    worker_a, worker_b = JSONDatabase(str(tmp_path)), JSONDatabase(str(tmp_path))
+    ids = [
+        worker.create("courses", {"title": str(number)})["id"]
+        for number in range(10) for worker in (worker_a, worker_b)
+    ]
+    assert sorted(ids) == list(range(1, 21))
+    assert list(worker_a.reserve_ids("courses", 3)) == [21, 22, 23]
+    assert worker_b.create("courses", {"title": "next"})["id"] == 24
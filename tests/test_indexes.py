@@ -0,0 +1,34 @@
+import pytest
+
+from app.database import DuplicateKeyError, JSONDatabase
+from app.sqlite_database import SQLiteDatabase
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def database(tmp_path, request):
+    if request.param == "json":
+        return JSONDatabase(str(tmp_path))
+    return SQLiteDatabase(str(tmp_path / "quiz_quest.db"))
+
+
+def test_relationship_pairs_are_unique(database):
+    database.create("likes", {"user_id": 1, "article_id": 7})
+    other = database.create("likes", {"user_id": 2, "article_id": 7})
+
+    with pytest.raises(DuplicateKeyError) as raised:
+        database.create("likes", {"user_id": 1, "article_id": 7})
+    assert raised.value.table == "likes"
+    assert raised.value.fields == ("user_id", "article_id")
+    with pytest.raises(DuplicateKeyError):
+        database.update("likes", other["id"], {"user_id": 1})
+
+    assert len(database.read_all("likes")) == 2
+    assert database.find_one_by_fields("likes", {"user_id": 1, "article_id": 7})["id"] == 1
+    assert database.find_one_by_fields("likes", {"user_id": 2, "article_id": 7})["id"] == other["id"]
+
+
+def test_pair_is_free_again_after_delete(database):
+    like = database.create("likes", {"user_id": 1, "article_id": 7})
+    database.delete("likes", like["id"])
+    assert database.find_one_by_fields("likes", {"user_id": 1, "article_id": 7}) is None
+    assert database.create("likes", {"user_id": 1, "article_id": 7})["id"] != like["id"]
@@ -0,0 +1,48 @@
+import json
+
+from app.sqlite_database import SQLiteDatabase
+from migrate_to_sqlite import migrate
+
+
+def write_tables(data_dir):
+    tables = {
+        "articles": [{"id": 1, "title": "a", "likes": 3}, {"id": 2, "title": "b", "likes": 1}],
+        # A repeated like from before likes were indexed: rows 1 and 5
+        "likes": [{"id": 1, "user_id": 1, "article_id": 1}, {"id": 2, "user_id": 2, "article_id": 1},
+                  {"id": 5, "user_id": 1, "article_id": 1}, {"id": 6, "user_id": 3, "article_id": 2}],
+        "quiz_attempts": [{"id": 1, "user_id": 1, "quiz_id": 1, "completed_at": "2023-01-05T10:00:00"}],
+    }
+    for table, rows in tables.items():
+        (data_dir / f"{table}.json").write_text(json.dumps(rows))
+    (data_dir / "likes.seq").write_text("9")
+
+
+def listing(data_dir):
+    return {path.relative_to(data_dir): path.read_bytes() for path in data_dir.rglob("*") if path.is_file()}
+
+
+def test_migration_leaves_the_source_untouched_and_stops_on_duplicates(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_tables(data_dir)
+    before = listing(data_dir)
+
+    assert migrate(str(data_dir), str(tmp_path / "quiz_quest.db")) is False
+    assert SQLiteDatabase(str(tmp_path / "quiz_quest.db")).read_all("likes") == []
+    assert listing(data_dir) == before
+
+
+def test_dedupe_drops_repeats_and_fixes_counters(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    write_tables(data_dir)
+    before = listing(data_dir)
+
+    assert migrate(str(data_dir), str(tmp_path / "quiz_quest.db"), dedupe=True) is True
+    assert listing(data_dir) == before
+
+    target = SQLiteDatabase(str(tmp_path / "quiz_quest.db"))
+    assert [like["id"] for like in target.read_all("likes")] == [1, 2, 6]
+    assert [article["likes"] for article in target.read_all("articles")] == [2, 1]
+    assert [attempt["id"] for attempt in target.read_all("quiz_attempts")] == [1]
+    assert target.create("likes", {"user_id": 4, "article_id": 2})["id"] == 9
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import JSONDatabase, db
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    for number in range(7):
+        db.create("courses", {
+            "title": f"Course {number}", "description": "", "duration": "1h", "price": "Free",
+            "category": "Programming" if number % 3 else "Design", "level": "Beginner", "image": "",
+        })
+    # Without the lifespan, so the shared database is not compacted and shut down
+    return TestClient(app)
+
+
+def test_cursor_pages_cover_every_row_once(client):
+    ids, cursor = [], None
+    while True:
+        page = client.get("/api/courses/", params={"limit": 3, **({"cursor": cursor} if cursor else {})}).json()
+        assert len(page["items"]) <= 3
+        ids.extend(course["id"] for course in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == sorted(course["id"] for course in db.read_all("courses"))
+
+    filtered = client.get("/api/courses/", params={"category": "Programming", "limit": 2}).json()
+    rest = client.get("/api/courses/", params={"category": "Programming", "cursor": filtered["next_cursor"]}).json()
+    assert [course["category"] for course in filtered["items"] + rest["items"]] == ["Programming"] * 4
+    assert rest["next_cursor"] is None
+
+
+def test_requests_without_limit_or_cursor_get_the_bare_list(client):
+    courses = client.get("/api/courses/").json()
+    assert isinstance(courses, list)
+    assert [course["id"] for course in courses] == sorted(course["id"] for course in db.read_all("courses"))
+    assert client.get("/api/courses/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+@pytest.mark.parametrize("level", ["Beginner", "Advanced"])
+def test_keyset_pages_through_index_matches(tmp_path, level):
+    # Beginner matches most rows (walks the primary key), Advanced a few (sorted)
+    database = JSONDatabase(str(tmp_path))
+    database.create_many("courses", [
+        {"title": str(number), "level": "Advanced" if number % 10 == 0 else "Beginner"} for number in range(100)
+    ])
+    database.update("courses", 1, {"title": "moved to the end of its index bucket"})
+    expected = [course["id"] for course in database.find_by_field("courses", "level", level)]
+    for order, ids in (("id", sorted(expected)), ("-id", sorted(expected, reverse=True))):
+        pages, after = [], None
+        while True:
+            page = database.query("courses", where={"level__ieq": level}, order_by=order, limit=4, after=after)
+            pages.extend(course["id"] for course in page)
+            if len(page) < 4:
+                break
+            after = page[-1]["id"]
+        assert pages == ids
+
+
+def test_concurrent_creates_commit_in_id_order(tmp_path):
+    database = JSONDatabase(str(tmp_path))
+    database.create("courses", {"title": "first"})
+
+    def create_many_times():
+        for _ in range(50):
+            database.create("courses", {"title": "x"})
+
+    threads = [threading.Thread(target=create_many_times) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Rows are appended in commit order, which is now ID order
+    assert [course["id"] for course in database.read_all("courses")] == list(range(1, 202))
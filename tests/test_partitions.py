@@ -0,0 +1,40 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from app.database import JSONDatabase, SealedSegmentError
+
+
+def test_partitioned_creates_go_to_monthly_segments(json_db, reopen):
+    month = datetime.now().strftime("%Y-%m")
+    attempt = json_db.create("quiz_attempts", {"user_id": 1, "quiz_id": 1, "score": 80})
+
+    assert json_db.segments("quiz_attempts") == [f"quiz_attempts/{month}"]
+    assert os.path.exists(os.path.join(json_db.data_dir, "quiz_attempts", f"{month}.json"))
+    assert json_db.read("quiz_attempts", attempt["id"])["score"] == 80
+    assert reopen(json_db).find_by_field("quiz_attempts", "user_id", 1)[0]["id"] == attempt["id"]
+
+
+def test_legacy_rows_split_into_segments_and_past_months_are_sealed(tmp_path):
+    legacy = [
+        {"id": 1, "user_id": 1, "quiz_id": 1, "completed_at": "2023-01-15T10:00:00"},
+        {"id": 2, "user_id": 1, "quiz_id": 2, "completed_at": "2023-02-03T10:00:00"},
+        {"id": 3, "user_id": 2, "quiz_id": 1, "completed_at": "2023-02-20T10:00:00"},
+    ]
+    (tmp_path / "quiz_attempts.json").write_text(json.dumps(legacy))
+    database = JSONDatabase(str(tmp_path))
+
+    assert database.segments("quiz_attempts") == ["quiz_attempts/2023-01", "quiz_attempts/2023-02"]
+    assert database.segments("quiz_attempts", "2023-02-01", "2023-03-01") == ["quiz_attempts/2023-02"]
+    in_february = database.find_in_range("quiz_attempts", "completed_at", "2023-02-01", "2023-03-01")
+    assert sorted(attempt["id"] for attempt in in_february) == [2, 3]
+    assert len(database.read_all("quiz_attempts")) == 3
+
+    with pytest.raises(SealedSegmentError):
+        database.update("quiz_attempts", 1, {"score": 100})
+    with pytest.raises(SealedSegmentError):
+        database.create("quiz_attempts", {"user_id": 3, "quiz_id": 1, "completed_at": "2023-01-20T10:00:00"})
+    assert not os.path.exists(tmp_path / "quiz_attempts" / "2023-03.json")
+    assert database.create("quiz_attempts", {"user_id": 3, "quiz_id": 1})["id"] == 4
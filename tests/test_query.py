@@ -0,0 +1,56 @@
+import pytest
+
+from app.database import JSONDatabase
+from app.sqlite_database import SQLiteDatabase
+
+
+COURSES = [
+    {"title": "Python Basics", "category": "Programming", "level": "Beginner", "students": 30, "tags": ["python"]},
+    {"title": "Advanced Python", "category": "Programming", "level": "Advanced", "students": 12, "tags": ["python", "async"]},
+    {"title": "Statistics", "category": "Data Science", "level": "Beginner", "students": 50, "tags": ["math"]},
+    {"title": "Deep Learning", "category": "Data Science", "level": "Advanced", "students": 7, "tags": ["math", "python"]},
+    {"title": "CSS Layouts", "category": "Web Development", "level": "Intermediate", "students": 0, "tags": []},
+    {"title": "No Category", "level": "Beginner", "students": 3},
+]
+
+QUERIES = [
+    {},
+    {"where": {"category__ieq": "programming"}},
+    {"where": {"level__ieq": "BEGINNER", "students__gte": 5}},
+    {"where": {"students__lt": 20}, "order_by": "-students"},
+    {"where": {"id__in": [2, 4, 6, 99]}},
+    {"where": {"tags__ieq": "Python"}, "order_by": ["level", "-title"]},
+    {"where": {"title__icontains": "python"}, "fields": ["id", "title"]},
+    {"order_by": "title", "limit": 2, "offset": 1},
+    {"order_by": "-id", "limit": 2, "after": 5},
+]
+
+
+@pytest.fixture
+def backends(tmp_path):
+    (tmp_path / "json").mkdir()
+    json_backend = JSONDatabase(str(tmp_path / "json"))
+    sqlite_backend = SQLiteDatabase(str(tmp_path / "quiz_quest.db"))
+    for course in COURSES:
+        json_backend.create("courses", dict(course))
+        sqlite_backend.create("courses", dict(course))
+    return json_backend, sqlite_backend
+
+
+@pytest.mark.parametrize("options", QUERIES)
+def test_backends_agree_on_query(backends, options):
+    json_backend, sqlite_backend = backends
+    options = {"fields": ["id", "title", "category", "level", "students", "tags"], **options}
+    assert json_backend.query("courses", **options) == sqlite_backend.query("courses", **options)
+
+
+def test_query_filters_sorts_slices_and_projects(backends):
+    for backend in backends:
+        assert backend.query(
+            "courses", where={"students__gte": 5}, fields=["title"], order_by="-students", limit=2, offset=1
+        ) == [{"title": "Python Basics"}, {"title": "Advanced Python"}]
+        assert backend.query("courses", where={"title|category__icontains": "science"}, fields=["id"]) == [
+            {"id": 3}, {"id": 4}
+        ]
+        with pytest.raises(ValueError):
+            backend.query("courses", order_by="title", after=1)
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.database import JSONDatabase
+from app.search import SearchIndex
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = JSONDatabase(str(tmp_path))
+    database.create_many("courses", [
+        {"title": "Python Basics", "description": "Variables, loops and functions", "category": "Programming"},
+        {"title": "Advanced Python", "description": "Decorators and async", "category": "Programming"},
+        {"title": "Statistics", "description": "Probability for data science", "category": "Data Science"},
+        {"title": "Web Development", "description": "HTML, CSS and JavaScript", "category": "Web"},
+    ])
+    database.create_many("articles", [
+        {"title": "State of the web", "excerpt": "Trends", "tags": ["Web"], "author": "Jane Doe"},
+        {"title": "Testing", "excerpt": "Pytest tips", "tags": ["Python"], "author": "Theodore Otherton"},
+    ])
+    return database
+
+
+def ids(ranked):
+    return [item_id for item_id, _ in ranked]
+
+
+def test_bm25_ranks_weighted_shorter_and_rarer_hits_first(tmp_path):
+    database = JSONDatabase(str(tmp_path))
+    database.create_many("courses", [
+        {"title": "Python", "description": "cooking"},
+        {"title": "Gardening", "description": "python"},
+        {"title": "Gardening", "description": "python plus many more words about soil and plants"},
+        {"title": "Rust", "description": "python"},
+    ])
+    index = SearchIndex(database)
+    # A title hit outweighs a description hit, and the same hit counts more in a shorter record
+    ranked = ids(index.search("courses", "python", fuzzy=False))
+    assert ranked[0] == 1 and ranked[-1] == 3
+    # The rare word decides between records matching the common one equally
+    assert ids(index.search("courses", "python rust", fuzzy=False))[0] == 4
+    assert ids(index.search("courses", "python", limit=1, fuzzy=False)) == [1]
+
+
+def test_typos_and_partial_words_match(database):
+    index = SearchIndex(database)
+    assert ids(index.search("courses", "pyhton")) in ([1, 2], [2, 1])
+    assert index.matching_ids("courses", "javscript") == {4}
+    assert index.matching_ids("courses", "develop") == {4}
+    assert index.matching_ids("courses", "stat") == {3}
+    assert ids(index.search("courses", "pyhton", fuzzy=False)) == []
+
+
+def test_suggest_completes_titles_categories_and_tags(database):
+    index = SearchIndex(database)
+    database.create("tutorials", {"title": "Loops", "category": "Programming"})
+    # A category shared by several tables is one suggestion with their total count
+    assert index.suggest("prog") == [{"text": "Programming", "type": "category", "id": None, "count": 3}]
+    # Phrases starting with the prefix come before those with a later word starting with it
+    assert [(match["text"], match["type"]) for match in index.suggest("py")] == [
+        ("Python", "tag"), ("Python Basics", "course"), ("Advanced Python", "course")
+    ]
+    assert len(index.suggest("web", limit=2)) == 2
+    assert index.suggest("") == [] and index.suggest("xyz") == []
+
+    database.update("courses", 4, {"title": "Frontend Basics"})
+    assert [match["text"] for match in index.suggest("dev")] == []
+    assert {"text": "Frontend Basics", "type": "course", "id": 4, "count": 1} in index.suggest("front")
+
+
+def test_every_query_word_must_match(database):
+    index = SearchIndex(database)
+    assert index.matching_ids("courses", "python basics") == {1}
+    assert index.matching_ids("courses", "python statistics") == set()
+    assert index.matching_ids("courses", "programming") == {1, 2}
+    assert index.matching_ids("articles", "jane") == {1}
+    assert index.matching_ids("courses", "the and") is None
+
+
+def test_filter_falls_back_to_substrings_of_all_search_fields(database):
+    index = SearchIndex(database)
+    where = {}
+    asyncio.run(index.filter("articles", "the", where))
+    assert where == {"title|excerpt|author|tags__icontains": "the"}
+    # The second article contains "the" only in its author
+    assert [row["id"] for row in database.query("articles", where=where)] == [1, 2]
+    asyncio.run(index.filter("articles", "jane", where))
+    assert where["id__in"] == {1}
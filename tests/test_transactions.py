@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from app.database import DuplicateKeyError
+from app.sqlite_database import SQLiteDatabase
+
+
+def test_transaction_rolls_back_on_duplicate_key(json_db, reopen):
+    article = json_db.create("articles", {"title": "a", "likes": 0})
+    json_db.create("likes", {"user_id": 1, "article_id": article["id"]})
+
+    with pytest.raises(DuplicateKeyError):
+        with json_db.transaction() as tx:
+            tx.increment("articles", article["id"], "likes")
+            tx.create("bookmarks", {"user_id": 1, "article_id": article["id"]})
+            tx.create("likes", {"user_id": 1, "article_id": article["id"]})
+
+    for database in (json_db, reopen(json_db)):
+        assert database.read("articles", article["id"])["likes"] == 0
+        assert database.read_all("bookmarks") == []
+        assert len(database.read_all("likes")) == 1
+        assert len(database.find_by_field("likes", "user_id", 1)) == 1
+
+
+def test_transaction_commits_all_tables(json_db, reopen):
+    article = json_db.create("articles", {"title": "a", "likes": 0})
+    with json_db.transaction() as tx:
+        tx.create("likes", {"user_id": 1, "article_id": article["id"]})
+        tx.increment("articles", article["id"], "likes")
+
+    restarted = reopen(json_db)
+    assert restarted.read("articles", article["id"])["likes"] == 1
+    assert restarted.find_one_by_fields("likes", {"user_id": 1, "article_id": article["id"]})
+
+
+def test_replay_ignores_transaction_without_commit_marker(json_db, monkeypatch, reopen):
+    article = json_db.create("articles", {"title": "a", "likes": 0})
+
+    def crash(tx_id):
+        raise KeyboardInterrupt  # process dies after the log appends, before the marker
+
+    monkeypatch.setattr(json_db, "_append_journal", crash)
+    with pytest.raises(KeyboardInterrupt):
+        with json_db.transaction() as tx:
+            tx.create("likes", {"user_id": 1, "article_id": article["id"]})
+            tx.increment("articles", article["id"], "likes")
+
+    # The tagged records did reach both logs
+    assert b'"tx"' in open(json_db.logs["likes"], "rb").read()
+    assert b'"tx"' in open(json_db.logs["articles"], "rb").read()
+
+    restarted = reopen(json_db)
+    assert restarted.read("articles", article["id"])["likes"] == 0
+    assert restarted.read_all("likes") == []
+
+    # Later writes still work and do not revive the uncommitted records
+    with restarted.transaction() as tx:
+        tx.create("likes", {"user_id": 2, "article_id": article["id"]})
+        tx.increment("articles", article["id"], "likes")
+    restarted = reopen(restarted)
+    assert restarted.read("articles", article["id"])["likes"] == 1
+    assert [like["user_id"] for like in restarted.read_all("likes")] == [2]
+
+
+def test_compact_checkpoints_the_journal(json_db, reopen):
+    article = json_db.create("articles", {"title": "a", "likes": 0})
+    with json_db.transaction() as tx:
+        tx.create("likes", {"user_id": 1, "article_id": article["id"]})
+        tx.increment("articles", article["id"], "likes")
+    assert os.path.getsize(json_db.journal) > 0
+
+    json_db.compact()
+    assert os.path.getsize(json_db.journal) == 0
+    assert all(not os.path.exists(log) or os.path.getsize(log) == 0 for log in json_db.logs.values())
+
+    restarted = reopen(json_db)
+    assert restarted.read("articles", article["id"])["likes"] == 1
+    assert len(restarted.read_all("likes")) == 1
+
+
+def test_sqlite_transaction_rolls_back_on_duplicate_key(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "quiz_quest.db"))
+    article = database.create("articles", {"title": "a", "likes": 0})
+    database.create("likes", {"user_id": 1, "article_id": article["id"]})
+
+    with pytest.raises(DuplicateKeyError):
+        with database.transaction() as tx:
+            tx.increment("articles", article["id"], "likes")
+            tx.create("likes", {"user_id": 1, "article_id": article["id"]})
+
+    assert database.read("articles", article["id"])["likes"] == 0
+    assert len(database.read_all("likes")) == 1
@@ -0,0 +1,41 @@
+import os
+
+from app.config import settings
+
+
+def test_mutations_append_to_the_log_without_rewriting_the_snapshot(json_db, reopen):
+    course = json_db.create("courses", {"title": "a", "students": 0})
+    json_db.compact()
+    snapshot = os.stat(json_db.files["courses"])
+
+    json_db.update("courses", course["id"], {"title": "b"})
+    json_db.increment("courses", course["id"], "students")
+    json_db.create("courses", {"title": "c"})
+    json_db.delete("courses", course["id"])
+
+    assert os.stat(json_db.files["courses"]).st_mtime_ns == snapshot.st_mtime_ns
+    assert len(open(json_db.logs["courses"], "rb").read().splitlines()) == 4
+    assert [course["title"] for course in reopen(json_db).read_all("courses")] == ["c"]
+
+
+def test_replay_drops_torn_log_record(json_db, reopen):
+    course = json_db.create("courses", {"title": "a"})
+    with open(json_db.logs["courses"], "ab") as f:
+        f.write(b'{"op":"update","id":1,"chan')
+
+    restarted = reopen(json_db)
+    assert restarted.read("courses", course["id"])["title"] == "a"
+    restarted.update("courses", course["id"], {"title": "b"})
+    assert reopen(restarted).read("courses", course["id"])["title"] == "b"
+
+
+def test_wal_compaction_folds_log_into_snapshot(json_db, monkeypatch, reopen):
+    monkeypatch.setattr(settings, "wal_compaction_threshold", 5)
+    course = json_db.create("courses", {"title": "a", "students": 0})
+    for _ in range(3):
+        json_db.increment("courses", course["id"], "students")
+    assert os.path.getsize(json_db.logs["courses"]) > 0
+
+    json_db.increment("courses", course["id"], "students")
+    assert os.path.getsize(json_db.logs["courses"]) == 0
+    assert reopen(json_db).read("courses", course["id"])["students"] == 4